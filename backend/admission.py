@@ -0,0 +1,219 @@
+"""Admission control for the public write endpoints.
+
+``AdmissionMiddleware`` sits in front of the app and does two things for
+each request that matches a ``RoutePolicy``:
+
+* **Priority-aware shedding.** It counts every HTTP request in flight.
+  Once the count reaches a priority's share of ``max_in_flight``,
+  requests of that priority get an immediate 503 with ``Retry-After``,
+  instead of queueing behind Mongo or the LLM:
+
+  - ``low`` (scroll analytics) is shed first, at ``low_priority_share``.
+  - ``high`` (lead capture, assessments) is shed at the full limit.
+  - Requests without a policy (admin, health, metrics) are never shed,
+    so the dashboards stay usable during a burst.
+
+* **Per-client rate limits.** Each policy can carry a token-bucket
+  ``Budget`` per client IP. A request over budget gets a 429 with
+  ``Retry-After`` set to when the bucket will have a token again. The
+  same check rejects a ``Content-Length`` above the policy's
+  ``max_body_bytes`` with 413, before the body is read.
+
+Handlers that know more about a request call ``Admission.check`` for
+further buckets. For example, the scroll endpoints check a per
+``session_id`` budget, charged one token per event.
+
+Bucket state goes through a ``RateLimitStore``. ``MemoryRateLimitStore``
+keeps it in process, in an LRU bounded by ``max_keys``, so each worker
+enforces its own budgets. A store shared between workers only has to
+implement ``take``.
+
+The client IP is the socket peer. With ``proxy_hops`` set, it is the
+address that many entries from the right of ``X-Forwarded-For``, i.e.
+the one the outermost trusted proxy saw.
+"""
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, NamedTuple, Optional, Protocol, Tuple
+
+from starlette.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+LOW = "low"
+HIGH = "high"
+PRIORITIES = (LOW, HIGH)
+
+
+class AdmissionConfigError(ValueError):
+    """Raised for a budget spec or priority that cannot be parsed."""
+
+
+class AdmissionError(Exception):
+    """A request that is rejected before it does any work."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: Optional[float] = None):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+    @property
+    def headers(self) -> Optional[Dict[str, str]]:
+        if self.retry_after is None:
+            return None
+        return {"Retry-After": str(max(1, math.ceil(self.retry_after)))}
+
+
+class Budget(NamedTuple):
+    rate: float   # tokens added per second
+    burst: float  # bucket capacity
+
+
+def parse_budget(spec: Optional[str]) -> Optional[Budget]:
+    """``"<count>/<seconds>"`` -> a budget of ``count`` per ``seconds`` with a burst of ``count``.
+
+    An empty spec or ``"0"`` means unlimited (None).
+    """
+    spec = (spec or "").strip()
+    if spec in ("", "0"):
+        return None
+    try:
+        count, _, seconds = spec.partition("/")
+        count, seconds = float(count), float(seconds or 1)
+    except ValueError:
+        raise AdmissionConfigError(f"Invalid rate limit {spec!r}; expected <count>/<seconds>")
+    if count <= 0 or seconds <= 0:
+        raise AdmissionConfigError(f"Invalid rate limit {spec!r}; count and seconds must be positive")
+    return Budget(count / seconds, count)
+
+
+class RateLimitStore(Protocol):
+    async def take(self, key: str, budget: Budget, cost: float = 1) -> float:
+        """Take ``cost`` tokens from ``key``'s bucket; 0 if granted, else seconds until it would be."""
+
+
+class MemoryRateLimitStore:
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def take(self, key: str, budget: Budget, cost: float = 1) -> float:
+        now = time.monotonic()
+        cost = min(cost, budget.burst)
+        tokens, updated = self._buckets.pop(key, (budget.burst, now))
+        tokens = min(budget.burst, tokens + (now - updated) * budget.rate)
+        if tokens >= cost:
+            tokens -= cost
+            wait = 0.0
+        else:
+            wait = (cost - tokens) / budget.rate
+        self._buckets[key] = (tokens, now)
+        # Least recently used buckets go first; an evicted bucket comes back full
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class RoutePolicy(NamedTuple):
+    name: str
+    priority: str
+    ip_budget: Optional[Budget] = None
+    max_body_bytes: Optional[int] = None
+
+
+class Admission:
+    def __init__(self, policies: Iterable[Tuple[str, str, RoutePolicy]], store: Optional[RateLimitStore] = None,
+                 max_in_flight: int = 256, low_priority_share: float = 0.5, proxy_hops: int = 0,
+                 enabled: bool = True):
+        self.policies: Dict[Tuple[str, str], RoutePolicy] = {}
+        for method, path, policy in policies:
+            if policy.priority not in PRIORITIES:
+                raise AdmissionConfigError(f"Unknown priority {policy.priority!r}; expected one of {PRIORITIES}")
+            self.policies[(method, path)] = policy
+        self.store = store if store is not None else MemoryRateLimitStore()
+        self.max_in_flight = max_in_flight
+        self.low_priority_share = low_priority_share
+        self.proxy_hops = proxy_hops
+        self.enabled = enabled
+        self.in_flight = 0
+        self.rejections: Dict[Tuple[str, str], int] = {}
+
+    def policy(self, method: str, path: str) -> Optional[RoutePolicy]:
+        return self.policies.get((method, path))
+
+    def shed_limit(self, priority: str) -> float:
+        if priority == LOW:
+            return self.max_in_flight * self.low_priority_share
+        return self.max_in_flight
+
+    def client_ip(self, scope) -> str:
+        if self.proxy_hops > 0:
+            for name, value in scope.get("headers", ()):
+                if name == b"x-forwarded-for":
+                    hops = [hop.strip() for hop in value.decode("latin-1").split(",") if hop.strip()]
+                    if hops:
+                        return hops[-min(self.proxy_hops, len(hops))]
+                    break
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    def _reject(self, policy: RoutePolicy, reason: str, error: AdmissionError) -> AdmissionError:
+        key = (policy.name, reason)
+        self.rejections[key] = self.rejections.get(key, 0) + 1
+        return error
+
+    async def check(self, policy: RoutePolicy, kind: str, key: str, budget: Optional[Budget], cost: float = 1) -> None:
+        """Charge ``cost`` to the route's ``kind`` bucket for ``key`` (e.g. "ip", "session"); 429 when it is empty."""
+        if not self.enabled or budget is None:
+            return
+        wait = await self.store.take(f"{policy.name}:{kind}:{key}", budget, cost)
+        if wait > 0:
+            raise self._reject(policy, f"rate_limit_{kind}", AdmissionError(429, "Too many requests", wait))
+
+    async def admit(self, policy: RoutePolicy, scope) -> None:
+        """Shed, size and per-IP checks for a request about to start; raises AdmissionError."""
+        if not self.enabled:
+            return
+        if self.in_flight >= self.shed_limit(policy.priority):
+            raise self._reject(policy, "shed", AdmissionError(503, "Server busy, try again shortly", 1))
+        if policy.max_body_bytes is not None:
+            for name, value in scope.get("headers", ()):
+                if name == b"content-length":
+                    if value.isdigit() and int(value) > policy.max_body_bytes:
+                        raise self._reject(policy, "too_large", AdmissionError(
+                            413, f"Request body larger than {policy.max_body_bytes} bytes",
+                        ))
+                    break
+        await self.check(policy, "ip", self.client_ip(scope), policy.ip_budget)
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying ``Admission`` to each HTTP request and counting requests in flight."""
+
+    def __init__(self, app, admission: Admission):
+        self.app = app
+        self.admission = admission
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        policy = self.admission.policy(scope["method"], scope["path"])
+        if policy is not None:
+            try:
+                await self.admission.admit(policy, scope)
+            except AdmissionError as e:
+                response = JSONResponse({"detail": e.detail}, status_code=e.status_code, headers=e.headers)
+                await response(scope, receive, send)
+                return
+        self.admission.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.admission.in_flight -= 1
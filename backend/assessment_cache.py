@@ -0,0 +1,159 @@
+"""Answer-keyed cache for stage assessments.
+
+The quiz has seven multiple-choice questions, so the same answer set comes
+up again and again. Everything in an assessment except the personalized
+insight depends only on the answers; the insight is stored as a template
+with the user's name replaced by ``NAME_PLACEHOLDER`` and re-rendered for
+each new user.
+
+Entries live in an in-process LRU with a TTL and can optionally be
+persisted to the ``assessment_cache`` collection (TTL-indexed on
+``expires_at``) so they survive restarts and are shared between workers.
+"""
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+QUIZ_KEYS = (
+    'current_situation',
+    'hardest_right_now',
+    'business_direction',
+    'dependency',
+    'scale_readiness',
+    'decision_bottleneck',
+    'intent',
+)
+CACHED_FIELDS = (
+    'stage',
+    'bottleneck',
+    'stage_description',
+    'bottleneck_description',
+    'what_to_avoid',
+    'recommended_system',
+)
+NAME_PLACEHOLDER = '{{name}}'
+
+
+def normalize_answers(answers: Dict[str, Any]) -> Dict[str, str]:
+    """Keep only quiz answers, normalized so equivalent submissions share a key."""
+    normalized = {}
+    for key in QUIZ_KEYS:
+        value = answers.get(key)
+        if value is not None and str(value).strip():
+            normalized[key] = str(value).strip().lower()
+    return normalized
+
+
+def answers_key(answers: Dict[str, Any], variant: str = '') -> str:
+    payload = variant + json.dumps(normalize_answers(answers), sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _name_variants(name: str):
+    name = (name or '').strip()
+    if not name:
+        return []
+    first = name.split()[0]
+    return [name] if first == name else [name, first]
+
+
+def make_insight_template(insight: str, name: str) -> str:
+    # Whole words only: a first name like "Tim" must not template "Time"
+    for variant in _name_variants(name):
+        insight = re.sub(rf"(?<!\w){re.escape(variant)}(?!\w)", NAME_PLACEHOLDER, insight)
+    return insight
+
+
+def render_insight(template: str, name: str) -> str:
+    variants = _name_variants(name)
+    display_name = variants[-1] if variants else 'Founder'
+    return template.replace(NAME_PLACEHOLDER, display_name)
+
+
+class AssessmentCache:
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 7 * 24 * 3600, collection=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.collection = collection
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def ensure_indexes(self) -> None:
+        if self.collection is not None:
+            await self.collection.create_index('expires_at', expireAfterSeconds=0)
+
+    async def get(self, answers: Dict[str, Any], name: str, variant: str = '') -> Optional[Dict[str, Any]]:
+        """Return a full assessment for these answers rendered for ``name``, or None."""
+        key = answers_key(answers, variant)
+        entry = self._get_local(key)
+        if entry is None and self.collection is not None:
+            entry = await self._get_persisted(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        assessment = {field: entry[field] for field in CACHED_FIELDS if field in entry}
+        assessment['personalized_insight'] = render_insight(entry.get('insight_template', ''), name)
+        return assessment
+
+    async def put(self, answers: Dict[str, Any], assessment: Dict[str, Any], name: str, variant: str = '') -> None:
+        if not assessment.get('stage') or not assessment.get('bottleneck'):
+            return
+        entry = {field: assessment[field] for field in CACHED_FIELDS if field in assessment}
+        entry['insight_template'] = make_insight_template(assessment.get('personalized_insight', ''), name)
+        key = answers_key(answers, variant)
+        self._set_local(key, entry)
+        if self.collection is not None:
+            try:
+                await self.collection.update_one(
+                    {'_id': key},
+                    {'$set': {
+                        **entry,
+                        'answers': normalize_answers(answers),
+                        'expires_at': datetime.now(timezone.utc) + timedelta(seconds=self.ttl_seconds),
+                    }},
+                    upsert=True,
+                )
+            except Exception as e:
+                logger.warning(f"Failed to persist assessment cache entry: {e}")
+
+    def _get_local(self, key: str) -> Optional[Dict[str, Any]]:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        expires, entry = item
+        if expires < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _set_local(self, key: str, entry: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        self._entries[key] = (time.monotonic() + (self.ttl_seconds if ttl is None else ttl), entry)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _get_persisted(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            doc = await self.collection.find_one({'_id': key, 'expires_at': {'$gt': datetime.now(timezone.utc)}})
+        except Exception as e:
+            logger.warning(f"Failed to read assessment cache entry: {e}")
+            return None
+        if doc is None:
+            return None
+        expires_at = doc['expires_at']
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        remaining = (expires_at - datetime.now(timezone.utc)).total_seconds()
+        entry = {field: doc[field] for field in CACHED_FIELDS + ('insight_template',) if field in doc}
+        self._set_local(key, entry, ttl=remaining)
+        return entry
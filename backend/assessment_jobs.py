@@ -0,0 +1,177 @@
+"""Bounded background job queue for stage assessments.
+
+``submit`` enqueues a payload and returns immediately; a fixed pool of
+worker tasks runs the handler with a per-job timeout. Job state is kept in
+memory for ``result_ttl`` seconds after completion so clients can poll or
+long-poll (``wait``) for the result. When ``max_queue`` jobs are already
+waiting, ``submit`` raises ``JobQueueFullError`` so the endpoint can shed
+load instead of queueing unbounded work. A caller that must do work of its
+own before it can submit (e.g. save the lead the job writes to) takes a
+slot with ``reserve`` first, so a full queue is found before that work.
+
+``close`` lets the workers finish what is queued for up to ``drain_timeout``
+seconds, then cancels them and returns the jobs that never finished, marked
+failed, so the caller can record that on whatever they were writing to.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETE = "complete"
+FAILED = "failed"
+
+
+class JobQueueFullError(Exception):
+    """Raised when the job queue is at capacity."""
+
+
+class AssessmentJobQueue:
+    def __init__(
+        self,
+        handler: JobHandler,
+        max_queue: int = 1000,
+        workers: int = 4,
+        job_timeout: float = 60.0,
+        result_ttl: float = 900.0,
+    ):
+        self._handler = handler
+        self.max_queue = max_queue
+        self.workers = workers
+        self.job_timeout = job_timeout
+        self.result_ttl = result_ttl
+        self._queue: Optional[asyncio.Queue] = None
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._done: Dict[str, asyncio.Event] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._reserved = 0
+        self._closing = False
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._closing = False
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def close(self, drain_timeout: float = 10.0) -> List[Dict[str, Any]]:
+        """Stop taking jobs, drain the queue for up to ``drain_timeout`` seconds and stop the workers.
+
+        Returns the jobs that did not finish; they are marked failed.
+        """
+        self._closing = True
+        if self._tasks and self._queue is not None:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout=drain_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Assessment jobs still pending after {drain_timeout}s, abandoning them")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        abandoned = [job for job in self._jobs.values() if job["status"] in (QUEUED, RUNNING)]
+        for job in abandoned:
+            job["status"] = FAILED
+            job["error"] = "Server shut down before the job finished"
+            job["finished_at"] = time.time()
+            self._done[job["job_id"]].set()
+        return abandoned
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    @property
+    def full(self) -> bool:
+        return self._closing or self.depth + self._reserved >= self.max_queue
+
+    def reserve(self) -> None:
+        """Hold a slot for a job submitted later with ``reserved=True``; raises JobQueueFullError."""
+        if self.full:
+            raise JobQueueFullError("Assessment job queue is full")
+        self._reserved += 1
+
+    def release(self) -> None:
+        """Give back a reserved slot that will not be used."""
+        self._reserved -= 1
+
+    def submit(self, payload: Dict[str, Any], meta: Optional[Dict[str, Any]] = None,
+               reserved: bool = False) -> Dict[str, Any]:
+        """Enqueue a job; ``meta`` fields are stored on the job record for status responses."""
+        if self._queue is None:
+            self.start()
+        if reserved:
+            self._reserved -= 1
+        # A reservation always leaves room, unless the queue started closing since
+        if self.full:
+            raise JobQueueFullError("Assessment job queue is full")
+        self._prune()
+        job = {
+            **(meta or {}),
+            "job_id": str(uuid.uuid4()),
+            "status": QUEUED,
+            "result": None,
+            "error": None,
+            "submitted_at": time.time(),
+            "finished_at": None,
+        }
+        try:
+            self._queue.put_nowait((job["job_id"], payload))
+        except asyncio.QueueFull:
+            raise JobQueueFullError("Assessment job queue is full")
+        # Workers only run once the caller yields, so registering after the put is safe
+        self._jobs[job["job_id"]] = job
+        self._done[job["job_id"]] = asyncio.Event()
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._jobs.get(job_id)
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """Wait up to ``timeout`` seconds for a job to finish and return its state."""
+        done = self._done.get(job_id)
+        if done is not None and timeout > 0:
+            try:
+                await asyncio.wait_for(done.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.get(job_id)
+
+    async def _worker(self, worker_id: int) -> None:
+        while True:
+            job_id, payload = await self._queue.get()
+            job = self._jobs.get(job_id)
+            try:
+                if job is None:
+                    continue
+                job["status"] = RUNNING
+                job["result"] = await asyncio.wait_for(self._handler(payload), timeout=self.job_timeout)
+                job["status"] = COMPLETE
+            except asyncio.TimeoutError:
+                job["status"] = FAILED
+                job["error"] = f"Job timed out after {self.job_timeout}s"
+                logger.warning(f"Assessment job {job_id} timed out")
+            except Exception as e:
+                job["status"] = FAILED
+                job["error"] = str(e)
+                logger.error(f"Assessment job {job_id} failed: {e}")
+            finally:
+                if job is not None:
+                    job["finished_at"] = time.time()
+                    self._done[job_id].set()
+                self._queue.task_done()
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.result_ttl
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job["finished_at"] is not None and job["finished_at"] < cutoff]
+        for job_id in expired:
+            self._jobs.pop(job_id, None)
+            self._done.pop(job_id, None)
@@ -0,0 +1,156 @@
+"""Server-sent-events streaming of stage assessments.
+
+The model is asked for a flat JSON object whose fields come out in a useful
+order (stage, bottleneck, descriptions, ... personalized_insight).
+``IncrementalJsonFields`` consumes the token stream and reports each
+top-level field as soon as its value is complete, so the client can render
+the stage and bottleneck while the insight is still being generated.
+
+``assessment_sse`` produces the event stream:
+
+* ``provisional`` -- optional instant result (e.g. local scoring)
+* ``field`` -- ``{"name": ..., "value": ...}`` per completed model field
+* ``complete`` -- the final response returned by ``finalize`` (which
+  persists the lead and includes its ``lead_id``); it is authoritative over
+  earlier events
+
+If the token stream fails, times out or does not yield a complete object,
+``fallback()`` supplies the assessment and the stream still completes.
+"""
+import asyncio
+import json
+import logging
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def format_sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class IncrementalJsonFields:
+    """Incremental parser yielding the top-level fields of a streamed JSON object.
+
+    Anything before the opening brace (such as a markdown fence) and after
+    the closing brace is ignored.
+    """
+
+    def __init__(self):
+        self._buf = ""
+        self._pos = 0
+        self._started = False
+        self._done = False
+        self._depth = 0
+        self._in_str = False
+        self._escape = False
+        self._state = "key"
+        self._key: Optional[str] = None
+        self._key_start = 0
+        self._value_start = 0
+        self.fields: Dict[str, Any] = {}
+
+    @property
+    def done(self) -> bool:
+        return self._done
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Consume a chunk and return the fields completed by it."""
+        completed: List[Tuple[str, Any]] = []
+        self._buf += chunk
+        buf = self._buf
+        for i in range(self._pos, len(buf)):
+            c = buf[i]
+            if self._done:
+                break
+            if not self._started:
+                if c == "{":
+                    self._started = True
+                    self._depth = 1
+                continue
+            if self._in_str:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_str = False
+                    if self._depth == 1 and self._state == "key":
+                        self._key = json.loads(buf[self._key_start:i + 1])
+                        self._state = "colon"
+                continue
+            if c == '"':
+                self._in_str = True
+                if self._depth == 1 and self._state == "key":
+                    self._key_start = i
+            elif c in "{[":
+                self._depth += 1
+            elif c in "}]":
+                if self._depth == 1:
+                    if self._state == "value":
+                        completed.append(self._finish_value(i))
+                    self._done = True
+                self._depth -= 1
+            elif self._depth == 1 and c == ":" and self._state == "colon":
+                self._state = "value"
+                self._value_start = i + 1
+            elif self._depth == 1 and c == "," and self._state == "value":
+                completed.append(self._finish_value(i))
+                self._state = "key"
+        self._pos = len(buf)
+        return completed
+
+    def _finish_value(self, end: int) -> Tuple[str, Any]:
+        value = json.loads(self._buf[self._value_start:end].strip())
+        self.fields[self._key] = value
+        return self._key, value
+
+    def result(self) -> Dict[str, Any]:
+        if not self._done:
+            raise json.JSONDecodeError("Incomplete JSON object", self._buf, len(self._buf))
+        return dict(self.fields)
+
+
+async def assessment_sse(
+    tokens: Optional[AsyncIterator[str]],
+    fallback: Callable[[], Dict[str, Any]],
+    finalize: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+    provisional: Optional[Dict[str, Any]] = None,
+    timeout: Optional[float] = None,
+) -> AsyncIterator[str]:
+    """Yield SSE frames for one assessment; see the module docstring for events."""
+    if provisional is not None:
+        yield format_sse("provisional", provisional)
+
+    assessment = None
+    if tokens is not None:
+        parser = IncrementalJsonFields()
+        deadline = time.monotonic() + timeout if timeout else None
+        iterator = tokens.__aiter__()
+        try:
+            while not parser.done:
+                remaining = deadline - time.monotonic() if deadline else None
+                if remaining is not None and remaining <= 0:
+                    raise asyncio.TimeoutError()
+                try:
+                    chunk = await asyncio.wait_for(iterator.__anext__(), timeout=remaining)
+                except StopAsyncIteration:
+                    break
+                for name, value in parser.feed(chunk):
+                    yield format_sse("field", {"name": name, "value": value})
+            assessment = parser.result()
+        except asyncio.TimeoutError:
+            logger.warning(f"Streaming assessment timed out after {timeout}s, using fallback")
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to parse streamed AI response, using fallback: {e}")
+        except Exception as e:
+            logger.error(f"Streaming assessment error, using fallback: {e}")
+        finally:
+            aclose = getattr(iterator, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    if assessment is None:
+        assessment = fallback()
+    yield format_sse("complete", await finalize(assessment))
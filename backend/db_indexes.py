@@ -0,0 +1,263 @@
+"""Index plan and timestamp migration for the core collections.
+
+``INDEX_PLAN`` lists every index the API relies on; ``ensure_indexes``
+creates them at startup (``create_index`` is a no-op for existing indexes).
+The compound indexes put the equality filters used by ``GET /api/leads``
+first and the ``(created_at, id)`` page key last, so a filtered,
+newest-first page is a single bounded index scan with no in-memory sort,
+however deep the cursor. ``email_key`` (the normalized email) is unique,
+so upserts in the email dedup mode merge into a single lead; it is sparse
+because leads written without that mode do not carry it. Run
+``backfill_email_keys`` (``manage.py backfill-email-keys``) before turning
+that mode on, or leads written before it are never merged into.
+
+``status_checks`` is pruned by a TTL index on ``timestamp`` (the retention
+is passed to ``ensure_indexes``; changing it updates the existing index in
+place), and ``(client_name, timestamp)`` serves the latest-per-client and
+tail queries.
+
+Raw scroll events can be stored in a MongoDB (6.0+) time-series
+collection instead of one regular document per event
+(``SCROLL_EVENTS_LAYOUT=timeseries``). With ``metaField: "page"`` and
+``granularity: "seconds"``, Mongo packs each page's events into hourly
+buckets. That shrinks storage and the indexes, and lets a ``$match`` on
+``timestamp`` skip whole buckets. Inserts and queries are unchanged, so
+ingest, scroll stats, exports and the rollup/session backfills read it
+transparently. ``ensure_scroll_events_layout`` creates the collection
+before any index is built. ``convert_scroll_events_to_timeseries``
+moves an existing regular collection over.
+
+Raw scroll events expire after ``SCROLL_EVENT_RETENTION_DAYS`` when it is
+set (see ``scroll_archive.py`` for the cold archive that keeps them
+queryable); ``ensure_scroll_event_retention`` manages the TTL for either layout.
+
+Timestamps are stored as native BSON dates. ``migrate_string_timestamps``
+converts documents written before that (ISO strings) in batches; it only
+selects documents whose field is still a string, so it can be interrupted
+and re-run safely.
+"""
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import OperationFailure
+
+from scroll_rollups import ensure_rollup_indexes
+from scroll_sessions import ensure_session_indexes
+
+logger = logging.getLogger(__name__)
+
+INDEX_PLAN: Dict[str, List[Dict]] = {
+    "leads": [
+        {"keys": [("id", ASCENDING)], "unique": True},
+        {"keys": [("created_at", DESCENDING), ("id", DESCENDING)]},
+        {"keys": [("status", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)]},
+        {"keys": [("stage", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)]},
+        {"keys": [("service_interest", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)]},
+        {"keys": [("email", ASCENDING)]},
+        # Only leads written with LEAD_DEDUP_BY_EMAIL carry email_key
+        {"keys": [("email_key", ASCENDING)], "unique": True, "sparse": True},
+    ],
+    "scroll_events": [
+        # The timestamp index is created by ensure_scroll_event_retention
+        {"keys": [("page", ASCENDING), ("timestamp", ASCENDING)]},
+        {"keys": [("session_id", ASCENDING), ("timestamp", ASCENDING)]},
+    ],
+    "status_checks": [
+        {"keys": [("client_name", ASCENDING), ("timestamp", DESCENDING)]},
+    ],
+}
+
+# MongoDB's error code for an existing index with the same keys but other options
+INDEX_OPTIONS_CONFLICT = 85
+
+TIMESTAMP_FIELDS: List[Tuple[str, str]] = [
+    ("leads", "created_at"),
+    ("scroll_events", "timestamp"),
+    ("status_checks", "timestamp"),
+]
+
+
+SCROLL_EVENTS_LAYOUTS = ("documents", "timeseries")
+SCROLL_EVENTS_TIMESERIES = {"timeField": "timestamp", "metaField": "page", "granularity": "seconds"}
+LEGACY_SCROLL_EVENTS = "scroll_events_legacy"
+
+
+async def ensure_indexes(db, status_check_retention_days: int = 30, scroll_events_layout: str = "documents",
+                         scroll_event_retention_days: int = 0) -> None:
+    # Before create_index, which would create scroll_events as a regular collection
+    await ensure_scroll_events_layout(db, scroll_events_layout)
+    for collection, indexes in INDEX_PLAN.items():
+        for index in indexes:
+            options = {key: value for key, value in index.items() if key != "keys"}
+            await db[collection].create_index(index["keys"], **options)
+    await ensure_ttl_index(db, "status_checks", "timestamp", status_check_retention_days * 86400)
+    await ensure_scroll_event_retention(db, scroll_events_layout, scroll_event_retention_days)
+    await ensure_rollup_indexes(db)
+    await ensure_session_indexes(db)
+
+
+async def ensure_ttl_index(db, collection: str, field: str, expire_after_seconds: int) -> None:
+    """Create a TTL index on ``field``, or change the expiry of the existing one."""
+    name = f"{field}_ttl"
+    try:
+        await db[collection].create_index(field, name=name, expireAfterSeconds=expire_after_seconds)
+    except OperationFailure as e:
+        if e.code != INDEX_OPTIONS_CONFLICT:
+            raise
+        await db.command("collMod", collection, index={"name": name, "expireAfterSeconds": expire_after_seconds})
+        logger.info(f"Changed {collection}.{field} TTL to {expire_after_seconds}s")
+
+
+async def _collection_info(db, name: str) -> Optional[Dict]:
+    infos = await db.list_collections(filter={"name": name}).to_list(1)
+    return infos[0] if infos else None
+
+
+async def ensure_scroll_events_layout(db, layout: str) -> None:
+    if layout != "timeseries":
+        return
+    info = await _collection_info(db, "scroll_events")
+    if info is None:
+        await db.create_collection("scroll_events", timeseries=SCROLL_EVENTS_TIMESERIES)
+        logger.info("Created scroll_events as a time-series collection")
+    elif info.get("type") != "timeseries":
+        logger.warning("scroll_events is a regular collection; run `manage.py convert-scroll-events` to bucket it")
+
+
+async def convert_scroll_events_to_timeseries(db, batch_size: int = 1000) -> int:
+    """Move a regular ``scroll_events`` collection into a new time-series one.
+
+    The old collection is renamed to ``scroll_events_legacy`` and copied
+    over in batches, and is left in place for the operator to drop. Run
+    ``migrate-timestamps`` first, since a time-series ``timeField`` must be
+    a date. Stop scroll ingest while this runs: events written between the
+    rename and the create would land in a regular collection.
+    """
+    info = await _collection_info(db, "scroll_events")
+    if info is not None and info.get("type") == "timeseries":
+        return 0
+    if await _collection_info(db, LEGACY_SCROLL_EVENTS) is not None:
+        raise RuntimeError(f"{LEGACY_SCROLL_EVENTS} already exists; drop it or finish the earlier conversion first")
+    if info is not None:
+        await db.scroll_events.rename(LEGACY_SCROLL_EVENTS)
+    await db.create_collection("scroll_events", timeseries=SCROLL_EVENTS_TIMESERIES)
+    if info is None:
+        return 0
+
+    copied = 0
+    batch: List[Dict] = []
+    async for doc in db[LEGACY_SCROLL_EVENTS].find({}, {"_id": 0}).batch_size(batch_size):
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            await db.scroll_events.insert_many(batch, ordered=False)
+            copied += len(batch)
+            batch = []
+            logger.info(f"Copied {copied} scroll events so far")
+    if batch:
+        await db.scroll_events.insert_many(batch, ordered=False)
+        copied += len(batch)
+    return copied
+
+
+async def _drop_index_if_exists(db, collection: str, name: str) -> None:
+    if name in await db[collection].index_information():
+        await db[collection].drop_index(name)
+        logger.info(f"Dropped index {collection}.{name}")
+
+
+async def ensure_scroll_event_retention(db, layout: str, retention_days: int) -> None:
+    """Expire raw scroll events after ``retention_days`` (0 keeps them forever).
+
+    A regular collection swaps its plain ``timestamp`` index for a TTL index
+    on the same key. A time-series collection keeps the plain index and sets
+    the collection's ``expireAfterSeconds`` instead.
+    """
+    if layout == "timeseries":
+        await db.scroll_events.create_index([("timestamp", ASCENDING)])
+        await db.command("collMod", "scroll_events",
+                         expireAfterSeconds=retention_days * 86400 if retention_days > 0 else "off")
+    elif retention_days > 0:
+        await _drop_index_if_exists(db, "scroll_events", "timestamp_1")
+        await ensure_ttl_index(db, "scroll_events", "timestamp", retention_days * 86400)
+    else:
+        await _drop_index_if_exists(db, "scroll_events", "timestamp_ttl")
+        await db.scroll_events.create_index([("timestamp", ASCENDING)])
+
+
+def parse_timestamp(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+async def migrate_string_timestamps(db, collection: str, field: str, batch_size: int = 1000) -> Dict[str, int]:
+    """Convert ``field`` from ISO strings to BSON dates, one ``_id``-ordered batch at a time."""
+    converted = 0
+    skipped = 0
+    last_id = None
+    while True:
+        query = {field: {"$type": "string"}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = await db[collection].find(query, {field: 1}).sort("_id", ASCENDING).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+        operations = []
+        for doc in batch:
+            try:
+                parsed = parse_timestamp(doc[field])
+            except ValueError:
+                skipped += 1
+                logger.warning(f"Skipping {collection} {doc['_id']}: unparseable {field} {doc[field]!r}")
+                continue
+            # Match the original string so a concurrent rewrite is never clobbered
+            operations.append(UpdateOne({"_id": doc["_id"], field: doc[field]}, {"$set": {field: parsed}}))
+        if operations:
+            result = await db[collection].bulk_write(operations, ordered=False)
+            converted += result.modified_count
+        last_id = batch[-1]["_id"]
+        logger.info(f"Migrated {converted} {collection}.{field} values so far")
+    return {"converted": converted, "skipped": skipped}
+
+
+async def backfill_email_keys(db, batch_size: int = 1000) -> Dict[str, Any]:
+    """Set ``email_key`` on leads written without the email dedup mode, so later submissions merge into them.
+
+    The unique index allows one keyed lead per normalized email. When several
+    leads share one, the lead that already has the key, or else the oldest,
+    gets it; the others are left unkeyed and returned as collisions
+    (normalized email -> lead ids) to be merged or removed by hand.
+    """
+    from storage import email_key
+
+    leads: Dict[str, List[Dict]] = {}
+    cursor = db.leads.find({"email": {"$type": "string"}}, {"_id": 0, "id": 1, "email": 1, "email_key": 1})
+    async for lead in cursor.sort([("created_at", ASCENDING), ("id", ASCENDING)]).batch_size(batch_size):
+        key = email_key(lead["email"])
+        if key:
+            leads.setdefault(key, []).append(lead)
+
+    keyed = 0
+    collisions: Dict[str, List[str]] = {}
+    operations = []
+    for key, group in leads.items():
+        owner = next((lead for lead in group if lead.get("email_key") == key), group[0])
+        if "email_key" not in owner:
+            operations.append(UpdateOne(
+                {"id": owner["id"], "email_key": {"$exists": False}},
+                {"$set": {"email_key": key}, "$max": {"submissions": 1}},
+            ))
+        others = [lead["id"] for lead in group if lead is not owner]
+        if others:
+            collisions[key] = others
+        if len(operations) >= batch_size:
+            keyed += (await db.leads.bulk_write(operations, ordered=False)).modified_count
+            operations = []
+    if operations:
+        keyed += (await db.leads.bulk_write(operations, ordered=False)).modified_count
+    if collisions:
+        logger.warning(f"{len(collisions)} emails belong to more than one lead; only one lead each was keyed")
+    return {"keyed": keyed, "collisions": collisions}
@@ -0,0 +1,102 @@
+"""Streaming bulk export of stored documents as NDJSON or CSV.
+
+``export_stream`` reads documents from an async iterator (a Motor cursor
+with a bounded ``batch_size``, or an in-memory store) and yields one
+encoded chunk per batch as it goes, so the response body is produced in
+constant memory regardless of how many documents match: at most one cursor
+batch plus one encoded chunk is held at a time. Documents are written as stored (no
+response-model validation); ``fields`` fixes the CSV columns, and nested
+values (quiz answers, assessments) are JSON-encoded inside their CSV cell.
+
+With ``gzip=True`` the chunks are compressed on the fly with a single
+streaming zlib compressor in gzip framing.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Sequence
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+LEAD_EXPORT_FIELDS = (
+    "id", "created_at", "name", "email", "phone", "company", "stage",
+    "service_interest", "source_page", "status", "message",
+    "quiz_answers", "ai_assessment",
+)
+
+SCROLL_EVENT_EXPORT_FIELDS = (
+    "id", "timestamp", "page", "section", "section_index", "total_sections",
+    "session_id", "viewport_height", "client_timestamp",
+)
+
+
+class ExportFormatError(ValueError):
+    """Raised for an unsupported export format."""
+
+
+def _json_default(value: Any) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _csv_cell(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=_json_default)
+    return value
+
+
+def _encode_batch(docs: Sequence[Dict[str, Any]], fields: Sequence[str], fmt: str) -> str:
+    if fmt == "ndjson":
+        return "".join(json.dumps(doc, default=_json_default) + "\n" for doc in docs)
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerows([_csv_cell(doc.get(field)) for field in fields] for doc in docs)
+    return out.getvalue()
+
+
+def _csv_header(fields: Sequence[str]) -> str:
+    out = io.StringIO()
+    csv.writer(out).writerow(fields)
+    return out.getvalue()
+
+
+async def export_stream(documents: AsyncIterator[Dict[str, Any]], fields: Sequence[str], fmt: str,
+                        batch_size: int = 1000, gzip: bool = False) -> AsyncIterator[bytes]:
+    """Yield ``documents`` as encoded (optionally gzipped) chunks, one per ``batch_size`` documents."""
+    if fmt not in EXPORT_FORMATS:
+        raise ExportFormatError(f"Unsupported export format: {fmt}")
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if gzip else None
+
+    def encode(text: str) -> bytes:
+        data = text.encode("utf-8")
+        return compressor.compress(data) if compressor else data
+
+    if fmt == "csv":
+        chunk = encode(_csv_header(fields))
+        if chunk:
+            yield chunk
+
+    batch = []
+    async for doc in documents:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            chunk = encode(_encode_batch(batch, fields, fmt))
+            batch = []
+            if chunk:
+                yield chunk
+    if batch:
+        chunk = encode(_encode_batch(batch, fields, fmt))
+        if chunk:
+            yield chunk
+    if compressor:
+        yield compressor.flush()
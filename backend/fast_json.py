@@ -0,0 +1,58 @@
+"""Fast-path JSON responses for list endpoints that return stored documents.
+
+When a FastAPI endpoint returns a dict, it validates the dict against
+``response_model`` again and then serializes the result with the stdlib
+encoder. For documents we wrote ourselves through the same models, that
+validation is pure overhead. ``TrustedJSONResponse`` writes documents
+straight out with orjson, which encodes datetimes natively. Endpoints keep
+their ``response_model``, so the OpenAPI schema does not change.
+
+``model_defaults`` gives a model's field defaults, so that documents
+missing optional fields (older rows, or excluded by a projection) can be
+filled in with a single dict merge. They then keep the same keys the
+validated response would have had.
+
+orjson is optional; without it, the stdlib encoder is used with the same
+datetime format.
+"""
+import json
+from datetime import datetime
+from typing import Any, Dict, Type
+
+from pydantic import BaseModel
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson installed
+    orjson = None
+
+
+def _default(value: Any) -> str:
+    if isinstance(value, datetime):
+        if value.tzinfo is not None and value.utcoffset().total_seconds() == 0:
+            # Match pydantic's and orjson's OPT_UTC_Z rendering of UTC datetimes
+            return value.replace(tzinfo=None).isoformat() + "Z"
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class TrustedJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def model_defaults(model: Type[BaseModel]) -> Dict[str, Any]:
+    """Static field defaults of ``model``; fields with a factory or no default map to None."""
+    return {
+        name: field.default if not field.is_required() and field.default_factory is None else None
+        for name, field in model.model_fields.items()
+    }
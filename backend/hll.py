@@ -0,0 +1,99 @@
+"""HyperLogLog sketches for approximate distinct-session counting.
+
+A sketch with precision ``p`` keeps ``m = 2**p`` one-byte registers. With
+the default ``p = 12`` (4096 registers) the relative standard error of
+``count()`` is ``1.04 / sqrt(m)`` ~= 1.6%, so about 95% of estimates fall
+within +/-3.3% of the true cardinality. Small cardinalities are corrected
+with linear counting and are typically exact or off by one.
+
+Sketches merge by taking the register-wise maximum, which costs O(m)
+regardless of how many sessions were added, so daily sketches can be
+combined for any window. ``to_bytes`` stores the registers zlib-compressed;
+sparse sketches (the common case for a single section on a single day)
+serialize to a few dozen bytes. ``to_registers`` gives the non-zero
+registers as a ``{index: rank}`` map instead, which a database can merge
+in place with a per-register maximum.
+"""
+import hashlib
+import math
+import zlib
+from typing import Dict, Iterable, Mapping, Optional
+
+DEFAULT_PRECISION = 12
+FORMAT_VERSION = 1
+
+
+def standard_error(precision: int = DEFAULT_PRECISION) -> float:
+    """Relative standard error of an estimate for the given precision."""
+    return 1.04 / math.sqrt(1 << precision)
+
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class HyperLogLog:
+    def __init__(self, precision: int = DEFAULT_PRECISION, registers: Optional[bytearray] = None):
+        if not 4 <= precision <= 16:
+            raise ValueError("precision must be between 4 and 16")
+        self.precision = precision
+        self.m = 1 << precision
+        if registers is not None and len(registers) != self.m:
+            raise ValueError("register count does not match precision")
+        self.registers = registers if registers is not None else bytearray(self.m)
+
+    def add(self, value: str) -> None:
+        h = _hash64(value)
+        index = h >> (64 - self.precision)
+        remainder = h & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - remainder.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values: Iterable[str]) -> None:
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: "HyperLogLog") -> None:
+        if other.precision != self.precision:
+            raise ValueError("cannot merge sketches with different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self) -> int:
+        m = self.m
+        if m == 16:
+            alpha = 0.673
+        elif m == 32:
+            alpha = 0.697
+        elif m == 64:
+            alpha = 0.709
+        else:
+            alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def to_bytes(self) -> bytes:
+        return bytes([FORMAT_VERSION, self.precision]) + zlib.compress(bytes(self.registers))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        if len(data) < 2 or data[0] != FORMAT_VERSION:
+            raise ValueError("unsupported HyperLogLog serialization")
+        return cls(precision=data[1], registers=bytearray(zlib.decompress(data[2:])))
+
+    def to_registers(self) -> Dict[str, int]:
+        """Non-zero registers keyed by their index as a string (a valid document field name)."""
+        return {str(index): rank for index, rank in enumerate(self.registers) if rank}
+
+    @classmethod
+    def from_registers(cls, registers: Mapping[str, int], precision: int = DEFAULT_PRECISION) -> "HyperLogLog":
+        sketch = cls(precision)
+        for index, rank in registers.items():
+            sketch.registers[int(index)] = rank
+        return sketch
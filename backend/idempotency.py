@@ -0,0 +1,178 @@
+"""Idempotency keys for the endpoints that create leads.
+
+A client that sends ``Idempotency-Key: <key>`` with ``POST /api/leads`` or
+``POST /api/stage-assessment`` gets the first response replayed for every
+repeat of that request, marked ``Idempotent-Replayed: true``. Repeats
+include retries after a slow response and double submits. A repeat costs
+one ``_id`` lookup, instead of a lead write plus, for assessments, an LLM
+call.
+
+Keys are scoped per endpoint, and each record stores a fingerprint of the
+request body:
+
+* The first request claims the key by inserting its record. ``_id`` is
+  unique, so concurrent claims from several workers cannot both win.
+* When the handler succeeds, its status code and JSON body are stored on
+  the record. When it fails, the claim is released, so a retry runs again.
+* A repeat that arrives while the first request is still running polls
+  until that request finishes, for up to ``wait_seconds``. After that it
+  gets a 409 with ``Retry-After``.
+* Reusing a key with a different request body is a 422.
+
+A claim older than ``pending_timeout`` is treated as abandoned (its worker
+died) and can be taken over.
+
+Records live in the ``idempotency_keys`` collection, TTL-indexed on
+``expires_at``. Without a database they are kept in process.
+"""
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from pymongo.errors import DuplicateKeyError
+
+MAX_KEY_LENGTH = 255
+PENDING = "pending"
+COMPLETE = "complete"
+
+Handler = Callable[[], Awaitable[Tuple[int, Any]]]
+
+
+class IdempotencyError(ValueError):
+    """A request whose Idempotency-Key cannot be honoured; maps to an HTTP error."""
+
+    def __init__(self, status_code: int, detail: str, headers: Optional[Dict[str, str]] = None):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.headers = headers
+
+
+def request_fingerprint(payload: Any) -> str:
+    encoded = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def _now() -> datetime:
+    # BSON dates have millisecond precision; claimed_at is matched exactly on release
+    now = datetime.now(timezone.utc)
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+
+def _aware(value: datetime) -> datetime:
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+class IdempotencyKeys:
+    def __init__(self, ttl_seconds: float = 24 * 3600, wait_seconds: float = 10, pending_timeout: float = 120,
+                 collection=None):
+        self.ttl_seconds = ttl_seconds
+        self.wait_seconds = wait_seconds
+        self.pending_timeout = pending_timeout
+        self.collection = collection
+        self._records: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.replays = 0
+
+    async def ensure_indexes(self) -> None:
+        if self.collection is not None:
+            await self.collection.create_index('expires_at', expireAfterSeconds=0)
+
+    async def run(self, scope: str, key: str, payload: Any, handler: Handler) -> Tuple[int, Any, bool]:
+        """``(status_code, body, replayed)`` for the request ``payload`` sent to ``scope`` with ``key``.
+
+        ``handler`` runs only if no earlier request with this key succeeded.
+        It returns the status code and a JSON-compatible body.
+        """
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise IdempotencyError(400, f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters")
+        record_id = f"{scope}:{key}"
+        fingerprint = request_fingerprint(payload)
+        deadline = time.monotonic() + self.wait_seconds
+        delay = 0.05
+        while True:
+            now = _now()
+            claim = {
+                "_id": record_id,
+                "fingerprint": fingerprint,
+                "status": PENDING,
+                "claimed_at": now,
+                "expires_at": now + timedelta(seconds=self.ttl_seconds),
+            }
+            record = await self._claim(claim)
+            if record is None:
+                break
+            if record["fingerprint"] != fingerprint:
+                raise IdempotencyError(422, "Idempotency-Key was already used with a different request")
+            if record["status"] == COMPLETE:
+                self.replays += 1
+                return record["status_code"], record["body"], True
+            if (now - _aware(record["claimed_at"])).total_seconds() > self.pending_timeout:
+                await self._release(record_id, record["claimed_at"])
+                continue
+            if time.monotonic() >= deadline:
+                raise IdempotencyError(409, "A request with this Idempotency-Key is still in progress",
+                                       headers={"Retry-After": "1"})
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.5)
+
+        try:
+            status_code, body = await handler()
+        except BaseException:
+            await asyncio.shield(self._release(record_id, claim["claimed_at"]))
+            raise
+        await self._complete(record_id, claim["claimed_at"], status_code, body)
+        return status_code, body, False
+
+    async def _claim(self, claim: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Insert ``claim``; None if it was inserted, otherwise the live record holding the key."""
+        if self.collection is None:
+            return self._claim_local(claim)
+        while True:
+            try:
+                await self.collection.insert_one(claim)
+                return None
+            except DuplicateKeyError:
+                record = await self.collection.find_one({"_id": claim["_id"]})
+            if record is None:
+                # Released or expired between the insert and the read
+                continue
+            if _aware(record["expires_at"]) <= claim["claimed_at"]:
+                # Expired, but not yet removed by the TTL monitor
+                await self._release(claim["_id"], record["claimed_at"])
+                continue
+            return record
+
+    def _claim_local(self, claim: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        now = claim["claimed_at"]
+        # Records are kept in claim order and share one TTL, so the expired ones are at the front
+        while self._records:
+            oldest = next(iter(self._records.values()))
+            if oldest["expires_at"] > now:
+                break
+            self._records.popitem(last=False)
+        record = self._records.get(claim["_id"])
+        if record is not None:
+            return dict(record)
+        self._records[claim["_id"]] = dict(claim)
+        return None
+
+    async def _complete(self, record_id: str, claimed_at: datetime, status_code: int, body: Any) -> None:
+        values = {"status": COMPLETE, "status_code": status_code, "body": body}
+        if self.collection is None:
+            record = self._records.get(record_id)
+            if record is not None and record["claimed_at"] == claimed_at:
+                record.update(values)
+            return
+        await self.collection.update_one({"_id": record_id, "claimed_at": claimed_at}, {"$set": values})
+
+    async def _release(self, record_id: str, claimed_at: datetime) -> None:
+        """Drop a claim, unless another request has taken the key over since."""
+        if self.collection is None:
+            record = self._records.get(record_id)
+            if record is not None and record["claimed_at"] == claimed_at:
+                del self._records[record_id]
+            return
+        await self.collection.delete_one({"_id": record_id, "claimed_at": claimed_at})
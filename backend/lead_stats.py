@@ -0,0 +1,104 @@
+"""Lead dashboard statistics.
+
+``compute_lead_stats`` gathers every figure the dashboard shows in one
+``$facet`` aggregation, i.e. a single round trip and a single pass over
+``leads``; ``format_lead_stats`` shapes raw counts (from Mongo or the
+in-memory store) into the response. ``LeadStatsCache`` keeps the result for ``ttl_seconds`` so
+dashboard polling is served from memory. Concurrent misses share one
+aggregation. Lead writes in this process call ``invalidate()``, which bumps
+a generation counter: a refresh from an older generation is neither cached
+nor shared with requests made after the write. Writes made by other
+workers show up once the TTL expires.
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+def lead_stats_pipeline(since: datetime) -> list:
+    def group_by(field: str) -> list:
+        return [{"$group": {"_id": f"${field}", "count": {"$sum": 1}}}]
+
+    return [
+        {"$facet": {
+            "total": [{"$count": "count"}],
+            "recent": [{"$match": {"created_at": {"$gte": since}}}, {"$count": "count"}],
+            "by_service": group_by("service_interest"),
+            "by_stage": group_by("stage"),
+            "by_status": group_by("status"),
+        }}
+    ]
+
+
+def recent_cutoff(recent_days: int = 7) -> datetime:
+    return datetime.now(timezone.utc) - timedelta(days=recent_days)
+
+
+def format_lead_stats(total: int, recent: int, by_service: Dict[Any, int], by_stage: Dict[Any, int],
+                      by_status: Dict[Any, int]) -> Dict[str, Any]:
+    """Response body from raw counts keyed by field value (None for missing)."""
+    return {
+        "total": total,
+        "recent_7_days": recent,
+        "by_service": {value or "Unknown": count for value, count in by_service.items()},
+        "by_stage": {value or "Unknown": count for value, count in by_stage.items()},
+        "by_status": {value or "New": count for value, count in by_status.items()},
+    }
+
+
+async def compute_lead_stats(collection, recent_days: int = 7) -> Dict[str, Any]:
+    facets = (await collection.aggregate(lead_stats_pipeline(recent_cutoff(recent_days))).to_list(1))[0]
+
+    def count(facet: str) -> int:
+        return facets[facet][0]["count"] if facets[facet] else 0
+
+    def groups(facet: str) -> Dict[Any, int]:
+        return {item["_id"]: item["count"] for item in facets[facet]}
+
+    return format_lead_stats(count("total"), count("recent"), groups("by_service"), groups("by_stage"),
+                             groups("by_status"))
+
+
+class LeadStatsCache:
+    def __init__(self, compute: Callable[[], Awaitable[Dict[str, Any]]], ttl_seconds: float = 10.0):
+        self._compute = compute
+        self.ttl_seconds = ttl_seconds
+        self._value: Optional[Dict[str, Any]] = None
+        self._expires_at = 0.0
+        self._generation = 0
+        self._pending: Optional[asyncio.Future] = None
+        self._pending_generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._value = None
+
+    async def get(self) -> Dict[str, Any]:
+        if self._value is not None and time.monotonic() < self._expires_at:
+            self.hits += 1
+            return self._value
+        self.misses += 1
+        # A refresh started before the last invalidate() may already have read stale counts
+        if self._pending is None or self._pending_generation != self._generation:
+            self._pending_generation = self._generation
+            self._pending = asyncio.ensure_future(self._refresh())
+            self._pending.add_done_callback(self._clear_pending)
+        return await asyncio.shield(self._pending)
+
+    def _clear_pending(self, future: asyncio.Future) -> None:
+        if self._pending is future:
+            self._pending = None
+        # Retrieve the exception even if every waiter was cancelled
+        future.cancelled() or future.exception()
+
+    async def _refresh(self) -> Dict[str, Any]:
+        generation = self._generation
+        value = await self._compute()
+        # Don't cache a result that a concurrent write has already made stale
+        if generation == self._generation:
+            self._value = value
+            self._expires_at = time.monotonic() + self.ttl_seconds
+        return value
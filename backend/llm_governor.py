@@ -0,0 +1,230 @@
+"""Governor for upstream LLM calls.
+
+Every LLM call goes through one ``LLMGovernor``, which provides:
+
+* a concurrency cap (semaphore) on in-flight upstream calls,
+* a per-call deadline that includes the wait for a concurrency slot,
+* a circuit breaker that opens when the failure rate over the last
+  ``window_seconds`` reaches ``failure_threshold`` (with at least
+  ``min_calls`` calls), rejects calls for ``cooldown_seconds`` and then
+  lets a single trial call through (half-open) before closing again,
+* single-flight coalescing: callers passing the same key while a call for
+  it is in flight share that call's result instead of making another one.
+
+``stats()`` exposes counters for calls, failures, timeouts, rejections,
+trips, coalesced hits, in-flight calls and recent latency percentiles.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised when the circuit breaker is rejecting calls."""
+
+
+class _Attempt:
+    """One admitted call: whether it holds the half-open trial, and when it got a slot."""
+
+    __slots__ = ("trial", "started")
+
+    def __init__(self, trial: bool):
+        self.trial = trial
+        self.started: Optional[float] = None
+
+
+class LLMGovernor:
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        timeout: float = 30.0,
+        failure_threshold: float = 0.5,
+        min_calls: int = 10,
+        window_seconds: float = 60.0,
+        cooldown_seconds: float = 30.0,
+        latency_samples: int = 1000,
+    ):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+        self._latencies: Deque[float] = deque(maxlen=latency_samples)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trial_running = False
+        self.counters = {
+            "calls": 0,
+            "successes": 0,
+            "failures": 0,
+            "timeouts": 0,
+            "rejected": 0,
+            "trips": 0,
+            "coalesced": 0,
+        }
+        self.in_flight = 0
+        self.latency_total = 0.0
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.cooldown_seconds:
+            return HALF_OPEN
+        return self._state
+
+    async def call(self, key: Optional[str], factory: Callable[[], Awaitable[T]], timeout: Optional[float] = None) -> T:
+        """Run ``factory()`` under the governor; identical in-flight keys share one call.
+
+        The deadline covers waiting for a concurrency slot as well as the call.
+        """
+        if key is not None:
+            shared = self._inflight.get(key)
+            if shared is not None:
+                self.counters["coalesced"] += 1
+                return await asyncio.shield(shared)
+
+        attempt = _Attempt(self._admit())
+        task = asyncio.ensure_future(self._execute(factory, timeout, attempt))
+        if key is not None:
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Retrieve the exception even if every waiter was cancelled
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return await asyncio.shield(task)
+
+    async def stream(self, factory: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+        """Iterate a streaming call under the concurrency cap and circuit breaker.
+
+        The caller is responsible for the deadline (it spans many chunks).
+        """
+        attempt = _Attempt(self._admit())
+        ok = timed_out = False
+        try:
+            async with self._semaphore:
+                attempt.started = self._begin()
+                async for chunk in factory():
+                    yield chunk
+            ok = True
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            timed_out = True
+            raise
+        except GeneratorExit:
+            # The consumer stopped early because it had everything it needed
+            ok = True
+            raise
+        finally:
+            self._finish(attempt, ok, timed_out)
+
+    async def _execute(self, factory: Callable[[], Awaitable[T]], timeout: Optional[float], attempt: "_Attempt") -> T:
+        ok = timed_out = False
+        try:
+            result = await asyncio.wait_for(self._run(factory, attempt), timeout=timeout or self.timeout)
+            ok = True
+            return result
+        except asyncio.TimeoutError:
+            timed_out = True
+            if attempt.started is None:
+                # Timed out waiting for a slot: shed, not an upstream failure
+                self.counters["rejected"] += 1
+            raise
+        finally:
+            self._finish(attempt, ok, timed_out)
+
+    async def _run(self, factory: Callable[[], Awaitable[T]], attempt: "_Attempt") -> T:
+        async with self._semaphore:
+            attempt.started = self._begin()
+            return await factory()
+
+    def _admit(self) -> bool:
+        """Raise CircuitOpenError if the call may not run; True if it is the half-open trial."""
+        state = self.state
+        if state == OPEN or (state == HALF_OPEN and self._trial_running):
+            self.counters["rejected"] += 1
+            raise CircuitOpenError("LLM circuit breaker is open")
+        if state == HALF_OPEN:
+            self._trial_running = True
+            return True
+        return False
+
+    def _begin(self) -> float:
+        self.counters["calls"] += 1
+        self.in_flight += 1
+        return time.monotonic()
+
+    def _finish(self, attempt: "_Attempt", ok: bool, timed_out: bool = False) -> None:
+        """Record how an admitted call ended; also when it never got a slot, to hand back the trial."""
+        if attempt.started is None:
+            if attempt.trial:
+                # The next call becomes the trial
+                self._trial_running = False
+            return
+        now = time.monotonic()
+        elapsed = now - attempt.started
+        self.in_flight -= 1
+        self._latencies.append(elapsed)
+        self.latency_total += elapsed
+        self.counters["successes" if ok else "failures"] += 1
+        if timed_out:
+            self.counters["timeouts"] += 1
+
+        if attempt.trial:
+            self._trial_running = False
+            if ok:
+                self._state = CLOSED
+                self._outcomes.clear()
+            else:
+                self._trip(now)
+            return
+        if self._state != CLOSED:
+            # Admitted before the breaker tripped; only the trial decides what happens next
+            return
+
+        self._outcomes.append((now, ok))
+        while self._outcomes and self._outcomes[0][0] < now - self.window_seconds:
+            self._outcomes.popleft()
+        if len(self._outcomes) >= self.min_calls:
+            failures = sum(1 for _, success in self._outcomes if not success)
+            if failures / len(self._outcomes) >= self.failure_threshold:
+                self._trip(now)
+
+    def _trip(self, now: float) -> None:
+        self._state = OPEN
+        self._opened_at = now
+        self._outcomes.clear()
+        self.counters["trips"] += 1
+        logger.warning(f"LLM circuit breaker opened for {self.cooldown_seconds}s")
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = sorted(self._latencies)
+
+        def percentile(q: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(int(q * len(latencies)), len(latencies) - 1)], 4)
+
+        return {
+            **self.counters,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "state": self.state,
+            "latency_seconds": {
+                "total": round(self.latency_total, 4),
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "p99": percentile(0.99),
+                "samples": len(latencies),
+            },
+        }
@@ -0,0 +1,184 @@
+"""Maintenance commands for the FounderPlane backend.
+
+Usage (from the backend directory):
+    python manage.py rebuild-scroll-rollups [--since YYYY-MM-DD]
+    python manage.py collapse-scroll-events [--batch-size N]
+    python manage.py convert-scroll-events [--batch-size N]
+    python manage.py archive-scroll-events [--older-than-days N] [--archive-dir PATH]
+    python manage.py ensure-indexes
+    python manage.py migrate-timestamps [--batch-size N]
+    python manage.py backfill-email-keys [--batch-size N]
+"""
+import asyncio
+import os
+from pathlib import Path
+from typing import Optional
+
+import typer
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+import db_indexes
+import scroll_archive
+import scroll_rollups
+import scroll_sessions
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+cli = typer.Typer(help="FounderPlane backend maintenance commands")
+
+
+@cli.callback()
+def main():
+    """FounderPlane backend maintenance commands."""
+
+
+def get_db():
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    return client, client[os.environ['DB_NAME']]
+
+
+@cli.command("rebuild-scroll-rollups")
+def rebuild_scroll_rollups(
+    since: Optional[str] = typer.Option(None, help="Only rebuild days on or after this UTC day (YYYY-MM-DD)"),
+    batch_size: int = typer.Option(1000, help="Raw events folded per batch"),
+):
+    """Backfill scroll_rollups from the raw scroll_events collection; stop scroll ingest first."""
+    async def run():
+        client, db = get_db()
+        try:
+            await scroll_rollups.ensure_rollup_indexes(db)
+            processed = await scroll_rollups.rebuild_rollups(db, since_day=since, batch_size=batch_size)
+            typer.echo(f"Rebuilt rollups from {processed} events")
+        finally:
+            client.close()
+
+    asyncio.run(run())
+
+
+@cli.command("collapse-scroll-events")
+def collapse_scroll_events(
+    batch_size: int = typer.Option(1000, help="Raw events folded per batch"),
+):
+    """Build scroll_sessions from raw scroll_events before switching to SCROLL_STORAGE_MODE=sessions."""
+    async def run():
+        client, db = get_db()
+        try:
+            await scroll_sessions.ensure_session_indexes(db)
+            processed = await scroll_sessions.collapse_events(db, batch_size=batch_size)
+            sessions = await db[scroll_sessions.SESSIONS].count_documents({})
+            typer.echo(f"Collapsed {processed} events into {sessions} session documents")
+        finally:
+            client.close()
+
+    asyncio.run(run())
+
+
+@cli.command("ensure-indexes")
+def ensure_indexes():
+    """Create every index in the index plan."""
+    async def run():
+        client, db = get_db()
+        try:
+            await db_indexes.ensure_indexes(
+                db,
+                int(os.environ.get('STATUS_CHECK_RETENTION_DAYS', '30')),
+                os.environ.get('SCROLL_EVENTS_LAYOUT', 'documents'),
+                int(os.environ.get('SCROLL_EVENT_RETENTION_DAYS', '0')),
+            )
+            typer.echo("Indexes are up to date")
+        finally:
+            client.close()
+
+    asyncio.run(run())
+
+
+@cli.command("convert-scroll-events")
+def convert_scroll_events(
+    batch_size: int = typer.Option(1000, help="Events copied per batch"),
+):
+    """Move scroll_events into a time-series collection (stop scroll ingest first)."""
+    async def run():
+        client, db = get_db()
+        try:
+            copied = await db_indexes.convert_scroll_events_to_timeseries(db, batch_size=batch_size)
+            typer.echo(f"Copied {copied} events; drop {db_indexes.LEGACY_SCROLL_EVENTS} once verified")
+        finally:
+            client.close()
+
+    asyncio.run(run())
+
+
+@cli.command("archive-scroll-events")
+def archive_scroll_events(
+    older_than_days: int = typer.Option(
+        int(os.environ.get('SCROLL_ARCHIVE_AFTER_DAYS', '30')), help="Archive complete UTC days older than this",
+    ),
+    archive_dir: Optional[str] = typer.Option(os.environ.get('SCROLL_ARCHIVE_DIR'), help="Parquet archive root"),
+    retention_days: int = typer.Option(
+        int(os.environ.get('SCROLL_EVENT_RETENTION_DAYS', '0')), help="TTL of raw events; older days are not archived",
+    ),
+    batch_size: int = typer.Option(5000, help="Events per Parquet row group"),
+):
+    """Copy old raw scroll events to date-partitioned Parquet before the TTL removes them; run daily."""
+    if not archive_dir:
+        raise typer.BadParameter("Set SCROLL_ARCHIVE_DIR or pass --archive-dir")
+
+    async def run():
+        client, db = get_db()
+        try:
+            archive = scroll_archive.ScrollArchive(archive_dir)
+            result = await scroll_archive.archive_events(db, archive, older_than_days, retention_days, batch_size)
+            for day, count in result.written.items():
+                typer.echo(f"{day}: {count} events")
+            typer.echo(f"Archived {len(result.written)} days to {archive_dir}")
+            for day in result.expired:
+                typer.echo(f"{day}: not archived, the TTL may already have removed part of it", err=True)
+            return result
+        finally:
+            client.close()
+
+    if asyncio.run(run()).expired:
+        raise typer.Exit(code=1)
+
+
+@cli.command("migrate-timestamps")
+def migrate_timestamps(
+    batch_size: int = typer.Option(1000, help="Documents converted per batch"),
+):
+    """Convert ISO-string timestamps to native dates; safe to interrupt and re-run."""
+    async def run():
+        client, db = get_db()
+        try:
+            for collection, field in db_indexes.TIMESTAMP_FIELDS:
+                result = await db_indexes.migrate_string_timestamps(db, collection, field, batch_size=batch_size)
+                typer.echo(f"{collection}.{field}: {result['converted']} converted, {result['skipped']} skipped")
+        finally:
+            client.close()
+
+    asyncio.run(run())
+
+
+@cli.command("backfill-email-keys")
+def backfill_email_keys(
+    batch_size: int = typer.Option(1000, help="Leads updated per batch"),
+):
+    """Key existing leads by normalized email; run before setting LEAD_DEDUP_BY_EMAIL=true."""
+    async def run():
+        client, db = get_db()
+        try:
+            result = await db_indexes.backfill_email_keys(db, batch_size=batch_size)
+            typer.echo(f"Keyed {result['keyed']} leads")
+            for key, lead_ids in result['collisions'].items():
+                typer.echo(f"{key}: leads {', '.join(lead_ids)} share this email and were not keyed", err=True)
+            return result
+        finally:
+            client.close()
+
+    if asyncio.run(run())['collisions']:
+        raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,184 @@
+"""Cold archive of raw scroll events as date-partitioned Parquet files.
+
+Raw events are hot in Mongo for ``SCROLL_EVENT_RETENTION_DAYS`` and then
+expire by TTL. Before that, ``archive_events`` (``manage.py
+archive-scroll-events``, run daily from cron) compacts each complete UTC day
+older than ``SCROLL_ARCHIVE_AFTER_DAYS`` into one file:
+
+    <SCROLL_ARCHIVE_DIR>/day=YYYY-MM-DD/events.parquet
+
+Days are written to a temporary file and renamed into place, and days that
+already have a file are skipped. Re-running is therefore safe.
+
+A day's first events expire ``retention_days`` after the day starts. Past
+that point (less ``EXPIRY_MARGIN``) the TTL may already have removed part
+of the day, so ``archive_events`` refuses to archive it and reports it as
+expired instead of writing a partial file. The retention must leave room
+for that: ``min_retention_days`` is the archive age plus one day for the
+day to complete plus one spare day for a missed cron run. The server
+refuses to start with a shorter retention.
+
+Approximate scroll stats come from the daily rollups, which never expire.
+Exact stats whose window reaches past the hot data use
+``exact_stats_with_archive``. It reads the archived days with columnar
+reads, pulls only the distinct (section, session) pairs for the hot range
+from Mongo, and counts the union with pandas.
+"""
+import logging
+import os
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from scroll_rollups import event_day, exact_scroll_stats, stats_response
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FILE = "events.parquet"
+ARCHIVE_SCHEMA = pa.schema([
+    ("id", pa.string()),
+    ("timestamp", pa.timestamp("ms", tz="UTC")),
+    ("page", pa.string()),
+    ("section", pa.string()),
+    ("section_index", pa.int32()),
+    ("total_sections", pa.int32()),
+    ("session_id", pa.string()),
+    ("viewport_height", pa.int32()),
+    ("client_timestamp", pa.timestamp("ms", tz="UTC")),
+])
+SECTION_KEY = ["page", "section", "section_index", "total_sections"]
+# Covers the TTL monitor's interval and the archive run itself
+EXPIRY_MARGIN = timedelta(hours=1)
+
+
+def min_retention_days(archive_after_days: int) -> int:
+    """Shortest retention under which each day is archived before any of it expires, with a day to spare."""
+    return archive_after_days + 2
+
+
+class ArchiveRun(NamedTuple):
+    written: Dict[str, int]  # events archived per day
+    expired: List[str]       # days not archived because the TTL may already have removed part of them
+
+
+def _day_start(day: str) -> datetime:
+    return datetime.fromisoformat(day).replace(tzinfo=timezone.utc)
+
+
+class ScrollArchive:
+    def __init__(self, root: os.PathLike):
+        self.root = Path(root)
+
+    def path(self, day: str) -> Path:
+        return self.root / f"day={day}" / ARCHIVE_FILE
+
+    def days(self) -> List[str]:
+        """Archived UTC days, oldest first."""
+        if not self.root.is_dir():
+            return []
+        return sorted(
+            entry.name[len("day="):] for entry in self.root.iterdir()
+            if entry.name.startswith("day=") and (entry / ARCHIVE_FILE).is_file()
+        )
+
+    async def write_day(self, day: str, documents, batch_size: int = 5000) -> int:
+        """Write one day's events (an async iterator) as a Parquet file, one row group per batch."""
+        path = self.path(day)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".parquet.tmp")
+        written = 0
+        with pq.ParquetWriter(tmp_path, ARCHIVE_SCHEMA, compression="zstd") as writer:
+            batch: List[Dict[str, Any]] = []
+            async for doc in documents:
+                batch.append(doc)
+                if len(batch) >= batch_size:
+                    writer.write_table(pa.Table.from_pylist(batch, schema=ARCHIVE_SCHEMA))
+                    written += len(batch)
+                    batch = []
+            if batch:
+                writer.write_table(pa.Table.from_pylist(batch, schema=ARCHIVE_SCHEMA))
+                written += len(batch)
+        os.replace(tmp_path, path)
+        return written
+
+    def read(self, days: List[str], columns: List[str]) -> pd.DataFrame:
+        tables = [pq.read_table(self.path(day), columns=columns) for day in days]
+        if not tables:
+            return pd.DataFrame(columns=columns)
+        return pa.concat_tables(tables).to_pandas()
+
+
+async def archive_events(db, archive: ScrollArchive, older_than_days: int, retention_days: int = 0,
+                         batch_size: int = 5000) -> ArchiveRun:
+    """Archive every complete UTC day older than ``older_than_days`` that has no file yet.
+
+    With ``retention_days`` set, days the TTL may have started removing are
+    reported in ``expired`` and not archived.
+    """
+    now = datetime.now(timezone.utc)
+    cutoff_day = (now - timedelta(days=older_than_days)).date()
+    oldest = await db.scroll_events.find({}, {"_id": 0, "timestamp": 1}).sort("timestamp", 1).limit(1).to_list(1)
+    if not oldest:
+        return ArchiveRun({}, [])
+    archived = set(archive.days())
+    written: Dict[str, int] = {}
+    expired: List[str] = []
+    day = date.fromisoformat(event_day(oldest[0]["timestamp"]))
+    while day < cutoff_day:
+        key = day.isoformat()
+        if key not in archived:
+            start = _day_start(key)
+            if retention_days > 0 and start + timedelta(days=retention_days) - EXPIRY_MARGIN <= now:
+                logger.error(f"Not archiving scroll events for {key}: the TTL may already have removed part of it")
+                expired.append(key)
+                day += timedelta(days=1)
+                continue
+            documents = db.scroll_events.find(
+                {"timestamp": {"$gte": start, "$lt": start + timedelta(days=1)}}, {"_id": 0},
+            ).sort("timestamp", 1).batch_size(batch_size)
+            count = await archive.write_day(key, documents, batch_size)
+            if count:
+                written[key] = count
+                logger.info(f"Archived {count} scroll events for {key}")
+            else:
+                archive.path(key).unlink()
+        day += timedelta(days=1)
+    return ArchiveRun(written, expired)
+
+
+async def exact_stats_with_archive(db, archive: ScrollArchive, days: int) -> Dict[str, Any]:
+    """Exact scroll stats over archived days plus the hot events after them."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    archived = [day for day in archive.days() if day >= cutoff.date().isoformat()]
+    if not archived:
+        return await exact_scroll_stats(db, days)
+
+    cold = archive.read(archived, SECTION_KEY + ["session_id", "timestamp"])
+    cold = cold[cold["timestamp"] >= pd.Timestamp(cutoff)]
+    hot_match = {"timestamp": {"$gte": max(cutoff, _day_start(archived[-1]) + timedelta(days=1))}}
+    hot_rows = await db.scroll_events.aggregate([
+        {"$match": hot_match},
+        {"$group": {"_id": {field: f"${field}" for field in SECTION_KEY + ["session_id"]}}},
+        {"$replaceRoot": {"newRoot": "$_id"}},
+    ], allowDiskUse=True).to_list(None)
+    hot_events = await db.scroll_events.count_documents(hot_match)
+
+    pairs = pd.concat(
+        [cold[SECTION_KEY + ["session_id"]], pd.DataFrame(hot_rows, columns=SECTION_KEY + ["session_id"])],
+        ignore_index=True,
+    ).drop_duplicates()
+    page_visitors = pairs[["page", "session_id"]].drop_duplicates().groupby("page").size()
+    sections = pairs.groupby(SECTION_KEY).size()
+    return stats_response(
+        days,
+        total_sessions=int(pairs["session_id"].nunique()),
+        total_events=len(cold) + hot_events,
+        page_visitors={page: int(count) for page, count in page_visitors.items()},
+        sections={(page, section, int(index), int(total)): int(count)
+                  for (page, section, index, total), count in sections.items()},
+        distinct="exact",
+    )
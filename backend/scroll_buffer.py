@@ -0,0 +1,134 @@
+"""In-process write-behind buffer for scroll analytics events.
+
+Scroll events are accepted into memory and written to MongoDB in batches
+with ``insert_many`` once either ``flush_size`` events are pending or
+``flush_interval`` seconds have passed since the last flush. When the
+buffer already holds ``max_events`` events, producers wait up to
+``put_timeout`` seconds for the flusher to make room and then get a
+``BufferFullError`` so the endpoint can shed load instead of growing
+memory without bound.
+
+A chunk whose flush fails is put back at the front of the buffer, still
+carrying the ``_id`` that ``insert_many`` gave it, so the retry cannot store
+an event twice. A flush function that knows only part of a chunk was
+stored raises ``PartialFlushError`` and only the rest is put back.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+FlushFn = Callable[[List[Dict[str, Any]]], Awaitable[None]]
+
+
+class BufferFullError(Exception):
+    """Raised when the buffer stays full for longer than the put timeout."""
+
+
+class PartialFlushError(Exception):
+    """Raised by a flush function that stored part of a chunk; ``unflushed`` are the events still to write."""
+
+    def __init__(self, message: str, unflushed: List[Dict[str, Any]]):
+        super().__init__(message)
+        self.unflushed = unflushed
+
+
+class ScrollEventBuffer:
+    def __init__(
+        self,
+        flush_fn: FlushFn,
+        max_events: int = 20000,
+        flush_size: int = 500,
+        flush_interval: float = 1.0,
+        put_timeout: float = 0.5,
+    ):
+        self._flush_fn = flush_fn
+        self.max_events = max_events
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self._events: List[Dict[str, Any]] = []
+        self._space = asyncio.Condition()
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    async def add(self, docs: List[Dict[str, Any]]) -> None:
+        """Queue documents for the next flush, waiting briefly if the buffer is full."""
+        if not docs:
+            return
+        async with self._space:
+            if len(self._events) >= self.max_events:
+                try:
+                    await asyncio.wait_for(
+                        self._space.wait_for(lambda: len(self._events) < self.max_events),
+                        timeout=self.put_timeout,
+                    )
+                except asyncio.TimeoutError:
+                    raise BufferFullError("Scroll event buffer is full")
+            self._events.extend(docs)
+        if len(self._events) >= self.flush_size or self._task is None:
+            self._wakeup.set()
+            if self._task is None:
+                # No background flusher (e.g. not started yet): write inline.
+                await self.flush()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._closed = False
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Stop the background flusher and write out everything still pending."""
+        self._closed = True
+        if self._task is not None:
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    async def flush(self) -> int:
+        """Write all pending events; returns the number of events written."""
+        async with self._flush_lock:
+            async with self._space:
+                pending, self._events = self._events, []
+                self._space.notify_all()
+            written = 0
+            for start in range(0, len(pending), self.flush_size):
+                chunk = pending[start:start + self.flush_size]
+                try:
+                    await self._flush_fn(chunk)
+                    written += len(chunk)
+                except PartialFlushError as e:
+                    written += len(chunk) - len(e.unflushed)
+                    rest = e.unflushed + pending[start + len(chunk):]
+                    logger.error(f"Scroll event flush stored part of a batch, requeueing {len(rest)} events: {e}")
+                    await self._requeue(rest)
+                    break
+                except Exception as e:
+                    logger.error(f"Scroll event flush failed, requeueing {len(pending) - start} events: {e}")
+                    await self._requeue(pending[start:])
+                    break
+            return written
+
+    async def _requeue(self, docs: List[Dict[str, Any]]) -> None:
+        async with self._space:
+            room = max(self.max_events - len(self._events), 0)
+            if room < len(docs):
+                logger.error(f"Dropping {len(docs) - room} scroll events, buffer is full")
+            self._events[:0] = docs[:room]
+
+    async def _run(self) -> None:
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._events:
+                await self.flush()
@@ -0,0 +1,250 @@
+"""Scroll funnel and drop-off analytics over a cached columnar snapshot.
+
+``FunnelSnapshot`` keeps two pandas frames in process:
+
+* ``sessions`` -- one row per (page, session_id) with ``first_seen``,
+  ``last_seen``, ``max_depth`` (deepest section index reached) and
+  ``total_sections``.
+* ``leads`` -- ``id``, ``source_page`` and ``created_at`` of every lead.
+
+``refresh`` only loads what arrived after the previous refresh. It starts
+``overlap_seconds`` before the newest row seen, to pick up events the
+write-behind buffer flushed late. Sessions are merged with min/max and
+leads are de-duplicated by id, so reading the overlap twice is harmless.
+The first refresh loads ``retention_days`` of history, and rows that
+fall out of that window are dropped from the snapshot.
+
+``report`` computes ``funnel_report`` once per snapshot version and
+(days, page), since the result can only change on refresh.
+``funnel_report`` computes, with vectorized pandas/NumPy operations:
+
+* per page: sessions reaching each section, section-to-section drop-off,
+  the median max depth and the completion rate (the last section reached)
+* leads joined on ``leads.source_page == page``: lead count and
+  conversion rate (leads per session)
+* daily cohorts per page (by the session's first day): sessions, median
+  depth, completion rate, leads and conversion rate. Depth and conversion
+  can then be compared day by day.
+
+Leads are not linked to scroll sessions, so conversion is measured per
+page (and per day), not per session.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+SESSION_KEY = ["page", "session_id"]
+SESSION_DTYPES = {
+    "page": "object", "session_id": "object", "first_seen": "datetime64[ns, UTC]",
+    "last_seen": "datetime64[ns, UTC]", "max_depth": "int64", "total_sections": "int64",
+}
+LEAD_DTYPES = {"id": "object", "source_page": "object", "created_at": "datetime64[ns, UTC]"}
+SESSION_COLUMNS = list(SESSION_DTYPES)
+LEAD_COLUMNS = list(LEAD_DTYPES)
+# Section indexes come from clients; the report caps them so a bogus index cannot size the arrays
+MAX_FUNNEL_SECTIONS = 200
+MAX_CACHED_REPORTS = 64
+
+Loader = Callable[[datetime], AsyncIterator[Dict[str, Any]]]
+
+
+def _empty(dtypes: Dict[str, str]) -> pd.DataFrame:
+    return pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in dtypes.items()})
+
+
+def summarize_events(events: pd.DataFrame) -> pd.DataFrame:
+    """Collapse rows (new events, or summaries plus new events) into one row per (page, session)."""
+    return events.groupby(SESSION_KEY, as_index=False, sort=False).agg(
+        first_seen=("first_seen", "min"),
+        last_seen=("last_seen", "max"),
+        max_depth=("max_depth", "max"),
+        total_sections=("total_sections", "max"),
+    )
+
+
+class FunnelSnapshot:
+    def __init__(self, load_events: Loader, load_leads: Loader, max_age_seconds: float = 60,
+                 overlap_seconds: float = 60, retention_days: int = 90):
+        self._load_events = load_events
+        self._load_leads = load_leads
+        self.max_age_seconds = max_age_seconds
+        self.overlap = timedelta(seconds=overlap_seconds)
+        self.retention_days = retention_days
+        self.sessions = _empty(SESSION_DTYPES)
+        self.leads = _empty(LEAD_DTYPES)
+        self.events_loaded = 0
+        self.refreshed_at: Optional[datetime] = None
+        self.version = 0
+        self._refreshed_monotonic: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self._reports: Dict[Tuple[int, Optional[str]], asyncio.Future] = {}
+        self._reports_version = 0
+
+    def _since(self, frame: pd.DataFrame, column: str) -> datetime:
+        if frame.empty:
+            return datetime.now(timezone.utc) - timedelta(days=self.retention_days)
+        return frame[column].max().to_pydatetime() - self.overlap
+
+    async def refresh(self, force: bool = False) -> None:
+        """Load events and leads newer than the snapshot, unless it is younger than ``max_age_seconds``."""
+        async with self._lock:
+            if (not force and self._refreshed_monotonic is not None
+                    and time.monotonic() - self._refreshed_monotonic < self.max_age_seconds):
+                return
+            cutoff = pd.Timestamp(datetime.now(timezone.utc) - timedelta(days=self.retention_days))
+            events = await self._load_new_events()
+            sessions = self.sessions
+            if len(events):
+                merged = pd.concat([sessions, events], ignore_index=True) if len(sessions) else events
+                sessions = summarize_events(merged)
+            self.sessions = sessions[sessions["last_seen"] >= cutoff].reset_index(drop=True)
+
+            leads = await self._load_new_leads()
+            if len(leads):
+                leads = pd.concat([self.leads, leads], ignore_index=True) if len(self.leads) else leads
+                self.leads = leads.drop_duplicates("id", keep="last")
+            self.leads = self.leads[self.leads["created_at"] >= cutoff].reset_index(drop=True)
+
+            self.refreshed_at = datetime.now(timezone.utc)
+            self._refreshed_monotonic = time.monotonic()
+            self.version += 1
+
+    async def report(self, days: int, page: Optional[str] = None) -> Dict[str, Any]:
+        """``funnel_report`` over a fresh snapshot, computed once per snapshot version and (days, page).
+
+        The report runs in a worker thread; the snapshot's frames are replaced
+        on refresh, never mutated, so the thread reads a consistent version.
+        """
+        await self.refresh()
+        if self._reports_version != self.version or len(self._reports) >= MAX_CACHED_REPORTS:
+            self._reports = {}
+            self._reports_version = self.version
+        key = (days, page)
+        future = self._reports.get(key)
+        if future is None:
+            future = self._reports[key] = asyncio.ensure_future(
+                asyncio.to_thread(funnel_report, self.sessions, self.leads, days, page)
+            )
+        try:
+            return await asyncio.shield(future)
+        except Exception:
+            if self._reports.get(key) is future:
+                del self._reports[key]
+            raise
+
+    async def _load_new_events(self) -> pd.DataFrame:
+        columns: Dict[str, list] = {column: [] for column in ("page", "session_id", "timestamp", "section_index",
+                                                              "total_sections")}
+        async for doc in self._load_events(self._since(self.sessions, "last_seen")):
+            for column, values in columns.items():
+                values.append(doc[column])
+        self.events_loaded += len(columns["page"])
+        if not columns["page"]:
+            return _empty(SESSION_DTYPES)
+        timestamps = pd.to_datetime(columns.pop("timestamp"), utc=True)
+        frame = pd.DataFrame(columns)
+        frame["first_seen"] = timestamps
+        frame["last_seen"] = timestamps
+        return frame.rename(columns={"section_index": "max_depth"})[SESSION_COLUMNS].astype(SESSION_DTYPES)
+
+    async def _load_new_leads(self) -> pd.DataFrame:
+        rows = [
+            (doc["id"], doc.get("source_page"), doc["created_at"])
+            async for doc in self._load_leads(self._since(self.leads, "created_at"))
+        ]
+        if not rows:
+            return _empty(LEAD_DTYPES)
+        frame = pd.DataFrame(rows, columns=LEAD_COLUMNS)
+        frame["created_at"] = pd.to_datetime(frame["created_at"], utc=True)
+        return frame.astype(LEAD_DTYPES)
+
+
+def _rate(numerator: float, denominator: float) -> Optional[float]:
+    return round(float(numerator) / float(denominator), 4) if denominator else None
+
+
+def _funnel_steps(depths: np.ndarray, total_sections: int) -> List[Dict[str, Any]]:
+    """Sessions reaching each section (max depth >= index) and the drop-off to the next one."""
+    counts = np.bincount(depths, minlength=total_sections)
+    reached = counts[::-1].cumsum()[::-1]
+    drop_off = reached[:-1] - reached[1:]
+    steps = []
+    for index in range(len(reached)):
+        last = index == len(reached) - 1
+        steps.append({
+            "section_index": index,
+            "reached": int(reached[index]),
+            "drop_off": None if last else int(drop_off[index]),
+            "drop_off_rate": None if last else _rate(drop_off[index], reached[index]),
+        })
+    return steps
+
+
+def funnel_report(sessions: pd.DataFrame, leads: pd.DataFrame, days: int, page: Optional[str] = None) -> Dict[str, Any]:
+    cutoff = pd.Timestamp(datetime.now(timezone.utc) - timedelta(days=days))
+    sessions = sessions[sessions["last_seen"] >= cutoff]
+    leads = leads[leads["created_at"] >= cutoff]
+    if page is not None:
+        sessions = sessions[sessions["page"] == page]
+        leads = leads[leads["source_page"] == page]
+
+    total_sections = sessions["total_sections"].clip(1, MAX_FUNNEL_SECTIONS)
+    sessions = sessions.assign(
+        max_depth=sessions["max_depth"].clip(0, None).clip(upper=total_sections - 1),
+        total_sections=total_sections,
+        day=sessions["first_seen"].dt.normalize(),
+    )
+    sessions = sessions.assign(completed=sessions["max_depth"] >= sessions["total_sections"] - 1)
+    lead_counts = leads.groupby("source_page").size()
+
+    pages = []
+    for page_name, group in sessions.groupby("page", sort=True):
+        depths = group["max_depth"].to_numpy()
+        total_sections = int(group["total_sections"].max())
+        page_leads = int(lead_counts.get(page_name, 0))
+        pages.append({
+            "page": page_name,
+            "sessions": len(group),
+            "total_sections": total_sections,
+            "median_max_depth": float(np.median(depths)),
+            "completion_rate": _rate(group["completed"].sum(), len(group)),
+            "leads": page_leads,
+            "conversion_rate": _rate(page_leads, len(group)),
+            "steps": _funnel_steps(depths, total_sections),
+        })
+
+    cohorts = sessions.groupby(["day", "page"], sort=True).agg(
+        sessions=("session_id", "size"),
+        median_max_depth=("max_depth", "median"),
+        completed=("completed", "sum"),
+    )
+    daily_leads = leads.assign(day=leads["created_at"].dt.normalize()).groupby(["day", "source_page"]).size()
+    daily_leads.index.names = ["day", "page"]
+    cohorts = cohorts.join(daily_leads.rename("leads"), how="left").fillna({"leads": 0}).reset_index()
+
+    return {
+        "days": days,
+        "page": page,
+        "sessions": len(sessions),
+        "leads": len(leads),
+        "pages": pages,
+        "cohorts": [
+            {
+                "day": row.day.date().isoformat(),
+                "page": row.page,
+                "sessions": int(row.sessions),
+                "median_max_depth": float(row.median_max_depth),
+                "completion_rate": _rate(row.completed, row.sessions),
+                "leads": int(row.leads),
+                "conversion_rate": _rate(row.leads, row.sessions),
+            }
+            for row in cohorts.itertuples(index=False)
+        ],
+    }
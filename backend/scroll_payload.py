@@ -0,0 +1,101 @@
+"""Columnar (v2) payload for batched scroll events.
+
+A v1 batch is a list of full ``ScrollEvent`` objects, each repeating the
+page, session, section count and viewport height. A v2 batch sends those
+once as a header, and the per-event values as parallel arrays:
+
+    {
+      "page": "Index", "session_id": "s_...", "total_sections": 8,
+      "viewport_height": 900,
+      "sections": ["hero", "services"],
+      "indexes": [0, 1],
+      "client_ts": [1718000000000, 1718000001500]
+    }
+
+``client_ts`` (epoch milliseconds) is optional. Bodies may be sent with
+``Content-Encoding: gzip``. ``decode_body`` inflates them with a bounded
+output size, so a small compressed body cannot expand without limit.
+
+The body is validated once, with ``ScrollEventBatchV2.model_validate_json``.
+``build_scroll_documents`` then turns the arrays straight into stored
+documents, without building a model per event.
+"""
+import uuid
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, model_validator
+
+
+class ScrollPayloadError(ValueError):
+    """Raised for a body that cannot be decoded; ``status_code`` is the HTTP status to answer with."""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class ScrollEventBatchV2(BaseModel):
+    page: str
+    session_id: str
+    total_sections: int
+    viewport_height: Optional[int] = None
+    sections: List[str]
+    indexes: List[int]
+    client_ts: Optional[List[int]] = None
+
+    @model_validator(mode="after")
+    def check_columns(self):
+        if len(self.indexes) != len(self.sections):
+            raise ValueError("sections and indexes must have the same length")
+        if self.client_ts is not None and len(self.client_ts) != len(self.sections):
+            raise ValueError("client_ts must have the same length as sections")
+        return self
+
+
+def decode_body(body: bytes, content_encoding: Optional[str], max_bytes: int) -> bytes:
+    """Return the request body, inflated if gzip-encoded, refusing anything over ``max_bytes``."""
+    encoding = (content_encoding or "identity").strip().lower()
+    if len(body) > max_bytes:
+        raise ScrollPayloadError("Payload too large", status_code=413)
+    if encoding == "identity":
+        return body
+    if encoding != "gzip":
+        raise ScrollPayloadError(f"Unsupported Content-Encoding: {encoding}", status_code=415)
+    inflater = zlib.decompressobj(zlib.MAX_WBITS | 16)
+    try:
+        data = inflater.decompress(body, max_bytes + 1)
+    except zlib.error:
+        raise ScrollPayloadError("Invalid gzip body")
+    if len(data) > max_bytes:
+        raise ScrollPayloadError("Payload too large", status_code=413)
+    if not inflater.eof:
+        raise ScrollPayloadError("Truncated gzip body")
+    return data
+
+
+def _client_timestamp(ms: int) -> Optional[datetime]:
+    try:
+        return datetime.fromtimestamp(ms / 1000, tz=timezone.utc)
+    except (OverflowError, OSError, ValueError):
+        return None
+
+
+def build_scroll_documents(batch: ScrollEventBatchV2, now: datetime) -> List[Dict[str, Any]]:
+    """Stored scroll event documents for a validated v2 batch, all stamped with ``now``."""
+    client_ts = batch.client_ts or [None] * len(batch.sections)
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "page": batch.page,
+            "section": section,
+            "section_index": index,
+            "total_sections": batch.total_sections,
+            "session_id": batch.session_id,
+            "viewport_height": batch.viewport_height,
+            "timestamp": now,
+            "client_timestamp": _client_timestamp(ms) if ms is not None else None,
+        }
+        for section, index, ms in zip(batch.sections, batch.indexes, client_ts)
+    ]
@@ -0,0 +1,381 @@
+"""Daily scroll-reach rollups maintained at ingest time.
+
+Instead of aggregating every raw ``scroll_events`` document on each admin
+request, each flushed batch of events is folded into ``scroll_rollups``:
+
+* ``kind: "section"`` -- one doc per day/page/section, ``reach_count`` is the
+  number of sessions that first reached that section that day.
+* ``kind: "page"`` -- one doc per day/page, ``visitors`` counts sessions.
+* ``kind: "site"`` -- one doc per day, ``sessions`` counts sessions.
+
+Every doc also carries an ``events`` counter. First-reach detection uses
+``scroll_reach_markers``: a marker ``_id`` per (day, key, session) is
+inserted for each event and only the inserts that do not hit a duplicate
+key count as a new reach. Markers are only needed while their day can still
+receive events, so they expire via a TTL index after ``MARKER_TTL_SECONDS``.
+
+Applying a batch is idempotent, so a batch whose rollup step failed part
+way can simply be applied again. The batch id is derived from the events'
+``_id``s. Each marker records the batch that inserted it, so a retry
+still counts its own markers as new. Each counter update only matches a
+doc whose ``batches`` (the last ``RECENT_BATCHES`` ids applied to it) does
+not hold the batch yet; on a doc that does, the upsert fails with a
+duplicate key and is skipped.
+
+Each doc also keeps a HyperLogLog sketch (``hll_registers``, see ``hll.py``)
+of the sessions it counted. Daily counters summed over a window count a
+session once per day it was active; merging the sketches instead gives
+distinct sessions over the whole window within the sketch's error bound.
+The sketch is stored as its non-zero registers and updated with ``$max``
+per register in the same write as the counters. Concurrent flushes from
+several workers therefore merge without losing registers. Docs written
+before that keep a compressed ``hll`` sketch, which is still read.
+``exact_scroll_stats`` computes exact distinct counts from the raw events
+when that bound is not enough.
+"""
+import hashlib
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from hll import HyperLogLog, standard_error
+
+logger = logging.getLogger(__name__)
+
+ROLLUPS = "scroll_rollups"
+MARKERS = "scroll_reach_markers"
+MARKER_TTL_SECONDS = 2 * 24 * 3600
+DUPLICATE_KEY = 11000
+RECENT_BATCHES = 256
+
+
+def event_day(timestamp: Any) -> str:
+    """UTC day (YYYY-MM-DD) of a stored event timestamp."""
+    if isinstance(timestamp, datetime):
+        if timestamp.tzinfo is not None:
+            timestamp = timestamp.astimezone(timezone.utc)
+        return timestamp.date().isoformat()
+    return str(timestamp)[:10]
+
+
+def _rollup_keys(doc: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any]]]:
+    day = event_day(doc['timestamp'])
+    page = doc['page']
+    return [
+        (f"section|{day}|{page}|{doc['section_index']}|{doc['total_sections']}|{doc['section']}", {
+            "kind": "section", "day": day, "page": page, "section": doc['section'],
+            "section_index": doc['section_index'], "total_sections": doc['total_sections'],
+        }),
+        (f"page|{day}|{page}", {"kind": "page", "day": day, "page": page}),
+        (f"site|{day}", {"kind": "site", "day": day}),
+    ]
+
+
+COUNTER_FIELD = {"section": "reach_count", "page": "visitors", "site": "sessions"}
+
+
+async def ensure_rollup_indexes(db) -> None:
+    await db[ROLLUPS].create_index([("kind", ASCENDING), ("day", ASCENDING)])
+    await db[MARKERS].create_index("created_at", expireAfterSeconds=MARKER_TTL_SECONDS)
+
+
+def batch_id(docs: List[Dict[str, Any]]) -> str:
+    """Stable id of a batch of stored events, from their ``_id``s."""
+    if any("_id" not in doc for doc in docs):
+        # Not stored yet, so it cannot be retried as the same batch either
+        return uuid.uuid4().hex
+    digest = hashlib.blake2b(digest_size=12)
+    for event_id in sorted(str(doc["_id"]) for doc in docs):
+        digest.update(event_id.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _duplicate_indexes(error: BulkWriteError) -> set:
+    """Indexes of the duplicate-key failures in ``error``; re-raises it for any other failure."""
+    indexes = set()
+    for write_error in error.details.get('writeErrors', []):
+        if write_error.get('code') != DUPLICATE_KEY:
+            raise error
+        indexes.add(write_error['index'])
+    return indexes
+
+
+async def _insert_markers(db, markers: Dict[str, Dict[str, Any]], batch: str) -> set:
+    """Insert reach markers and return the ids that are new for ``batch``.
+
+    A marker this batch inserted on an earlier attempt counts as new again.
+    """
+    if not markers:
+        return set()
+    marker_ids = list(markers)
+    now = datetime.now(timezone.utc)
+    try:
+        await db[MARKERS].insert_many(
+            [{"_id": marker_id, "day": markers[marker_id]["day"], "batch": batch, "created_at": now}
+             for marker_id in marker_ids],
+            ordered=False,
+        )
+        return set(marker_ids)
+    except BulkWriteError as e:
+        existing = [marker_ids[index] for index in _duplicate_indexes(e)]
+        ours = await db[MARKERS].find({"_id": {"$in": existing}, "batch": batch}, {"_id": 1}).to_list(None)
+        return set(marker_ids) - set(existing) | {marker["_id"] for marker in ours}
+
+
+async def apply_rollups(db, docs: List[Dict[str, Any]]) -> None:
+    """Fold a batch of stored scroll events into the daily rollups; safe to repeat for the same batch."""
+    if not docs:
+        return
+    batch = batch_id(docs)
+    increments: Dict[str, Dict[str, int]] = {}
+    metadata: Dict[str, Dict[str, Any]] = {}
+    markers: Dict[str, Dict[str, Any]] = {}
+    for doc in docs:
+        for rollup_id, meta in _rollup_keys(doc):
+            metadata[rollup_id] = meta
+            counters = increments.setdefault(rollup_id, {"events": 0})
+            counters["events"] += 1
+            markers.setdefault(f"{rollup_id}|{doc['session_id']}", {
+                "rollup_id": rollup_id, "day": meta["day"], "session_id": doc['session_id'],
+            })
+
+    new_sessions: Dict[str, List[str]] = {}
+    for marker_id in await _insert_markers(db, markers, batch):
+        rollup_id = markers[marker_id]["rollup_id"]
+        field = COUNTER_FIELD[metadata[rollup_id]["kind"]]
+        counters = increments[rollup_id]
+        counters[field] = counters.get(field, 0) + 1
+        new_sessions.setdefault(rollup_id, []).append(markers[marker_id]["session_id"])
+
+    operations = []
+    for rollup_id, counters in increments.items():
+        update = {
+            "$inc": counters,
+            "$setOnInsert": metadata[rollup_id],
+            "$push": {"batches": {"$each": [batch], "$slice": -RECENT_BATCHES}},
+        }
+        if rollup_id in new_sessions:
+            update["$max"] = _sketch_update(new_sessions[rollup_id])
+        operations.append(UpdateOne({"_id": rollup_id, "batches": {"$ne": batch}}, update, upsert=True))
+    try:
+        await db[ROLLUPS].bulk_write(operations, ordered=False)
+    except BulkWriteError as e:
+        # Docs this batch was already applied to
+        _duplicate_indexes(e)
+
+
+def _sketch_update(sessions: List[str]) -> Dict[str, int]:
+    """``$max`` fields that merge ``sessions`` into a rollup's sketch."""
+    sketch = HyperLogLog()
+    sketch.update(sessions)
+    return {f"hll_registers.{index}": rank for index, rank in sketch.to_registers().items()}
+
+
+class _DistinctCounter:
+    """Merges daily sketches; daily counters of docs without a sketch are added on top."""
+
+    def __init__(self):
+        self.sketch: Optional[HyperLogLog] = None
+        self.unsketched = 0
+
+    def add(self, rollup: Dict[str, Any], field: str) -> None:
+        sketches = []
+        if rollup.get("hll_registers"):
+            sketches.append(HyperLogLog.from_registers(rollup["hll_registers"]))
+        if rollup.get("hll"):
+            sketches.append(HyperLogLog.from_bytes(rollup["hll"]))
+        if not sketches:
+            self.unsketched += rollup.get(field, 0)
+        for sketch in sketches:
+            if self.sketch is None:
+                self.sketch = sketch
+            else:
+                self.sketch.merge(sketch)
+
+    def count(self) -> int:
+        return (self.sketch.count() if self.sketch is not None else 0) + self.unsketched
+
+
+async def read_scroll_stats(db, days: int) -> Dict[str, Any]:
+    """Build the scroll-stats response from rollups covering the last ``days`` days.
+
+    Distinct session counts are HyperLogLog estimates (see ``hll.py`` for the
+    error bound); event counts are exact.
+    """
+    cutoff_day = (datetime.now(timezone.utc) - timedelta(days=days)).date().isoformat()
+    rollups = await db[ROLLUPS].find({"day": {"$gte": cutoff_day}}, {"_id": 0, "batches": 0}).to_list(None)
+
+    site = _DistinctCounter()
+    total_events = 0
+    page_visitors: Dict[str, _DistinctCounter] = {}
+    sections: Dict[Tuple, _DistinctCounter] = {}
+    for rollup in rollups:
+        kind = rollup.get("kind")
+        if kind == "site":
+            site.add(rollup, "sessions")
+            total_events += rollup.get("events", 0)
+        elif kind == "page":
+            page_visitors.setdefault(rollup["page"], _DistinctCounter()).add(rollup, "visitors")
+        elif kind == "section":
+            key = (rollup["page"], rollup["section"], rollup["section_index"], rollup["total_sections"])
+            sections.setdefault(key, _DistinctCounter()).add(rollup, "reach_count")
+
+    return stats_response(
+        days,
+        total_sessions=site.count(),
+        total_events=total_events,
+        page_visitors={page: counter.count() for page, counter in page_visitors.items()},
+        sections={key: counter.count() for key, counter in sections.items()},
+        distinct="approx",
+    )
+
+
+async def exact_scroll_stats(db, days: int) -> Dict[str, Any]:
+    """Exact distinct counts computed from raw events.
+
+    Sessions are grouped out with a two-stage ``$group`` instead of
+    ``$addToSet`` so no stage holds a per-key session array in memory.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    match = {"$match": {"timestamp": {"$gte": cutoff}}}
+
+    session_result = await db.scroll_events.aggregate([
+        match,
+        {"$group": {"_id": "$session_id"}},
+        {"$count": "total"},
+    ], allowDiskUse=True).to_list(1)
+
+    page_rows = await db.scroll_events.aggregate([
+        match,
+        {"$group": {"_id": {"page": "$page", "session_id": "$session_id"}}},
+        {"$group": {"_id": "$_id.page", "visitors": {"$sum": 1}}},
+    ], allowDiskUse=True).to_list(None)
+
+    section_rows = await db.scroll_events.aggregate([
+        match,
+        {"$group": {"_id": {
+            "page": "$page", "section": "$section", "section_index": "$section_index",
+            "total_sections": "$total_sections", "session_id": "$session_id",
+        }}},
+        {"$group": {
+            "_id": {"page": "$_id.page", "section": "$_id.section", "section_index": "$_id.section_index",
+                    "total_sections": "$_id.total_sections"},
+            "reach_count": {"$sum": 1},
+        }},
+    ], allowDiskUse=True).to_list(None)
+
+    return stats_response(
+        days,
+        total_sessions=session_result[0]["total"] if session_result else 0,
+        total_events=await db.scroll_events.count_documents(match["$match"]),
+        page_visitors={row["_id"]: row["visitors"] for row in page_rows},
+        sections={
+            (row["_id"]["page"], row["_id"]["section"], row["_id"]["section_index"], row["_id"]["total_sections"]):
+                row["reach_count"]
+            for row in section_rows
+        },
+        distinct="exact",
+    )
+
+
+def stats_from_events(events: Iterable[Dict[str, Any]], days: int, distinct: str = "approx") -> Dict[str, Any]:
+    """The same response computed directly from raw events held in memory.
+
+    ``approx`` uses day-granular windows and HyperLogLog counts like the
+    rollups; ``exact`` uses a timestamp cutoff and exact session sets like
+    ``exact_scroll_stats``.
+    """
+    now = datetime.now(timezone.utc)
+    if distinct == "approx":
+        cutoff_day = (now - timedelta(days=days)).date().isoformat()
+        window = [event for event in events if event_day(event['timestamp']) >= cutoff_day]
+        new_counter = HyperLogLog
+    else:
+        cutoff = now - timedelta(days=days)
+        window = [event for event in events if event['timestamp'] >= cutoff]
+        new_counter = _SessionSet
+
+    site = new_counter()
+    page_visitors: Dict[str, Any] = {}
+    sections: Dict[Tuple, Any] = {}
+    for event in window:
+        session_id = event['session_id']
+        site.add(session_id)
+        page_visitors.setdefault(event['page'], new_counter()).add(session_id)
+        key = (event['page'], event['section'], event['section_index'], event['total_sections'])
+        sections.setdefault(key, new_counter()).add(session_id)
+
+    return stats_response(
+        days,
+        total_sessions=site.count(),
+        total_events=len(window),
+        page_visitors={page: counter.count() for page, counter in page_visitors.items()},
+        sections={key: counter.count() for key, counter in sections.items()},
+        distinct=distinct,
+    )
+
+
+class _SessionSet(set):
+    def count(self) -> int:
+        return len(self)
+
+
+def stats_response(
+    days: int,
+    total_sessions: int,
+    total_events: int,
+    page_visitors: Dict[str, int],
+    sections: Dict[Tuple, int],
+    distinct: str,
+) -> Dict[str, Any]:
+    section_stats = [
+        {"page": page, "section": section, "section_index": index,
+         "total_sections": total, "reach_count": count}
+        for (page, section, index, total), count in sections.items()
+    ]
+    section_stats.sort(key=lambda s: (s["page"], s["section_index"]))
+    return {
+        "total_sessions": total_sessions,
+        "total_events": total_events,
+        "days": days,
+        "page_visitors": sorted(
+            ({"page": page, "total_visitors": count} for page, count in page_visitors.items()),
+            key=lambda p: -p["total_visitors"],
+        ),
+        "section_stats": section_stats,
+        "distinct": distinct,
+        "standard_error": standard_error() if distinct == "approx" else 0.0,
+    }
+
+
+async def rebuild_rollups(db, since_day: Optional[str] = None, batch_size: int = 1000) -> int:
+    """Recompute rollups (from ``since_day`` on, or all) from raw scroll events.
+
+    Run it with scroll ingest stopped. A batch flushed while the rebuild runs
+    is counted by the live flush and again by the rebuild if the rebuild's
+    cursor reaches it, so its ``events`` counters would be doubled.
+    """
+    day_filter = {"day": {"$gte": since_day}} if since_day else {}
+    await db[ROLLUPS].delete_many(day_filter)
+    await db[MARKERS].delete_many(day_filter)
+
+    event_filter = {}
+    if since_day:
+        event_filter["timestamp"] = {"$gte": datetime.fromisoformat(since_day).replace(tzinfo=timezone.utc)}
+    processed = 0
+    batch: List[Dict[str, Any]] = []
+    async for doc in db.scroll_events.find(event_filter).batch_size(batch_size):
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            await apply_rollups(db, batch)
+            processed += len(batch)
+            batch = []
+    if batch:
+        await apply_rollups(db, batch)
+        processed += len(batch)
+    logger.info(f"Rebuilt scroll rollups from {processed} raw events")
+    return processed
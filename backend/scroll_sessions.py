@@ -0,0 +1,184 @@
+"""Per-session max-depth storage for scroll tracking.
+
+The dashboards only ask "did session S reach section N of page P". In the
+``sessions`` storage mode, ingest keeps a single ``scroll_sessions``
+document per (page, session_id), instead of one raw document per event:
+
+* ``max_section_index`` / ``total_sections`` -- updated with ``$max``
+* ``first_seen`` / ``last_seen`` -- ``$min`` / ``$max`` of event timestamps
+* ``reached`` -- bitmask of reached section indexes, OR-ed in with ``$bit``
+* ``section_names`` -- section name by index (as a string key)
+* ``events`` -- number of events folded in
+
+Every update is commutative, so flushes from several workers can be applied
+in any order. Only indexes below ``MAX_TRACKED_SECTIONS`` fit in the 64-bit
+mask; deeper sections still raise ``max_section_index``, but they do not
+appear in the per-section reach counts.
+
+Scroll stats read from this collection give the same response shape as
+the raw events. They are exact, and a session counts toward a window when
+its ``last_seen`` falls inside it. ``collapse_events`` builds the
+collection from existing raw events (``manage.py collapse-scroll-events``).
+"""
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Tuple
+
+from bson.int64 import Int64
+from pymongo import ASCENDING, UpdateOne
+
+from scroll_rollups import stats_response
+
+logger = logging.getLogger(__name__)
+
+SESSIONS = "scroll_sessions"
+SCROLL_STORAGE_MODES = ("events", "sessions")
+MAX_TRACKED_SECTIONS = 63
+
+
+def session_key(page: str, session_id: str) -> str:
+    return f"{page}|{session_id}"
+
+
+def fold_events(docs: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Per-(page, session) summaries of a batch of stored scroll events."""
+    summaries: Dict[str, Dict[str, Any]] = {}
+    for doc in docs:
+        key = session_key(doc['page'], doc['session_id'])
+        index = doc['section_index']
+        summary = summaries.get(key)
+        if summary is None:
+            summary = summaries[key] = {
+                "page": doc['page'], "session_id": doc['session_id'],
+                "max_section_index": index, "total_sections": doc['total_sections'],
+                "first_seen": doc['timestamp'], "last_seen": doc['timestamp'],
+                "reached": 0, "section_names": {}, "events": 0,
+            }
+        else:
+            summary["max_section_index"] = max(summary["max_section_index"], index)
+            summary["total_sections"] = max(summary["total_sections"], doc['total_sections'])
+            summary["first_seen"] = min(summary["first_seen"], doc['timestamp'])
+            summary["last_seen"] = max(summary["last_seen"], doc['timestamp'])
+        if 0 <= index < MAX_TRACKED_SECTIONS:
+            summary["reached"] |= 1 << index
+        summary["section_names"][str(index)] = doc['section']
+        summary["events"] += 1
+    return summaries
+
+
+def merge_summary(target: Dict[str, Any], summary: Dict[str, Any]) -> None:
+    """Fold ``summary`` into an existing session document, as the Mongo upsert does."""
+    target["max_section_index"] = max(target["max_section_index"], summary["max_section_index"])
+    target["total_sections"] = max(target["total_sections"], summary["total_sections"])
+    target["first_seen"] = min(target["first_seen"], summary["first_seen"])
+    target["last_seen"] = max(target["last_seen"], summary["last_seen"])
+    target["reached"] |= summary["reached"]
+    target["section_names"].update(summary["section_names"])
+    target["events"] += summary["events"]
+
+
+def session_updates(docs: Iterable[Dict[str, Any]]) -> List[UpdateOne]:
+    operations = []
+    for key, summary in fold_events(docs).items():
+        operations.append(UpdateOne({"_id": key}, {
+            "$setOnInsert": {"page": summary["page"], "session_id": summary["session_id"]},
+            "$max": {
+                "max_section_index": summary["max_section_index"],
+                "total_sections": summary["total_sections"],
+                "last_seen": summary["last_seen"],
+            },
+            "$min": {"first_seen": summary["first_seen"]},
+            "$bit": {"reached": {"or": Int64(summary["reached"])}},
+            "$set": {f"section_names.{index}": name for index, name in summary["section_names"].items()},
+            "$inc": {"events": summary["events"]},
+        }, upsert=True))
+    return operations
+
+
+async def ensure_session_indexes(db) -> None:
+    await db[SESSIONS].create_index([("last_seen", ASCENDING)])
+
+
+async def apply_session_upserts(db, docs: List[Dict[str, Any]]) -> None:
+    """Fold a batch of stored scroll events into ``scroll_sessions``."""
+    operations = session_updates(docs)
+    if operations:
+        await db[SESSIONS].bulk_write(operations, ordered=False)
+
+
+class SessionReach:
+    """Accumulates session documents into the scroll-stats response."""
+
+    def __init__(self):
+        self.sessions = set()
+        self.events = 0
+        self.page_visitors: Dict[str, int] = {}
+        self.sections: Dict[Tuple, int] = {}
+
+    def add(self, doc: Dict[str, Any]) -> None:
+        page = doc['page']
+        self.sessions.add(doc['session_id'])
+        self.events += doc.get('events', 0)
+        self.page_visitors[page] = self.page_visitors.get(page, 0) + 1
+        reached = int(doc.get('reached', 0))
+        names = doc.get('section_names', {})
+        while reached:
+            bit = reached & -reached
+            index = bit.bit_length() - 1
+            key = (page, names.get(str(index), str(index)), index, doc['total_sections'])
+            self.sections[key] = self.sections.get(key, 0) + 1
+            reached ^= bit
+
+    def response(self, days: int) -> Dict[str, Any]:
+        return stats_response(
+            days,
+            total_sessions=len(self.sessions),
+            total_events=self.events,
+            page_visitors=self.page_visitors,
+            sections=self.sections,
+            distinct="exact",
+        )
+
+
+def session_cutoff(days: int) -> datetime:
+    return datetime.now(timezone.utc) - timedelta(days=days)
+
+
+async def read_session_stats(db, days: int) -> Dict[str, Any]:
+    reach = SessionReach()
+    projection = {"_id": 0, "page": 1, "session_id": 1, "events": 1, "reached": 1,
+                  "section_names": 1, "total_sections": 1}
+    async for doc in db[SESSIONS].find({"last_seen": {"$gte": session_cutoff(days)}}, projection):
+        reach.add(doc)
+    return reach.response(days)
+
+
+def stats_from_sessions(sessions: Iterable[Dict[str, Any]], days: int) -> Dict[str, Any]:
+    cutoff = session_cutoff(days)
+    reach = SessionReach()
+    for doc in sessions:
+        if doc['last_seen'] >= cutoff:
+            reach.add(doc)
+    return reach.response(days)
+
+
+async def collapse_events(db, batch_size: int = 1000) -> int:
+    """Rebuild ``scroll_sessions`` from the raw ``scroll_events`` collection.
+
+    Run it before switching ingest to the ``sessions`` mode. The collection
+    is cleared first, so re-running it never double counts.
+    """
+    await db[SESSIONS].delete_many({})
+    processed = 0
+    batch: List[Dict[str, Any]] = []
+    async for doc in db.scroll_events.find({}, {"_id": 0}).batch_size(batch_size):
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            await apply_session_upserts(db, batch)
+            processed += len(batch)
+            batch = []
+    if batch:
+        await apply_session_upserts(db, batch)
+        processed += len(batch)
+    logger.info(f"Collapsed {processed} raw scroll events into {SESSIONS}")
+    return processed
@@ -1,26 +1,93 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import json
+import asyncio
+import hashlib
+import base64
+import time
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict, EmailStr
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field, ConfigDict, EmailStr, ValidationError
+from typing import List, Optional, Dict, Any, AsyncIterator
 import uuid
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
-from emergentintegrations.llm.chat import LlmChat, UserMessage
+from admission import HIGH, LOW, Admission, AdmissionError, AdmissionMiddleware, RoutePolicy, parse_budget
+from assessment_cache import AssessmentCache
+from assessment_jobs import AssessmentJobQueue, JobQueueFullError
+from assessment_stream import assessment_sse
+from idempotency import IdempotencyError, IdempotencyKeys
+from llm_governor import LLMGovernor, CircuitOpenError
+from stage_scoring import interpret_answers
+from scroll_buffer import ScrollEventBuffer, BufferFullError
+from scroll_payload import ScrollEventBatchV2, ScrollPayloadError, build_scroll_documents, decode_body
+from storage import StorageConfigError, create_storage
+from lead_stats import LeadStatsCache
+from metrics import (
+    PROMETHEUS_CONTENT_TYPE, REGISTRY, SIZE_BUCKETS, MetricsMiddleware, MongoCommandMetrics,
+)
+from fast_json import TrustedJSONResponse, model_defaults
+from exports import EXPORT_FORMATS, LEAD_EXPORT_FIELDS, SCROLL_EVENT_EXPORT_FIELDS, export_stream
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# Storage: MongoDB in production; STORAGE_BACKEND=memory runs the API without a database.
+# It is opened in the lifespan, so importing the app starts no Mongo client or monitor threads.
+storage = None
+
+def open_storage():
+    return create_storage(
+        os.environ.get('STORAGE_BACKEND', 'mongo'),
+        mongo_url=os.environ.get('MONGO_URL'),
+        db_name=os.environ.get('DB_NAME'),
+        scroll_storage_mode=os.environ.get('SCROLL_STORAGE_MODE', 'events'),
+        scroll_events_layout=os.environ.get('SCROLL_EVENTS_LAYOUT', 'documents'),
+        scroll_archive_dir=os.environ.get('SCROLL_ARCHIVE_DIR') or None,
+        tz_aware=True,
+        event_listeners=[MongoCommandMetrics()],
+        maxPoolSize=int(os.environ.get('MONGO_MAX_POOL_SIZE', '100')),
+        minPoolSize=int(os.environ.get('MONGO_MIN_POOL_SIZE', '0')),
+        maxIdleTimeMS=int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', '0')) or None,
+        serverSelectionTimeoutMS=int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000')),
+        connectTimeoutMS=int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', '5000')),
+        socketTimeoutMS=int(os.environ.get('MONGO_SOCKET_TIMEOUT_MS', '0')) or None,
+    )
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open storage and start the background workers, then close them on shutdown
+
+    Index creation and cache warm-up run in the background (see prepare_storage),
+    so /health/live answers right away and /health/ready once they are done.
+    """
+    global storage, storage_preparation
+    check_scroll_retention()
+    if storage is None:
+        # The load suite and the tests install their own storage before startup
+        storage = open_storage()
+    if ASSESSMENT_CACHE_PERSIST:
+        assessment_cache.collection = storage.collection('assessment_cache')
+    idempotency_keys.collection = storage.collection('idempotency_keys')
+    scroll_buffer.start()
+    assessment_jobs.start()
+    storage_preparation = asyncio.create_task(prepare_storage())
+    try:
+        yield
+    finally:
+        storage_preparation.cancel()
+        await scroll_buffer.close()
+        await storage.scroll_events.retry_rollups()
+        await close_assessment_jobs()
+        storage.close()
 
 # Create the main app without a prefix
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -70,6 +137,10 @@ class Lead(BaseModel):
     quiz_answers: Optional[Dict[str, str]] = None
     ai_assessment: Optional[Dict[str, Any]] = None
 
+class LeadPage(BaseModel):
+    leads: List[Lead]
+    next_cursor: Optional[str] = None
+
 # Stage Assessment Models
 class QuizAnswers(BaseModel):
     current_situation: Optional[str] = None
@@ -94,6 +165,13 @@ class StageAssessmentResponse(BaseModel):
     personalized_insight: str
     lead_id: str
 
+class StageAssessmentJob(BaseModel):
+    job_id: str
+    lead_id: str
+    status: str
+    result: Optional[StageAssessmentResponse] = None
+    error: Optional[str] = None
+
 # Admin Auth
 class AdminLogin(BaseModel):
     password: str
@@ -120,6 +198,55 @@ class ScrollEventStored(BaseModel):
     session_id: str
     viewport_height: Optional[int] = None
     timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    client_timestamp: Optional[datetime] = None
+
+# ============ ADMISSION CONTROL ============
+
+# Public write routes get a per-IP token bucket each ("<count>/<seconds>"; empty or 0 = unlimited).
+# Once ADMISSION_MAX_IN_FLIGHT requests are running, scroll analytics is shed from
+# ADMISSION_LOW_PRIORITY_SHARE of that and lead capture at the limit; admin routes are never shed
+SCROLL_BATCH_MAX_BYTES = int(os.environ.get('SCROLL_BATCH_MAX_BYTES', str(256 * 1024)))
+SCROLL_BATCH_MAX_EVENTS = int(os.environ.get('SCROLL_BATCH_MAX_EVENTS', '500'))
+MAX_FORM_BODY_BYTES = 64 * 1024
+SCROLL_SESSION_BUDGET = parse_budget(os.environ.get('RATE_LIMIT_SCROLL_SESSION', '600/60'))
+
+lead_policy = RoutePolicy(
+    "leads", HIGH, parse_budget(os.environ.get('RATE_LIMIT_LEADS', '10/60')), MAX_FORM_BODY_BYTES,
+)
+assessment_policy = RoutePolicy(
+    "stage-assessment", HIGH, parse_budget(os.environ.get('RATE_LIMIT_STAGE_ASSESSMENT', '5/60')), MAX_FORM_BODY_BYTES,
+)
+scroll_policy = RoutePolicy(
+    "scroll-events", LOW, parse_budget(os.environ.get('RATE_LIMIT_SCROLL_EVENTS', '120/60')), SCROLL_BATCH_MAX_BYTES,
+)
+
+admission = Admission(
+    [
+        ("POST", "/api/leads", lead_policy),
+        ("POST", "/api/stage-assessment", assessment_policy),
+        ("POST", "/api/stage-assessment/stream", assessment_policy),
+        ("POST", "/api/stage-assessment/jobs", assessment_policy),
+        ("POST", "/api/analytics/scroll-events", scroll_policy),
+        ("POST", "/api/analytics/scroll-events/batch", scroll_policy),
+        ("POST", "/api/analytics/scroll-events/v2", scroll_policy),
+    ],
+    max_in_flight=int(os.environ.get('ADMISSION_MAX_IN_FLIGHT', '256')),
+    low_priority_share=float(os.environ.get('ADMISSION_LOW_PRIORITY_SHARE', '0.5')),
+    # Client IP from X-Forwarded-For behind this many proxies (the ingress by default)
+    proxy_hops=int(os.environ.get('RATE_LIMIT_PROXY_HOPS', '1')),
+    enabled=os.environ.get('ADMISSION_CONTROL', 'true').lower() == 'true',
+)
+
+async def check_scroll_sessions(docs: List[Dict[str, Any]]):
+    """Charge each session's event count to its per-session bucket"""
+    counts: Dict[str, int] = {}
+    for doc in docs:
+        counts[doc['session_id']] = counts.get(doc['session_id'], 0) + 1
+    try:
+        for session_id, count in counts.items():
+            await admission.check(scroll_policy, "session", session_id, SCROLL_SESSION_BUDGET, count)
+    except AdmissionError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers=e.headers)
 
 # ============ ROUTES ============
 
@@ -127,62 +254,179 @@ class ScrollEventStored(BaseModel):
 async def root():
     return {"message": "FounderPlane API"}
 
+# List endpoints write stored documents straight out with orjson instead of
+# re-validating them through response_model (the OpenAPI schema is unchanged).
+# Projections keep to the model's fields, as response_model filtering would.
+FAST_JSON_RESPONSES = os.environ.get('FAST_JSON_RESPONSES', 'true').lower() == 'true'
+STATUS_CHECK_FIELDS = tuple(StatusCheck.model_fields)
+STATUS_CHECK_DEFAULTS = model_defaults(StatusCheck)
+LEAD_DEFAULTS = model_defaults(Lead)
+
+# status_checks is pruned by a TTL index; liveness polling uses /status/latest or /status/tail
+STATUS_CHECK_RETENTION_DAYS = int(os.environ.get('STATUS_CHECK_RETENTION_DAYS', '30'))
+MAX_STATUS_TAIL = 1000
+
 # Status endpoints
 @api_router.post("/status", response_model=StatusCheck)
 async def create_status_check(input: StatusCheckCreate):
     status_dict = input.model_dump()
     status_obj = StatusCheck(**status_dict)
     doc = status_obj.model_dump()
-    doc['timestamp'] = doc['timestamp'].isoformat()
-    _ = await db.status_checks.insert_one(doc)
+    await storage.status_checks.insert(doc)
     return status_obj
 
+def as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Stored datetimes are UTC-aware; a naive datetime from a query or cursor is taken as UTC"""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+def status_check_response(status_checks: List[Dict[str, Any]]):
+    if FAST_JSON_RESPONSES:
+        return TrustedJSONResponse([{**STATUS_CHECK_DEFAULTS, **check} for check in status_checks])
+    return status_checks
+
 @api_router.get("/status", response_model=List[StatusCheck])
 async def get_status_checks():
-    status_checks = await db.status_checks.find({}, {"_id": 0}).to_list(1000)
-    for check in status_checks:
-        if isinstance(check['timestamp'], str):
-            check['timestamp'] = datetime.fromisoformat(check['timestamp'])
-    return status_checks
+    """Most recent 1000 status checks, newest first"""
+    status_checks = await storage.status_checks.recent(1000, STATUS_CHECK_FIELDS)
+    return status_check_response(status_checks)
+
+@api_router.get("/status/latest", response_model=List[StatusCheck])
+async def get_latest_status_checks():
+    """Latest status check for each client_name
+
+    Walks the (client_name, timestamp) index once per client, so the cost
+    grows with the number of clients rather than the length of the history.
+    """
+    status_checks = await storage.status_checks.latest_per_client()
+    return status_check_response(status_checks)
+
+@api_router.get("/status/tail", response_model=List[StatusCheck])
+async def tail_status_checks(since: datetime, client_name: Optional[str] = None, limit: int = 100):
+    """Status checks after since, oldest first; poll again with the last timestamp returned"""
+    limit = max(1, min(limit, MAX_STATUS_TAIL))
+    status_checks = await storage.status_checks.tail(as_utc(since), client_name, limit, STATUS_CHECK_FIELDS)
+    return status_check_response(status_checks)
 
 # ============ LEAD ENDPOINTS ============
 
+# Dashboard stats are computed in one $facet pass and cached briefly;
+# lead writes below invalidate the cache
+lead_stats_cache = LeadStatsCache(lambda: storage.leads.stats(), ttl_seconds=float(os.environ.get('LEAD_STATS_CACHE_TTL', '10')))
+
+# LEAD_DEDUP_BY_EMAIL=true merges repeat submissions from the same email into one lead
+# (unique index on the normalized email); the first submission's id, created_at and status are kept.
+# Run `manage.py backfill-email-keys` before turning it on, so leads stored before it are merged into too
+LEAD_DEDUP_BY_EMAIL = os.environ.get('LEAD_DEDUP_BY_EMAIL', 'false').lower() == 'true'
+
+async def save_lead(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Insert a lead, or merge it into the lead with the same email in dedup mode; returns the stored lead"""
+    if LEAD_DEDUP_BY_EMAIL:
+        doc = await storage.leads.upsert_by_email(doc)
+    else:
+        await storage.leads.insert(doc)
+    lead_stats_cache.invalidate()
+    return doc
+
+# Requests sent with an Idempotency-Key are run once; repeats get the stored response back.
+# The collection is attached in the lifespan.
+idempotency_keys = IdempotencyKeys(
+    ttl_seconds=float(os.environ.get('IDEMPOTENCY_KEY_TTL', str(24 * 3600))),
+    wait_seconds=float(os.environ.get('IDEMPOTENCY_WAIT_SECONDS', '10')),
+)
+
+async def idempotent_response(scope: str, key: str, payload: Any, handler, status_code: int = 200) -> JSONResponse:
+    """Run ``handler`` once per Idempotency-Key and replay its response for repeats"""
+    async def run():
+        return status_code, jsonable_encoder(await handler())
+
+    try:
+        code, body, replayed = await idempotency_keys.run(scope, key, payload, run)
+    except IdempotencyError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers=e.headers)
+    return JSONResponse(body, status_code=code, headers={"Idempotent-Replayed": "true"} if replayed else None)
+
 @api_router.post("/leads", response_model=Lead, status_code=201)
-async def create_lead(lead_data: LeadCreate):
-    """Create a new lead from form submission"""
-    lead = Lead(**lead_data.model_dump())
-    doc = lead.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
-    await db.leads.insert_one(doc)
-    logger.info(f"New lead created: {lead.email} from {lead.source_page}")
-    return lead
+async def create_lead(
+    lead_data: LeadCreate,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    """Create a new lead from form submission
+
+    Repeats with the same Idempotency-Key get the first response back.
+    """
+    async def create():
+        lead = Lead(**await save_lead(Lead(**lead_data.model_dump()).model_dump()))
+        logger.info(f"New lead created: {lead.email} from {lead.source_page}")
+        return lead
+
+    if idempotency_key is None:
+        return await create()
+    return await idempotent_response("leads", idempotency_key, lead_data.model_dump(), create, status_code=201)
+
+LEAD_DETAIL_FIELDS = ('quiz_answers', 'ai_assessment')
+MAX_LEADS_PAGE_SIZE = 500
+
+def encode_lead_cursor(lead: Dict[str, Any]) -> str:
+    created_at = lead['created_at']
+    if isinstance(created_at, datetime):
+        created_at = created_at.isoformat()
+    payload = json.dumps([created_at, lead['id']])
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+def decode_lead_cursor(cursor: str):
+    try:
+        created_at, lead_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return as_utc(datetime.fromisoformat(created_at)), str(lead_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
-@api_router.get("/leads", response_model=List[Lead])
+def build_lead_query(service: Optional[str], stage: Optional[str], status: Optional[str]) -> Dict[str, Any]:
+    query = {}
+    if service:
+        query['service_interest'] = service
+    if stage:
+        query['stage'] = stage
+    if status:
+        query['status'] = status
+    return query
+
+@api_router.get("/leads", response_model=LeadPage)
 async def get_leads(
     service: Optional[str] = None,
     stage: Optional[str] = None,
     status: Optional[str] = None,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    include_details: bool = True,
     admin_password: Optional[str] = Header(None, alias="X-Admin-Password")
 ):
-    """Get all leads (admin only)"""
+    """Get leads newest first, one page at a time (admin only)
+
+    Pages are keyed on (created_at, id): pass next_cursor from the previous
+    page as cursor. include_details=false leaves out quiz_answers and
+    ai_assessment (fetch them per lead with GET /leads/{lead_id}).
+    """
     expected_password = os.environ.get('ADMIN_PASSWORD', 'founderplane2024')
     if admin_password != expected_password:
         raise HTTPException(status_code=401, detail="Unauthorized")
     
-    query = {}
-    if service:
-        query['service_interest'] = service
-    if stage:
-        query['stage'] = stage
-    if status:
-        query['status'] = status
-    
-    leads = await db.leads.find(query, {"_id": 0}).sort("created_at", -1).to_list(limit)
-    for lead in leads:
-        if isinstance(lead.get('created_at'), str):
-            lead['created_at'] = datetime.fromisoformat(lead['created_at'])
-    return leads
+    fields = [field for field in Lead.model_fields if include_details or field not in LEAD_DETAIL_FIELDS]
+    limit = max(1, min(limit, MAX_LEADS_PAGE_SIZE))
+    leads = await storage.leads.page(
+        build_lead_query(service, stage, status),
+        decode_lead_cursor(cursor) if cursor else None,
+        limit + 1,
+        fields,
+    )
+    next_cursor = encode_lead_cursor(leads[limit - 1]) if len(leads) > limit else None
+    if FAST_JSON_RESPONSES:
+        return TrustedJSONResponse({
+            "leads": [{**LEAD_DEFAULTS, **lead} for lead in leads[:limit]],
+            "next_cursor": next_cursor,
+        })
+    return {"leads": leads[:limit], "next_cursor": next_cursor}
 
 @api_router.patch("/leads/{lead_id}/status")
 async def update_lead_status(
@@ -199,13 +443,9 @@ async def update_lead_status(
     if status_update.status not in valid_statuses:
         raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {valid_statuses}")
     
-    result = await db.leads.update_one(
-        {"id": lead_id},
-        {"$set": {"status": status_update.status}}
-    )
-    
-    if result.modified_count == 0:
+    if not await storage.leads.update(lead_id, {"status": status_update.status}):
         raise HTTPException(status_code=404, detail="Lead not found")
+    lead_stats_cache.invalidate()
     
     return {"success": True, "status": status_update.status}
 
@@ -216,38 +456,22 @@ async def get_lead_stats(admin_password: Optional[str] = Header(None, alias="X-A
     if admin_password != expected_password:
         raise HTTPException(status_code=401, detail="Unauthorized")
     
-    total = await db.leads.count_documents({})
-    
-    # Get counts by service
-    pipeline = [
-        {"$group": {"_id": "$service_interest", "count": {"$sum": 1}}}
-    ]
-    by_service = await db.leads.aggregate(pipeline).to_list(100)
-    
-    # Get counts by stage
-    pipeline_stage = [
-        {"$group": {"_id": "$stage", "count": {"$sum": 1}}}
-    ]
-    by_stage = await db.leads.aggregate(pipeline_stage).to_list(100)
-    
-    # Get counts by status
-    pipeline_status = [
-        {"$group": {"_id": "$status", "count": {"$sum": 1}}}
-    ]
-    by_status = await db.leads.aggregate(pipeline_status).to_list(100)
-    
-    # Get recent (last 7 days)
-    from datetime import timedelta
-    week_ago = (datetime.now(timezone.utc) - timedelta(days=7)).isoformat()
-    recent = await db.leads.count_documents({"created_at": {"$gte": week_ago}})
+    return await lead_stats_cache.get()
+
+@api_router.get("/leads/{lead_id}", response_model=Lead)
+async def get_lead(
+    lead_id: str,
+    admin_password: Optional[str] = Header(None, alias="X-Admin-Password")
+):
+    """Get a single lead with its quiz answers and assessment (admin only)"""
+    expected_password = os.environ.get('ADMIN_PASSWORD', 'founderplane2024')
+    if admin_password != expected_password:
+        raise HTTPException(status_code=401, detail="Unauthorized")
     
-    return {
-        "total": total,
-        "recent_7_days": recent,
-        "by_service": {item["_id"] or "Unknown": item["count"] for item in by_service},
-        "by_stage": {item["_id"] or "Unknown": item["count"] for item in by_stage},
-        "by_status": {item["_id"] or "New": item["count"] for item in by_status}
-    }
+    lead = await storage.leads.get(lead_id)
+    if lead is None:
+        raise HTTPException(status_code=404, detail="Lead not found")
+    return lead
 
 # ============ ADMIN AUTH ============
 
@@ -261,28 +485,7 @@ async def admin_login(login: AdminLogin):
 
 # ============ AI STAGE ASSESSMENT ============
 
-@api_router.post("/stage-assessment", response_model=StageAssessmentResponse)
-async def create_stage_assessment(request: StageAssessmentRequest):
-    """Generate AI-powered stage assessment and save as lead"""
-    
-    answers = request.answers
-    user_details = request.user_details
-    
-    # Build context from quiz answers
-    quiz_context = f"""
-    User Quiz Responses:
-    1. Current Situation: {answers.get('current_situation', 'Not answered')}
-    2. Hardest Right Now: {answers.get('hardest_right_now', 'Not answered')}
-    3. Business Direction: {answers.get('business_direction', 'Not answered')}
-    4. Founder Dependency: {answers.get('dependency', 'Not answered')}
-    5. Scale Readiness: {answers.get('scale_readiness', 'Not answered')}
-    6. Decision Bottleneck: {answers.get('decision_bottleneck', 'Not answered')}
-    7. 6-Month Intent: {answers.get('intent', 'Not answered')}
-    
-    User Name: {user_details.get('name', 'Founder')}
-    """
-    
-    system_prompt = """You are a startup strategy advisor for FounderPlane, a consultancy helping founders at different stages. 
+ASSESSMENT_SYSTEM_PROMPT = """You are a startup strategy advisor for FounderPlane, a consultancy helping founders at different stages. 
     
     Based on the quiz answers, provide a JSON response with:
     1. stage: One of "Launch", "Growth", or "Scale"
@@ -299,173 +502,723 @@ async def create_stage_assessment(request: StageAssessmentRequest):
     7. personalized_insight: A personalized 3-4 sentence insight addressing them by name, specific to their situation
     
     Return ONLY valid JSON, no markdown."""
+
+ASSESSMENT_MODES = ('local', 'llm', 'hybrid')
+LLM_TIMEOUT_SECONDS = float(os.environ.get('LLM_TIMEOUT_SECONDS', '30'))
+
+# Every upstream LLM call goes through this governor
+llm_governor = LLMGovernor(
+    max_concurrency=int(os.environ.get('LLM_MAX_CONCURRENCY', '8')),
+    timeout=LLM_TIMEOUT_SECONDS,
+    failure_threshold=float(os.environ.get('LLM_BREAKER_FAILURE_RATE', '0.5')),
+    min_calls=int(os.environ.get('LLM_BREAKER_MIN_CALLS', '10')),
+    window_seconds=float(os.environ.get('LLM_BREAKER_WINDOW_SECONDS', '60')),
+    cooldown_seconds=float(os.environ.get('LLM_BREAKER_COOLDOWN_SECONDS', '30')),
+)
+
+# The LLM integration pulls in a large client stack; it is imported on first use
+# (or by the readiness warm-up) instead of when the app is imported
+LlmChat = None
+UserMessage = None
+
+def load_llm_client():
+    global LlmChat, UserMessage
+    if LlmChat is None:
+        from emergentintegrations.llm.chat import LlmChat as chat_class, UserMessage as message_class
+        LlmChat, UserMessage = chat_class, message_class
+    return LlmChat, UserMessage
+
+def create_llm_chat(system_message: str, session_prefix: str):
+    llm_key = os.environ.get('EMERGENT_LLM_KEY')
+    if not llm_key:
+        raise RuntimeError("LLM key not configured")
+    chat_class, _ = load_llm_client()
+    return chat_class(
+        api_key=llm_key,
+        session_id=f"{session_prefix}-{uuid.uuid4()}",
+        system_message=system_message
+    ).with_model("openai", "gpt-5.2")
+
+llm_call_duration = REGISTRY.histogram(
+    "llm_call_duration_seconds", "Upstream LLM call latency by outcome (ok, error, timeout)", ("outcome",),
+)
+llm_payload_bytes = REGISTRY.histogram(
+    "llm_payload_bytes", "LLM prompt and response sizes", ("direction",), buckets=SIZE_BUCKETS,
+)
+llm_parse_failures = REGISTRY.counter(
+    "llm_parse_failures_total", "LLM responses that could not be parsed as an assessment",
+)
+
+async def send_llm_message(system_message: str, text: str, session_prefix: str) -> str:
+    """Send one prompt through the governor; identical concurrent prompts share a call"""
+    async def call():
+        chat = create_llm_chat(system_message, session_prefix)
+        llm_payload_bytes.observe(len(text.encode('utf-8')), direction="request")
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            _, message_class = load_llm_client()
+            response = await chat.send_message(message_class(text=text))
+            outcome = "ok"
+        except asyncio.CancelledError:
+            # The governor cancels the call when its deadline passes
+            outcome = "timeout"
+            raise
+        finally:
+            llm_call_duration.observe(time.perf_counter() - started, outcome=outcome)
+        llm_payload_bytes.observe(len(response.encode('utf-8')), direction="response")
+        return response
+
+    key = hashlib.sha256(f"{system_message}\0{text}".encode('utf-8')).hexdigest()
+    return await llm_governor.call(key, call)
+
+# Assessments keyed by normalized quiz answers; only the insight is per-user.
+# With ASSESSMENT_CACHE_PERSIST the lifespan attaches the assessment_cache collection.
+ASSESSMENT_CACHE_PERSIST = os.environ.get('ASSESSMENT_CACHE_PERSIST', 'false').lower() == 'true'
+assessment_cache = AssessmentCache(
+    max_entries=int(os.environ.get('ASSESSMENT_CACHE_SIZE', '1024')),
+    ttl_seconds=float(os.environ.get('ASSESSMENT_CACHE_TTL', str(7 * 24 * 3600))),
+)
+
+def build_quiz_context(answers: Dict[str, str], user_details: Dict[str, str], local: Optional[Dict[str, Any]] = None) -> str:
+    """Build the LLM prompt from quiz answers (and, in hybrid mode, the fixed local result)"""
+    quiz_context = f"""
+    User Quiz Responses:
+    1. Current Situation: {answers.get('current_situation', 'Not answered')}
+    2. Hardest Right Now: {answers.get('hardest_right_now', 'Not answered')}
+    3. Business Direction: {answers.get('business_direction', 'Not answered')}
+    4. Founder Dependency: {answers.get('dependency', 'Not answered')}
+    5. Scale Readiness: {answers.get('scale_readiness', 'Not answered')}
+    6. Decision Bottleneck: {answers.get('decision_bottleneck', 'Not answered')}
+    7. 6-Month Intent: {answers.get('intent', 'Not answered')}
     
+    User Name: {user_details.get('name', 'Founder')}
+    """
+    if local:
+        quiz_context += f"""
+    Their stage has already been determined as {local['stage']} and their bottleneck as {local['bottleneck']}.
+    Use exactly these values and recommend {local['recommended_system']['name']}.
+    """
+    return quiz_context
+
+def parse_assessment_json(response: str) -> Dict[str, Any]:
+    """Parse the model's JSON answer, tolerating a markdown code fence"""
+    response_text = response.strip()
+    if response_text.startswith("```"):
+        response_text = response_text.split("```")[1]
+        if response_text.startswith("json"):
+            response_text = response_text[4:]
+    assessment = json.loads(response_text)
+    if not isinstance(assessment, dict):
+        raise json.JSONDecodeError("Assessment is not a JSON object", response_text, 0)
+    return assessment
+
+async def request_llm_assessment(answers: Dict[str, str], user_details: Dict[str, str], mode: str) -> Dict[str, Any]:
+    """Ask the LLM for an assessment (cached by answers); raises on any upstream failure"""
+    local = interpret_answers(answers, user_details.get('name')) if mode == 'hybrid' else None
+    name = user_details.get('name', '')
+    assessment = await assessment_cache.get(answers, name, variant=mode)
+    if assessment is not None:
+        logger.info(f"Assessment cache hit for {user_details.get('email')}")
+        return assessment
+
+    response = await send_llm_message(
+        ASSESSMENT_SYSTEM_PROMPT,
+        build_quiz_context(answers, user_details, local),
+        "stage-assessment",
+    )
+    assessment = parse_assessment_json(response)
+    if local:
+        # Local scoring owns the structural fields; the LLM only writes the narrative
+        for field in ('stage', 'bottleneck', 'recommended_system'):
+            assessment[field] = local[field]
+    await assessment_cache.put(answers, assessment, name, variant=mode)
+    return assessment
+
+async def compute_assessment(answers: Dict[str, str], user_details: Dict[str, str], mode: str) -> Dict[str, Any]:
+    """Assessment for the requested mode, falling back to local scoring if the LLM fails"""
+    if mode == 'local':
+        return {**interpret_answers(answers, user_details.get('name')), "source": "local"}
     try:
-        llm_key = os.environ.get('EMERGENT_LLM_KEY')
-        if not llm_key:
-            raise HTTPException(status_code=500, detail="LLM key not configured")
-        
-        chat = LlmChat(
-            api_key=llm_key,
-            session_id=f"stage-assessment-{uuid.uuid4()}",
-            system_message=system_prompt
-        ).with_model("openai", "gpt-5.2")
-        
-        user_message = UserMessage(text=quiz_context)
-        response = await chat.send_message(user_message)
-        
-        # Parse JSON response
-        import json
-        # Clean response if needed
-        response_text = response.strip()
-        if response_text.startswith("```"):
-            response_text = response_text.split("```")[1]
-            if response_text.startswith("json"):
-                response_text = response_text[4:]
-        
-        assessment = json.loads(response_text)
-        
-        # Create lead from assessment
-        lead = Lead(
-            name=user_details.get('name', ''),
-            email=user_details.get('email', ''),
-            phone=user_details.get('phone', ''),
-            stage=assessment.get('stage', ''),
-            service_interest=assessment.get('recommended_system', {}).get('name', ''),
-            source_page='Stage Clarity Check',
-            message=f"Quiz completed. Stage: {assessment.get('stage')}. Bottleneck: {assessment.get('bottleneck')}."
-        )
-        
-        doc = lead.model_dump()
-        doc['created_at'] = doc['created_at'].isoformat()
-        doc['quiz_answers'] = answers
-        doc['ai_assessment'] = assessment
-        await db.leads.insert_one(doc)
-        
-        logger.info(f"AI Assessment completed for {user_details.get('email')}: Stage={assessment.get('stage')}")
-        
-        return StageAssessmentResponse(
-            stage=assessment.get('stage', 'Launch'),
-            bottleneck=assessment.get('bottleneck', 'Clarity'),
-            stage_description=assessment.get('stage_description', ''),
-            bottleneck_description=assessment.get('bottleneck_description', ''),
-            what_to_avoid=assessment.get('what_to_avoid', ''),
-            recommended_system=assessment.get('recommended_system', {
-                "name": "BoltGuider",
-                "description": "A guided clarity system",
-                "route": "/services/boltguider"
-            }),
-            personalized_insight=assessment.get('personalized_insight', ''),
-            lead_id=lead.id
-        )
-        
+        assessment = await request_llm_assessment(answers, user_details, mode)
+        return {**assessment, "source": mode}
+    except asyncio.TimeoutError:
+        logger.warning(f"LLM assessment timed out after {LLM_TIMEOUT_SECONDS}s, using local scoring")
+    except CircuitOpenError:
+        logger.warning("LLM circuit breaker open, using local scoring")
     except json.JSONDecodeError as e:
-        logger.error(f"Failed to parse AI response: {e}")
-        raise HTTPException(status_code=500, detail="Failed to parse AI assessment")
+        llm_parse_failures.inc()
+        logger.error(f"Failed to parse AI response, using local scoring: {e}")
     except Exception as e:
-        logger.error(f"AI assessment error: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        logger.error(f"AI assessment error, using local scoring: {e}")
+    return {**interpret_answers(answers, user_details.get('name')), "source": "local-fallback"}
+
+def build_assessment_lead(answers: Dict[str, str], user_details: Dict[str, str], assessment: Dict[str, Any]) -> Dict[str, Any]:
+    """Lead document for a completed assessment"""
+    lead = Lead(
+        name=user_details.get('name', ''),
+        email=user_details.get('email', ''),
+        phone=user_details.get('phone', ''),
+        stage=assessment.get('stage', ''),
+        service_interest=assessment.get('recommended_system', {}).get('name', ''),
+        source_page='Stage Clarity Check',
+        message=f"Quiz completed. Stage: {assessment.get('stage')}. Bottleneck: {assessment.get('bottleneck')}."
+    )
+    doc = lead.model_dump()
+    doc['quiz_answers'] = answers
+    doc['ai_assessment'] = assessment
+    return doc
+
+def to_assessment_response(assessment: Dict[str, Any], lead_id: str) -> StageAssessmentResponse:
+    return StageAssessmentResponse(
+        stage=assessment.get('stage', 'Launch'),
+        bottleneck=assessment.get('bottleneck', 'Clarity'),
+        stage_description=assessment.get('stage_description', ''),
+        bottleneck_description=assessment.get('bottleneck_description', ''),
+        what_to_avoid=assessment.get('what_to_avoid', ''),
+        recommended_system=assessment.get('recommended_system', {
+            "name": "BoltGuider",
+            "description": "A guided clarity system",
+            "route": "/services/boltguider"
+        }),
+        personalized_insight=assessment.get('personalized_insight', ''),
+        lead_id=lead_id
+    )
+
+@api_router.post("/stage-assessment", response_model=StageAssessmentResponse)
+async def create_stage_assessment(
+    request: StageAssessmentRequest,
+    mode: str = "llm",
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    """Generate a stage assessment and save as lead
+
+    mode=local scores the answers deterministically, mode=llm asks the LLM,
+    mode=hybrid scores locally and has the LLM write the narrative. LLM modes
+    fall back to local scoring on timeout or an unparseable response.
+    Repeats with the same Idempotency-Key get the first response back
+    without another LLM call.
+    """
+    if mode not in ASSESSMENT_MODES:
+        raise HTTPException(status_code=400, detail=f"Invalid mode. Must be one of: {list(ASSESSMENT_MODES)}")
+
+    answers = request.answers
+    user_details = request.user_details
+
+    async def assess():
+        assessment = await compute_assessment(answers, user_details, mode)
+        doc = await save_lead(build_assessment_lead(answers, user_details, assessment))
+        logger.info(f"Assessment ({assessment['source']}) completed for {user_details.get('email')}: Stage={assessment.get('stage')}")
+        return to_assessment_response(assessment, doc['id'])
+
+    if idempotency_key is None:
+        return await assess()
+    return await idempotent_response("stage-assessment", idempotency_key, {"mode": mode, **request.model_dump()}, assess)
+
+@api_router.get("/llm/stats")
+async def get_llm_stats(admin_password: Optional[str] = Header(None, alias="X-Admin-Password")):
+    """LLM governor counters: latency, in-flight calls, breaker trips, coalesced hits (admin only)"""
+    expected_password = os.environ.get('ADMIN_PASSWORD', 'founderplane2024')
+    if admin_password != expected_password:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    return llm_governor.stats()
+
+# ============ STREAMING ASSESSMENT ============
+
+async def llm_token_stream(answers: Dict[str, str], user_details: Dict[str, str], local: Optional[Dict[str, Any]]) -> AsyncIterator[str]:
+    """Yield the model's response text as it is generated
+
+    Uses the chat client's stream_message when available; otherwise the whole
+    response arrives as a single chunk through the governor's shared call.
+    """
+    text = build_quiz_context(answers, user_details, local)
+    chat = create_llm_chat(ASSESSMENT_SYSTEM_PROMPT, "stage-assessment")
+    stream_message = getattr(chat, 'stream_message', None)
+    if stream_message is None:
+        yield await send_llm_message(ASSESSMENT_SYSTEM_PROMPT, text, "stage-assessment")
+        return
+    _, message_class = load_llm_client()
+    async for chunk in llm_governor.stream(lambda: stream_message(message_class(text=text))):
+        yield chunk
+
+@api_router.post("/stage-assessment/stream")
+async def stream_stage_assessment(request: StageAssessmentRequest, mode: str = "llm"):
+    """Stream a stage assessment as server-sent events
+
+    Emits a local-scoring `provisional` event immediately, a `field` event per
+    model field as it is generated, and a `complete` event carrying the same
+    payload as /stage-assessment (including lead_id) once the lead is saved.
+    """
+    if mode not in ASSESSMENT_MODES:
+        raise HTTPException(status_code=400, detail=f"Invalid mode. Must be one of: {list(ASSESSMENT_MODES)}")
+
+    answers = request.answers
+    user_details = request.user_details
+    name = user_details.get('name', '')
+    local = interpret_answers(answers, name)
+    provisional = {
+        "stage": local['stage'],
+        "bottleneck": local['bottleneck'],
+        "recommended_system": local['recommended_system'],
+        "source": "local",
+    }
+
+    tokens = None
+    fallback_source = "local-fallback"
+    fallback_assessment = local
+    if mode == 'local':
+        fallback_source = "local"
+    else:
+        cached = await assessment_cache.get(answers, name, variant=mode)
+        if cached is not None:
+            fallback_source, fallback_assessment = mode, cached
+        else:
+            tokens = llm_token_stream(answers, user_details, local if mode == 'hybrid' else None)
+
+    async def finalize(assessment: Dict[str, Any]) -> Dict[str, Any]:
+        if 'source' not in assessment:
+            # Fresh model output
+            if mode == 'hybrid':
+                for field in ('stage', 'bottleneck', 'recommended_system'):
+                    assessment[field] = local[field]
+            await assessment_cache.put(answers, assessment, name, variant=mode)
+            assessment = {**assessment, "source": mode}
+        doc = await save_lead(build_assessment_lead(answers, user_details, assessment))
+        logger.info(f"Streamed assessment ({assessment['source']}) completed for {user_details.get('email')}")
+        return to_assessment_response(assessment, doc['id']).model_dump()
+
+    return StreamingResponse(
+        assessment_sse(
+            tokens,
+            fallback=lambda: {**fallback_assessment, "source": fallback_source},
+            finalize=finalize,
+            provisional=provisional,
+            timeout=LLM_TIMEOUT_SECONDS,
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# ============ ASSESSMENT JOBS ============
+
+async def run_assessment_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Worker body: compute the assessment and write it back onto the provisional lead"""
+    try:
+        assessment = await compute_assessment(payload['answers'], payload['user_details'], payload['mode'])
+        await storage.leads.update(payload['lead_id'], {
+            "stage": assessment.get('stage', ''),
+            "service_interest": assessment.get('recommended_system', {}).get('name', ''),
+            "message": f"Quiz completed. Stage: {assessment.get('stage')}. Bottleneck: {assessment.get('bottleneck')}.",
+            "ai_assessment": assessment,
+            "assessment_status": "complete",
+        })
+    except BaseException:
+        # Includes the job timeout cancelling this task
+        await asyncio.shield(mark_assessments_failed([payload['lead_id']]))
+        raise
+    lead_stats_cache.invalidate()
+    logger.info(f"Assessment job ({assessment['source']}) completed for lead {payload['lead_id']}")
+    return to_assessment_response(assessment, payload['lead_id']).model_dump()
+
+assessment_jobs = AssessmentJobQueue(
+    run_assessment_job,
+    max_queue=int(os.environ.get('ASSESSMENT_JOB_QUEUE_SIZE', '1000')),
+    workers=int(os.environ.get('ASSESSMENT_JOB_WORKERS', '4')),
+    job_timeout=float(os.environ.get('ASSESSMENT_JOB_TIMEOUT', '60')),
+)
+# How long shutdown waits for queued assessment jobs before marking their leads failed
+ASSESSMENT_JOB_DRAIN_SECONDS = float(os.environ.get('ASSESSMENT_JOB_DRAIN_SECONDS', '10'))
+
+async def mark_assessments_failed(lead_ids: List[str]):
+    """Leads whose assessment job will not run keep the provisional assessment, marked failed"""
+    for lead_id in lead_ids:
+        try:
+            await storage.leads.update(lead_id, {"assessment_status": "failed"})
+        except Exception as e:
+            logger.error(f"Could not mark the assessment of lead {lead_id} failed: {e}")
+
+async def close_assessment_jobs():
+    abandoned = await assessment_jobs.close(ASSESSMENT_JOB_DRAIN_SECONDS)
+    if abandoned:
+        logger.warning(f"Marking {len(abandoned)} unfinished assessment jobs failed")
+        await mark_assessments_failed([job['lead_id'] for job in abandoned])
+
+def to_job_response(job: Dict[str, Any], lead_id: str) -> StageAssessmentJob:
+    return StageAssessmentJob(
+        job_id=job['job_id'],
+        lead_id=lead_id,
+        status=job['status'],
+        result=job['result'],
+        error=job['error'],
+    )
+
+@api_router.post("/stage-assessment/jobs", response_model=StageAssessmentJob, status_code=202)
+async def create_stage_assessment_job(
+    request: StageAssessmentRequest,
+    mode: str = "llm",
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    """Queue a stage assessment and return the job id and provisional lead id right away
+
+    The lead is saved immediately with a local-scoring assessment; a background
+    worker replaces it with the requested mode's result. Repeats with the same
+    Idempotency-Key get the first job back instead of queueing another.
+    """
+    if mode not in ASSESSMENT_MODES:
+        raise HTTPException(status_code=400, detail=f"Invalid mode. Must be one of: {list(ASSESSMENT_MODES)}")
+
+    answers = request.answers
+    user_details = request.user_details
+
+    async def enqueue():
+        # Hold a queue slot before saving, so a full queue never leaves a lead pending
+        try:
+            assessment_jobs.reserve()
+        except JobQueueFullError:
+            raise HTTPException(status_code=503, detail="Assessment queue full", headers={"Retry-After": "5"})
+        try:
+            provisional = {**interpret_answers(answers, user_details.get('name')), "source": "local-provisional"}
+            doc = build_assessment_lead(answers, user_details, provisional)
+            doc['assessment_status'] = "pending"
+            doc = await save_lead(doc)
+        except BaseException:
+            assessment_jobs.release()
+            raise
+        try:
+            job = assessment_jobs.submit({
+                "answers": answers,
+                "user_details": user_details,
+                "mode": mode,
+                "lead_id": doc['id'],
+            }, meta={"lead_id": doc['id']}, reserved=True)
+        except JobQueueFullError:
+            # Only when shutting down; the lead keeps its provisional assessment
+            await mark_assessments_failed([doc['id']])
+            raise HTTPException(status_code=503, detail="Assessment queue closed", headers={"Retry-After": "5"})
+        return to_job_response(job, doc['id'])
+
+    if idempotency_key is None:
+        return await enqueue()
+    return await idempotent_response(
+        "stage-assessment-jobs", idempotency_key, {"mode": mode, **request.model_dump()}, enqueue, status_code=202,
+    )
+
+@api_router.get("/stage-assessment/jobs/{job_id}", response_model=StageAssessmentJob)
+async def get_stage_assessment_job(job_id: str, wait: float = 0):
+    """Job status; wait=N long-polls up to N seconds (max 30) for completion"""
+    job = await assessment_jobs.wait(job_id, timeout=min(max(wait, 0), 30))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return to_job_response(job, job['lead_id'])
 
 # ============ SCROLL ANALYTICS ============
 
-@api_router.post("/analytics/scroll-events", status_code=201)
+# Raw events expire after SCROLL_EVENT_RETENTION_DAYS (0 = never); `manage.py archive-scroll-events`
+# copies days older than SCROLL_ARCHIVE_AFTER_DAYS to Parquet under SCROLL_ARCHIVE_DIR first
+SCROLL_EVENT_RETENTION_DAYS = int(os.environ.get('SCROLL_EVENT_RETENTION_DAYS', '0'))
+SCROLL_ARCHIVE_AFTER_DAYS = int(os.environ.get('SCROLL_ARCHIVE_AFTER_DAYS', '30'))
+
+def check_scroll_retention():
+    """Refuse to start with an archive that the TTL would outrun; see scroll_archive.min_retention_days"""
+    if SCROLL_EVENT_RETENTION_DAYS <= 0:
+        return
+    if not os.environ.get('SCROLL_ARCHIVE_DIR'):
+        logger.warning(f"Scroll events expire after {SCROLL_EVENT_RETENTION_DAYS} days without being archived "
+                       f"(SCROLL_ARCHIVE_DIR is not set)")
+        return
+    from scroll_archive import min_retention_days
+    minimum = min_retention_days(SCROLL_ARCHIVE_AFTER_DAYS)
+    if SCROLL_EVENT_RETENTION_DAYS < minimum:
+        raise StorageConfigError(
+            f"SCROLL_EVENT_RETENTION_DAYS ({SCROLL_EVENT_RETENTION_DAYS}) must be at least {minimum} with "
+            f"SCROLL_ARCHIVE_AFTER_DAYS={SCROLL_ARCHIVE_AFTER_DAYS}, or events expire before they are archived"
+        )
+
+async def write_scroll_events(docs: List[Dict[str, Any]]):
+    await storage.scroll_events.insert_many(docs)
+
+# Write-behind buffer: events are acknowledged immediately and flushed in batches
+scroll_buffer = ScrollEventBuffer(
+    write_scroll_events,
+    max_events=int(os.environ.get('SCROLL_BUFFER_MAX_EVENTS', '20000')),
+    flush_size=int(os.environ.get('SCROLL_BUFFER_FLUSH_SIZE', '500')),
+    flush_interval=float(os.environ.get('SCROLL_BUFFER_FLUSH_INTERVAL', '1.0')),
+    put_timeout=float(os.environ.get('SCROLL_BUFFER_PUT_TIMEOUT', '0.5')),
+)
+
+async def buffer_scroll_events(docs: List[Dict[str, Any]]):
+    await check_scroll_sessions(docs)
+    try:
+        await scroll_buffer.add(docs)
+    except BufferFullError:
+        logger.warning(f"Scroll event buffer full, rejecting {len(docs)} events")
+        raise HTTPException(status_code=503, detail="Analytics ingest busy", headers={"Retry-After": "1"})
+
+@api_router.post("/analytics/scroll-events", status_code=202)
 async def track_scroll_event(event: ScrollEvent):
     """Track a scroll event when user reaches a page section"""
     stored = ScrollEventStored(**event.model_dump())
     doc = stored.model_dump()
-    doc['timestamp'] = doc['timestamp'].isoformat()
-    await db.scroll_events.insert_one(doc)
+    await buffer_scroll_events([doc])
     return {"success": True}
 
-@api_router.post("/analytics/scroll-events/batch", status_code=201)
+@api_router.post("/analytics/scroll-events/batch", status_code=202)
 async def track_scroll_events_batch(events: List[ScrollEvent]):
     """Track multiple scroll events in one request"""
+    if len(events) > SCROLL_BATCH_MAX_EVENTS:
+        raise HTTPException(status_code=413, detail=f"At most {SCROLL_BATCH_MAX_EVENTS} events per batch")
     docs = []
     for event in events:
         stored = ScrollEventStored(**event.model_dump())
-        doc = stored.model_dump()
-        doc['timestamp'] = doc['timestamp'].isoformat()
-        docs.append(doc)
+        docs.append(stored.model_dump())
+    await buffer_scroll_events(docs)
+    return {"success": True, "count": len(docs)}
+
+# v2 batches: session header + parallel arrays, optionally gzipped (see scroll_payload)
+@api_router.post(
+    "/analytics/scroll-events/v2",
+    status_code=202,
+    openapi_extra={"requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": ScrollEventBatchV2.model_json_schema()}},
+    }},
+)
+async def track_scroll_events_v2(request: Request):
+    """Track a columnar batch of scroll events from one session (gzip bodies accepted)"""
+    try:
+        body = decode_body(await request.body(), request.headers.get('content-encoding'), SCROLL_BATCH_MAX_BYTES)
+    except ScrollPayloadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    try:
+        batch = ScrollEventBatchV2.model_validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError([{**error, 'loc': ('body', *error['loc'])} for error in e.errors(include_url=False)])
+    if len(batch.sections) > SCROLL_BATCH_MAX_EVENTS:
+        raise HTTPException(status_code=413, detail=f"At most {SCROLL_BATCH_MAX_EVENTS} events per batch")
+    docs = build_scroll_documents(batch, datetime.now(timezone.utc))
     if docs:
-        await db.scroll_events.insert_many(docs)
+        await buffer_scroll_events(docs)
     return {"success": True, "count": len(docs)}
 
 @api_router.get("/analytics/scroll-stats")
 async def get_scroll_stats(
     admin_password: Optional[str] = Header(None, alias="X-Admin-Password"),
-    days: int = 30
+    days: int = 30,
+    distinct: str = "approx"
 ):
-    """Get scroll analytics stats (admin only)"""
+    """Get scroll analytics stats (admin only)
+
+    distinct=approx merges HyperLogLog sketches from the daily rollups
+    (~1.6% standard error); distinct=exact counts sessions from raw events.
+    With SCROLL_STORAGE_MODE=sessions both are answered exactly from the
+    per-session documents.
+    """
     expected_password = os.environ.get('ADMIN_PASSWORD', 'founderplane2024')
     if admin_password != expected_password:
         raise HTTPException(status_code=401, detail="Unauthorized")
 
-    from datetime import timedelta
-    cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
-
-    # Total unique sessions
-    pipeline_sessions = [
-        {"$match": {"timestamp": {"$gte": cutoff}}},
-        {"$group": {"_id": "$session_id"}},
-        {"$count": "total"}
-    ]
-    session_result = await db.scroll_events.aggregate(pipeline_sessions).to_list(1)
-    total_sessions = session_result[0]["total"] if session_result else 0
-
-    # Per-page section reach (how many unique sessions reached each section)
-    pipeline_pages = [
-        {"$match": {"timestamp": {"$gte": cutoff}}},
-        {"$group": {
-            "_id": {"page": "$page", "section": "$section", "section_index": "$section_index", "total_sections": "$total_sections"},
-            "unique_sessions": {"$addToSet": "$session_id"},
-        }},
-        {"$project": {
-            "page": "$_id.page",
-            "section": "$_id.section",
-            "section_index": "$_id.section_index",
-            "total_sections": "$_id.total_sections",
-            "reach_count": {"$size": "$unique_sessions"},
-            "_id": 0
-        }},
-        {"$sort": {"page": 1, "section_index": 1}}
-    ]
-    section_stats = await db.scroll_events.aggregate(pipeline_pages).to_list(500)
-
-    # Unique sessions per page
-    pipeline_page_sessions = [
-        {"$match": {"timestamp": {"$gte": cutoff}}},
-        {"$group": {
-            "_id": "$page",
-            "unique_sessions": {"$addToSet": "$session_id"}
-        }},
-        {"$project": {
-            "page": "$_id",
-            "total_visitors": {"$size": "$unique_sessions"},
-            "_id": 0
-        }},
-        {"$sort": {"total_visitors": -1}}
-    ]
-    page_sessions = await db.scroll_events.aggregate(pipeline_page_sessions).to_list(100)
-
-    # Recent events count
-    total_events = await db.scroll_events.count_documents({"timestamp": {"$gte": cutoff}})
-
-    return {
-        "total_sessions": total_sessions,
-        "total_events": total_events,
-        "days": days,
-        "page_visitors": page_sessions,
-        "section_stats": section_stats
-    }
+    if distinct not in ("approx", "exact"):
+        raise HTTPException(status_code=400, detail="distinct must be 'approx' or 'exact'")
+    return await storage.scroll_events.stats(days, distinct)
+
+def require_raw_scroll_events():
+    """409 for endpoints that read raw events, which SCROLL_STORAGE_MODE=sessions does not keep"""
+    if not storage.scroll_events.stores_raw_events:
+        raise HTTPException(
+            status_code=409,
+            detail="Raw scroll events are not stored with SCROLL_STORAGE_MODE=sessions; use /analytics/scroll-stats",
+        )
+
+# Funnel: pandas over an in-process snapshot of per-session depth and leads, refreshed incrementally.
+# It reads raw events, so it is not available with SCROLL_STORAGE_MODE=sessions.
+FUNNEL_SNAPSHOT_TTL = float(os.environ.get('FUNNEL_SNAPSHOT_TTL', '60'))
+FUNNEL_SNAPSHOT_DAYS = int(os.environ.get('FUNNEL_SNAPSHOT_DAYS', '90'))
+FUNNEL_LOAD_BATCH_SIZE = 5000
+
+# Built on the first request: pandas is the bulk of the app's import time
+funnel_snapshot = None
+
+def get_funnel_snapshot():
+    global funnel_snapshot
+    if funnel_snapshot is None:
+        from scroll_funnel import FunnelSnapshot
+        funnel_snapshot = FunnelSnapshot(
+            lambda since: storage.scroll_events.export({}, since, None, FUNNEL_LOAD_BATCH_SIZE),
+            lambda since: storage.leads.export({}, since, None, FUNNEL_LOAD_BATCH_SIZE),
+            max_age_seconds=FUNNEL_SNAPSHOT_TTL,
+            retention_days=FUNNEL_SNAPSHOT_DAYS,
+        )
+    return funnel_snapshot
+
+@api_router.get("/analytics/funnel")
+async def get_scroll_funnel(
+    admin_password: Optional[str] = Header(None, alias="X-Admin-Password"),
+    days: int = 30,
+    page: Optional[str] = None
+):
+    """Section-to-section drop-off, median depth and lead conversion per page and daily cohort (admin only)"""
+    expected_password = os.environ.get('ADMIN_PASSWORD', 'founderplane2024')
+    if admin_password != expected_password:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+    if not 1 <= days <= FUNNEL_SNAPSHOT_DAYS:
+        raise HTTPException(status_code=400, detail=f"days must be between 1 and {FUNNEL_SNAPSHOT_DAYS}")
+    require_raw_scroll_events()
+    snapshot = get_funnel_snapshot()
+    report = await snapshot.report(days, page)
+    return {**report, "snapshot": {
+        "refreshed_at": snapshot.refreshed_at,
+        "sessions": len(snapshot.sessions),
+        "leads": len(snapshot.leads),
+    }}
+
+# ============ EXPORTS ============
+
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', '1000'))
+
+def export_response(documents, fields, name: str, format: str, gzip: bool) -> StreamingResponse:
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    filename = f"{name}-{datetime.now(timezone.utc).strftime('%Y-%m-%d')}.{format}"
+    media_type = EXPORT_FORMATS[format]
+    if gzip:
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(
+        export_stream(documents, fields, format, batch_size=EXPORT_BATCH_SIZE, gzip=gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@api_router.get("/export/leads")
+async def export_leads(
+    format: str = "ndjson",
+    service: Optional[str] = None,
+    stage: Optional[str] = None,
+    status: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    gzip: bool = False,
+    admin_password: Optional[str] = Header(None, alias="X-Admin-Password")
+):
+    """Stream all matching leads, oldest first, as NDJSON or CSV (admin only)
+
+    Takes the same filters as GET /leads plus a created_at range
+    [since, until). gzip=true compresses the stream on the fly.
+    """
+    expected_password = os.environ.get('ADMIN_PASSWORD', 'founderplane2024')
+    if admin_password != expected_password:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+    documents = storage.leads.export(
+        build_lead_query(service, stage, status), as_utc(since), as_utc(until), EXPORT_BATCH_SIZE,
+    )
+    return export_response(documents, LEAD_EXPORT_FIELDS, "founderplane-leads", format, gzip)
+
+@api_router.get("/export/scroll-events")
+async def export_scroll_events(
+    format: str = "ndjson",
+    page: Optional[str] = None,
+    session_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    gzip: bool = False,
+    admin_password: Optional[str] = Header(None, alias="X-Admin-Password")
+):
+    """Stream raw scroll events, oldest first, as NDJSON or CSV (admin only)
+
+    Not available with SCROLL_STORAGE_MODE=sessions, which keeps no raw events.
+    """
+    expected_password = os.environ.get('ADMIN_PASSWORD', 'founderplane2024')
+    if admin_password != expected_password:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    require_raw_scroll_events()
+
+    filters = {}
+    if page:
+        filters['page'] = page
+    if session_id:
+        filters['session_id'] = session_id
+    documents = storage.scroll_events.export(filters, as_utc(since), as_utc(until), EXPORT_BATCH_SIZE)
+    return export_response(documents, SCROLL_EVENT_EXPORT_FIELDS, "founderplane-scroll-events", format, gzip)
 
 # Include the router in the main app
 app.include_router(api_router)
 
-# Health check endpoint for Kubernetes
+# ============ HEALTH ============
+
+READINESS_TIMEOUT_SECONDS = float(os.environ.get('READINESS_TIMEOUT_SECONDS', '2'))
+storage_preparation: Optional[asyncio.Task] = None
+storage_ready = False
+
+async def warm_caches():
+    """Prime the dashboard stats and import the LLM integration before traffic arrives"""
+    try:
+        await lead_stats_cache.get()
+    except Exception as e:
+        logger.warning(f"Lead stats warm-up failed: {e}")
+    try:
+        await asyncio.to_thread(load_llm_client)
+    except ImportError as e:
+        logger.error(f"LLM integration unavailable, assessments will fall back to local scoring: {e}")
+
+async def prepare_storage():
+    """Create indexes, retrying until storage is reachable, then warm caches; /health/ready waits for this"""
+    global storage_ready
+    delay = 1.0
+    while True:
+        try:
+            await storage.ensure_indexes(STATUS_CHECK_RETENTION_DAYS, SCROLL_EVENT_RETENTION_DAYS)
+            await assessment_cache.ensure_indexes()
+            await idempotency_keys.ensure_indexes()
+            break
+        except Exception as e:
+            logger.warning(f"Storage not ready, retrying in {delay:.0f}s: {e}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30)
+    await warm_caches()
+    storage_ready = True
+    logger.info("Storage prepared, ready for traffic")
+
+# Liveness: the process is up and its event loop answers. /health is kept for existing probes.
 @app.get("/health")
+@app.get("/health/live")
 async def health_check():
     return {"status": "healthy", "service": "founderplane-backend"}
 
+# Readiness: indexes are built, caches are warm and storage answers a ping within READINESS_TIMEOUT_SECONDS
+@app.get("/health/ready")
+async def readiness_check():
+    if not storage_ready:
+        return JSONResponse({"status": "starting", "service": "founderplane-backend"}, status_code=503)
+    try:
+        await asyncio.wait_for(storage.ping(), READINESS_TIMEOUT_SECONDS)
+    except Exception as e:
+        logger.warning(f"Readiness check failed, storage unreachable: {e!r}")
+        return JSONResponse({"status": "unavailable", "service": "founderplane-backend"}, status_code=503)
+    return {"status": "ready", "service": "founderplane-backend", "storage": storage.backend}
+
+# Queue depths, admission rejections and LLM governor state, read at scrape time
+REGISTRY.gauge("scroll_buffer_events", "Scroll events waiting to be flushed", lambda: {(): len(scroll_buffer)})
+REGISTRY.gauge("assessment_job_queue_depth", "Assessment jobs waiting for a worker", lambda: {(): assessment_jobs.depth})
+REGISTRY.gauge("http_requests_in_flight", "HTTP requests being handled", lambda: {(): admission.in_flight})
+REGISTRY.callback_counter(
+    "admission_rejected_requests_total", "Requests rejected by admission control since start, by route and reason",
+    lambda: dict(admission.rejections), ("route", "reason"),
+)
+REGISTRY.gauge("llm_in_flight", "Upstream LLM calls in flight", lambda: {(): llm_governor.in_flight})
+REGISTRY.gauge(
+    "llm_circuit_state", "LLM circuit breaker state (1 for the current state)",
+    lambda: {(llm_governor.state,): 1}, ("state",),
+)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics: request, Mongo command and LLM call latencies"""
+    return Response(REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+# Inside CORS, so 429/503 rejections still carry the CORS headers
+app.add_middleware(AdmissionMiddleware, admission=admission)
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -473,7 +1226,4 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
+app.add_middleware(MetricsMiddleware)
@@ -0,0 +1,160 @@
+"""Deterministic stage assessment scoring.
+
+Python port of ``scoreAnswers``/``interpretAnswers`` from
+``frontend/src/components/StageClarityCheck/logic.ts``: each answer adds
+weighted points to stage, bottleneck and engagement scorecards, and the
+highest score on each axis wins (ties go to the earliest entry, and to the
+earliest stage). The weights are keyed by the question ids and option values
+the quiz actually submits (``questions.ts``).
+"""
+from typing import Dict, Optional, Tuple
+
+STAGES = ('Launch', 'Growth', 'Scale')
+BOTTLENECKS = ('Clarity', 'Positioning', 'Revenue', 'Systems', 'Founder Dependency')
+ENGAGEMENTS = ('Self-guided', 'Guided', 'Execution-ready')
+
+# question id -> option value -> list of (axis, key, points)
+WEIGHTS: Dict[str, Dict[str, Tuple[Tuple[str, str, int], ...]]] = {
+    'current_situation': {
+        'exploring': (('stage', 'Launch', 3), ('bottleneck', 'Clarity', 2), ('engagement', 'Guided', 1)),
+        'early_launch': (('stage', 'Launch', 2), ('bottleneck', 'Clarity', 1), ('engagement', 'Guided', 1)),
+        'launched_inconsistent': (('stage', 'Growth', 2), ('bottleneck', 'Revenue', 1), ('engagement', 'Execution-ready', 1)),
+        'consistent_revenue': (('stage', 'Growth', 2), ('bottleneck', 'Systems', 1), ('engagement', 'Execution-ready', 1)),
+        'team_growing': (('stage', 'Scale', 2), ('bottleneck', 'Founder Dependency', 1), ('engagement', 'Execution-ready', 2)),
+    },
+    'hardest_right_now': {
+        'clarity': (('bottleneck', 'Clarity', 3), ('engagement', 'Guided', 1)),
+        'brand_understanding': (('bottleneck', 'Positioning', 3), ('engagement', 'Guided', 1)),
+        'revenue_execution': (('bottleneck', 'Revenue', 3), ('engagement', 'Execution-ready', 1)),
+        'stability': (('bottleneck', 'Founder Dependency', 3), ('engagement', 'Execution-ready', 1)),
+        'founder_dependency': (('bottleneck', 'Founder Dependency', 3), ('engagement', 'Execution-ready', 2)),
+    },
+    'business_direction': {
+        'unclear': (('stage', 'Launch', 2), ('bottleneck', 'Clarity', 2)),
+        'shaky': (('stage', 'Launch', 1), ('stage', 'Growth', 1), ('bottleneck', 'Clarity', 1)),
+        'clear_struggling': (('stage', 'Growth', 2), ('bottleneck', 'Systems', 1)),
+        'clear_executing': (('stage', 'Scale', 2), ('bottleneck', 'Systems', 1)),
+    },
+    'dependency': {
+        'fully_dependent': (('stage', 'Growth', 1), ('bottleneck', 'Founder Dependency', 3)),
+        'mostly_dependent': (('stage', 'Growth', 1), ('bottleneck', 'Founder Dependency', 2)),
+        'some_structure': (('stage', 'Scale', 1), ('bottleneck', 'Systems', 1)),
+        'runs_without_me': (('stage', 'Scale', 2), ('bottleneck', 'Systems', 1)),
+    },
+    'scale_readiness': {
+        'struggle': (('stage', 'Growth', 1), ('bottleneck', 'Systems', 3)),
+        'effort_required': (('stage', 'Growth', 1), ('bottleneck', 'Systems', 2)),
+        'handle_well': (('stage', 'Scale', 1), ('bottleneck', 'Systems', 1)),
+        'built_for_growth': (('stage', 'Scale', 2), ('bottleneck', 'Systems', 1)),
+    },
+    'decision_bottleneck': {
+        'what_to_build': (('bottleneck', 'Clarity', 3),),
+        'how_to_position': (('bottleneck', 'Positioning', 3),),
+        'how_to_sell': (('bottleneck', 'Revenue', 3),),
+        'how_to_operate': (('bottleneck', 'Systems', 3),),
+        'how_to_grow': (('bottleneck', 'Founder Dependency', 2),),
+    },
+    'intent': {
+        'clarity_validation': (('stage', 'Launch', 2), ('engagement', 'Guided', 2)),
+        'build_brand': (('stage', 'Launch', 1), ('stage', 'Growth', 1), ('engagement', 'Guided', 1)),
+        'predictable_revenue': (('stage', 'Growth', 2), ('engagement', 'Execution-ready', 1)),
+        'stability_systems': (('stage', 'Scale', 1), ('engagement', 'Execution-ready', 1)),
+        'scale_beyond_me': (('stage', 'Scale', 2), ('engagement', 'Execution-ready', 2)),
+    },
+}
+
+SYSTEMS = {
+    ('Launch', 'Clarity'): {
+        "name": "BoltGuider",
+        "description": "A guided clarity system designed to help you decide what to build, who to serve, and what to prioritize — before you invest more time or money.",
+        "route": "/services/boltguider#hero",
+    },
+    ('Launch', 'Positioning'): {
+        "name": "BrandToFly",
+        "description": "A positioning system that helps people understand what you do, who you serve, and why it matters — so you stop explaining and start connecting.",
+        "route": "/services/brandtofly#hero",
+    },
+    ('Growth', 'Revenue'): {
+        "name": "D2CBolt",
+        "description": "A revenue acceleration system designed to help you attract, convert, and retain customers predictably — without burning out.",
+        "route": "/services/d2cbolt#hero",
+    },
+    ('Growth', 'Systems'): {
+        "name": "BoltRunway",
+        "description": "An operational systems framework that helps you build sustainable processes, so growth doesn't break everything.",
+        "route": "/services/boltrunway#hero",
+    },
+    ('Scale', 'Founder Dependency'): {
+        "name": "ScaleRunway",
+        "description": "A founder-offloading system designed to help you step back from daily execution without losing momentum or control.",
+        "route": "/services/scalerunway#hero",
+    },
+}
+
+STAGE_DESCRIPTIONS = {
+    'Launch': "You're still shaping direction — testing, validating, and figuring out what's worth committing to. At this stage, clarity matters more than speed. The right focus now prevents expensive mistakes later.",
+    'Growth': "You've proven the concept, and now you're building momentum. The challenge isn't whether it works — it's making it work consistently, at scale, without everything depending on you.",
+    'Scale': "You're past early-stage chaos and have real traction. Now the goal is stability, repeatability, and removing yourself as the bottleneck — so the business can grow without you being the engine.",
+}
+
+BOTTLENECK_DESCRIPTIONS = {
+    'Clarity': "You're not short on effort — you're short on certainty. Decisions feel heavy because the direction isn't fully locked, which slows everything else down.",
+    'Positioning': "People are confused about what you do or who it's for. Until positioning is clear, marketing feels inefficient and sales conversations take too long.",
+    'Revenue': "The business has potential, but revenue isn't coming in predictably or fast enough. You need a reliable system to attract, convert, and retain customers.",
+    'Systems': "Things are working, but barely. There's no repeatable process, so growth creates chaos instead of momentum. You need operational structure before scaling further.",
+    'Founder Dependency': "Everything runs through you. If you step away, things slow down or break. The business needs to function without you being the bottleneck.",
+}
+
+WHAT_TO_AVOID = {
+    'Launch': "Avoid scaling tactics, paid ads, or complex systems. Those are Growth and Scale problems. Right now, your job is to validate direction before optimizing execution.",
+    'Growth': "Avoid premature delegation or trying to remove yourself too early. You still need to be in execution mode. Don't chase new markets until you've stabilized the current one.",
+    'Scale': "Avoid getting pulled back into execution. Your job now is building systems and teams, not doing the work yourself. Don't ignore the operational gaps just because revenue is coming in.",
+}
+
+
+def score_answers(answers: Dict[str, str]) -> Dict[str, Dict[str, int]]:
+    scores = {
+        'stage': dict.fromkeys(STAGES, 0),
+        'bottleneck': dict.fromkeys(BOTTLENECKS, 0),
+        'engagement': dict.fromkeys(ENGAGEMENTS, 0),
+    }
+    for question, options in WEIGHTS.items():
+        for axis, key, points in options.get(answers.get(question) or '', ()):
+            scores[axis][key] += points
+    return scores
+
+
+def _highest(scores: Dict[str, int]) -> str:
+    # max() returns the first maximal entry, matching the frontend tie-breakers
+    return max(scores, key=lambda key: scores[key])
+
+
+def recommended_system(stage: str, bottleneck: str) -> Dict[str, str]:
+    return dict(SYSTEMS.get((stage, bottleneck), SYSTEMS[('Launch', 'Clarity')]))
+
+
+def personalized_insight(name: Optional[str], stage: str, bottleneck: str) -> str:
+    name = (name or '').strip().split(' ')[0] or 'Founder'
+    system = recommended_system(stage, bottleneck)
+    return (
+        f"{name}, your answers put you in the {stage} stage, and your biggest constraint right now is "
+        f"{bottleneck.lower()}. {BOTTLENECK_DESCRIPTIONS[bottleneck]} "
+        f"{system['name']} is built for exactly this point in the journey."
+    )
+
+
+def interpret_answers(answers: Dict[str, str], name: Optional[str] = None) -> Dict[str, object]:
+    """Full assessment in the same shape the LLM is asked to return."""
+    scores = score_answers(answers)
+    stage = _highest(scores['stage'])
+    bottleneck = _highest(scores['bottleneck'])
+    return {
+        "stage": stage,
+        "bottleneck": bottleneck,
+        "engagement_readiness": _highest(scores['engagement']),
+        "stage_description": STAGE_DESCRIPTIONS[stage],
+        "bottleneck_description": BOTTLENECK_DESCRIPTIONS[bottleneck],
+        "what_to_avoid": WHAT_TO_AVOID[stage],
+        "recommended_system": recommended_system(stage, bottleneck),
+        "personalized_insight": personalized_insight(name, stage, bottleneck),
+    }
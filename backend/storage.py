@@ -0,0 +1,536 @@
+"""Storage layer for leads, scroll events and status checks.
+
+The API handlers go through three stores instead of a module-global Motor
+database:
+
+* ``storage.leads`` -- insert, upsert by email, get, partial update,
+  keyset pages, dashboard stats and export streams.
+* ``storage.scroll_events`` -- batch insert, scroll stats and export
+  streams. The ``events`` mode stores raw events plus rollups. The
+  ``sessions`` mode keeps one max-depth document per (page, session)
+  instead (see ``scroll_sessions.py``).
+* ``storage.status_checks`` -- insert, recent, latest per client and tail.
+
+``MongoStorage`` implements them on Motor, which is the production
+backend. ``MemoryStorage`` keeps plain lists in process and answers the
+same queries with the same response shapes, so the whole API can run,
+be profiled and be benchmarked without a database. ``create_storage``
+picks one by name (``STORAGE_BACKEND`` in ``server.py``).
+
+Filters are equality dicts (``{"stage": "Growth"}``). Date ranges are
+half-open ``[since, until)``. ``fields`` restricts the returned keys the way
+a Mongo projection would.
+"""
+import copy
+import logging
+from collections import Counter
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+import db_indexes
+from lead_stats import compute_lead_stats, format_lead_stats, recent_cutoff
+from scroll_buffer import PartialFlushError
+from scroll_rollups import DUPLICATE_KEY, apply_rollups, exact_scroll_stats, read_scroll_stats, stats_from_events
+from scroll_sessions import (
+    SCROLL_STORAGE_MODES, apply_session_upserts, fold_events, merge_summary, read_session_stats, stats_from_sessions,
+)
+
+if TYPE_CHECKING:
+    # pandas and pyarrow are only imported when a scroll archive is configured
+    from scroll_archive import ScrollArchive
+
+logger = logging.getLogger(__name__)
+
+LeadCursor = Tuple[datetime, str]
+# Kept from the first submission when repeat submissions are merged by email
+LEAD_IDENTITY_FIELDS = ("_id", "id", "created_at", "status")
+
+
+class StorageConfigError(ValueError):
+    """Raised for an unknown storage backend or missing connection settings."""
+
+
+def _projection(fields: Optional[Sequence[str]]) -> Dict[str, int]:
+    if fields is None:
+        return {"_id": 0}
+    return {"_id": 0, **{field: 1 for field in fields}}
+
+
+def _check_scroll_mode(mode: str) -> None:
+    if mode not in SCROLL_STORAGE_MODES:
+        raise StorageConfigError(f"Unknown scroll storage mode {mode!r}; expected one of {SCROLL_STORAGE_MODES}")
+
+
+def _check_scroll_layout(layout: str) -> None:
+    if layout not in db_indexes.SCROLL_EVENTS_LAYOUTS:
+        raise StorageConfigError(
+            f"Unknown scroll events layout {layout!r}; expected one of {db_indexes.SCROLL_EVENTS_LAYOUTS}"
+        )
+
+
+def email_key(email: Optional[str]) -> str:
+    return (email or "").strip().lower()
+
+
+def _merge_lead(doc: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """(fields set on the first submission only, fields a repeat submission overwrites).
+
+    Empty values in a repeat never blank out what an earlier submission sent.
+    """
+    on_insert = {field: doc[field] for field in LEAD_IDENTITY_FIELDS if field in doc and field != "_id"}
+    updates = {field: value for field, value in doc.items()
+               if field not in LEAD_IDENTITY_FIELDS and value not in (None, "")}
+    updates["updated_at"] = datetime.now(timezone.utc)
+    return on_insert, updates
+
+
+def _date_range(field: str, since: Optional[datetime], until: Optional[datetime]) -> Dict[str, Any]:
+    bounds = {}
+    if since:
+        bounds["$gte"] = since
+    if until:
+        bounds["$lt"] = until
+    return {field: bounds} if bounds else {}
+
+
+# ============ MONGO ============
+
+class MongoLeadStore:
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def insert(self, doc: Dict[str, Any]) -> None:
+        await self.collection.insert_one(doc)
+
+    async def upsert_by_email(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        """Merge ``doc`` into the lead with the same email (unique ``email_key``); returns the stored lead."""
+        key = email_key(doc.get("email"))
+        if not key:
+            await self.insert(doc)
+            return doc
+        on_insert, updates = _merge_lead(doc)
+        update = {"$setOnInsert": on_insert, "$set": updates, "$inc": {"submissions": 1}}
+        try:
+            return await self.collection.find_one_and_update(
+                {"email_key": key}, update, {"_id": 0}, upsert=True, return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # A concurrent upsert inserted the lead first; this one now matches it
+            return await self.collection.find_one_and_update(
+                {"email_key": key}, update, {"_id": 0}, return_document=ReturnDocument.AFTER,
+            )
+
+    async def get(self, lead_id: str, fields: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one({"id": lead_id}, _projection(fields))
+
+    async def update(self, lead_id: str, values: Dict[str, Any]) -> bool:
+        """Set ``values`` on a lead; False if there is no such lead."""
+        result = await self.collection.update_one({"id": lead_id}, {"$set": values})
+        return result.matched_count > 0
+
+    async def page(self, filters: Dict[str, Any], cursor: Optional[LeadCursor], limit: int,
+                   fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """Up to ``limit`` leads newest first, strictly after ``cursor``."""
+        query = dict(filters)
+        if cursor:
+            created_at, lead_id = cursor
+            query["$or"] = [
+                {"created_at": {"$lt": created_at}},
+                {"created_at": created_at, "id": {"$lt": lead_id}},
+            ]
+        return await self.collection.find(query, _projection(fields)).sort(
+            [("created_at", DESCENDING), ("id", DESCENDING)]
+        ).limit(limit).to_list(limit)
+
+    async def stats(self, recent_days: int = 7) -> Dict[str, Any]:
+        return await compute_lead_stats(self.collection, recent_days)
+
+    def export(self, filters: Dict[str, Any], since: Optional[datetime], until: Optional[datetime],
+               batch_size: int) -> AsyncIterator[Dict[str, Any]]:
+        query = {**filters, **_date_range("created_at", since, until)}
+        return self.collection.find(query, {"_id": 0}).sort(
+            [("created_at", ASCENDING), ("id", ASCENDING)]
+        ).batch_size(batch_size)
+
+
+class MongoScrollEventStore:
+    """Raw events plus rollups.
+
+    Events are stored first. If the rollup step then fails, the events stay
+    stored and only their batch waits in ``pending_rollups``. That batch is
+    retried before the next insert and by ``retry_rollups`` on shutdown.
+
+    A retried buffer chunk keeps its ``_id``s, so events an earlier attempt
+    stored come back as duplicate keys. A time-series collection does not
+    enforce a unique ``_id``, so in that layout the retried events are looked
+    up first (within their timestamp range, which prunes buckets) and the
+    ones already stored are not inserted again.
+    """
+
+    # False for the ``sessions`` mode stores, whose export streams are empty
+    stores_raw_events = True
+
+    def __init__(self, db, archive: Optional["ScrollArchive"] = None, max_pending_rollups: int = 50_000,
+                 layout: str = "documents"):
+        self.db = db
+        self.collection = db.scroll_events
+        self.archive = archive
+        self.layout = layout
+        self.max_pending_rollups = max_pending_rollups
+        self.pending_rollups: List[List[Dict[str, Any]]] = []
+
+    async def insert_many(self, docs: List[Dict[str, Any]]) -> None:
+        await self.retry_rollups()
+        new_docs = docs
+        if self.layout == "timeseries":
+            stored = await self._already_stored(docs)
+            new_docs = [doc for doc in docs if "_id" not in doc or doc["_id"] not in stored]
+        if not new_docs:
+            await self._roll_up(docs)
+            return
+        try:
+            await self.collection.insert_many(new_docs, ordered=False)
+        except BulkWriteError as e:
+            # Unordered: every event without a write error was stored. A duplicate _id is an event
+            # stored by an earlier attempt that failed before its rollups ran, so it is rolled up now.
+            failed = [new_docs[error["index"]] for error in e.details.get("writeErrors", [])
+                      if error.get("code") != DUPLICATE_KEY]
+            failed_ids = {id(doc) for doc in failed}
+            await self._roll_up([doc for doc in docs if id(doc) not in failed_ids])
+            if failed:
+                raise PartialFlushError(f"{len(failed)} of {len(docs)} scroll events were not stored",
+                                        [doc for doc in docs if id(doc) in failed_ids])
+            return
+        await self._roll_up(docs)
+
+    async def _already_stored(self, docs: List[Dict[str, Any]]) -> Set[Any]:
+        """``_id``s of retried events (those already given an ``_id``) that an earlier attempt stored."""
+        retried = [doc for doc in docs if "_id" in doc]
+        if not retried:
+            return set()
+        timestamps = [doc["timestamp"] for doc in retried]
+        query = {
+            "_id": {"$in": [doc["_id"] for doc in retried]},
+            "timestamp": {"$gte": min(timestamps), "$lte": max(timestamps)},
+        }
+        return {doc["_id"] async for doc in self.collection.find(query, {"_id": 1})}
+
+    async def _roll_up(self, docs: List[Dict[str, Any]]) -> None:
+        if not self.pending_rollups:
+            try:
+                await apply_rollups(self.db, docs)
+                return
+            except Exception as e:
+                logger.error(f"Scroll rollups failed for {len(docs)} stored events, will retry: {e}")
+        # Behind the batches still pending, so retries stay in order and close to their first attempt
+        self.pending_rollups.append(docs)
+        pending = sum(len(batch) for batch in self.pending_rollups)
+        while pending > self.max_pending_rollups:
+            dropped = self.pending_rollups.pop(0)
+            pending -= len(dropped)
+            logger.error(f"Dropping rollups for {len(dropped)} scroll events, too many pending")
+
+    async def retry_rollups(self) -> None:
+        """Apply the rollups of batches whose rollup step failed, oldest first."""
+        while self.pending_rollups:
+            try:
+                await apply_rollups(self.db, self.pending_rollups[0])
+            except Exception as e:
+                logger.error(f"Retrying scroll rollups failed, {len(self.pending_rollups)} batches pending: {e}")
+                return
+            self.pending_rollups.pop(0)
+
+    async def stats(self, days: int, distinct: str = "approx") -> Dict[str, Any]:
+        if distinct == "exact":
+            if self.archive is not None:
+                from scroll_archive import exact_stats_with_archive
+                return await exact_stats_with_archive(self.db, self.archive, days)
+            return await exact_scroll_stats(self.db, days)
+        return await read_scroll_stats(self.db, days)
+
+    def export(self, filters: Dict[str, Any], since: Optional[datetime], until: Optional[datetime],
+               batch_size: int) -> AsyncIterator[Dict[str, Any]]:
+        query = {**filters, **_date_range("timestamp", since, until)}
+        return self.collection.find(query, {"_id": 0}).sort("timestamp", ASCENDING).batch_size(batch_size)
+
+
+class MongoScrollSessionStore(MongoScrollEventStore):
+    """``sessions`` mode: events are folded into ``scroll_sessions`` and not stored raw."""
+
+    stores_raw_events = False
+
+    async def insert_many(self, docs: List[Dict[str, Any]]) -> None:
+        await apply_session_upserts(self.db, docs)
+
+    async def retry_rollups(self) -> None:
+        pass
+
+    async def stats(self, days: int, distinct: str = "approx") -> Dict[str, Any]:
+        return await read_session_stats(self.db, days)
+
+
+class MongoStatusCheckStore:
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def insert(self, doc: Dict[str, Any]) -> None:
+        await self.collection.insert_one(doc)
+
+    async def recent(self, limit: int, fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        return await self.collection.find({}, _projection(fields)).sort("timestamp", DESCENDING).to_list(limit)
+
+    async def latest_per_client(self) -> List[Dict[str, Any]]:
+        """Newest check per client_name; answered by a distinct scan of (client_name, timestamp)."""
+        pipeline = [
+            {"$sort": {"client_name": 1, "timestamp": -1}},
+            {"$group": {"_id": "$client_name", "id": {"$first": "$id"}, "timestamp": {"$first": "$timestamp"}}},
+            {"$project": {"_id": 0, "client_name": "$_id", "id": 1, "timestamp": 1}},
+            {"$sort": {"client_name": 1}},
+        ]
+        return await self.collection.aggregate(pipeline).to_list(None)
+
+    async def tail(self, since: datetime, client_name: Optional[str], limit: int,
+                   fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        query = {"timestamp": {"$gt": since}}
+        if client_name:
+            query["client_name"] = client_name
+        return await self.collection.find(query, _projection(fields)).sort("timestamp", ASCENDING).limit(limit).to_list(limit)
+
+
+class MongoStorage:
+    backend = "mongo"
+
+    def __init__(self, client, db, scroll_storage_mode: str = "events", scroll_events_layout: str = "documents",
+                 scroll_archive: Optional["ScrollArchive"] = None):
+        _check_scroll_mode(scroll_storage_mode)
+        _check_scroll_layout(scroll_events_layout)
+        self.client = client
+        self.db = db
+        self.scroll_events_layout = scroll_events_layout
+        self.leads = MongoLeadStore(db.leads)
+        scroll_store = MongoScrollSessionStore if scroll_storage_mode == "sessions" else MongoScrollEventStore
+        self.scroll_events = scroll_store(db, scroll_archive, layout=scroll_events_layout)
+        self.status_checks = MongoStatusCheckStore(db.status_checks)
+
+    def collection(self, name: str):
+        """Raw collection for auxiliary data (e.g. the persistent assessment cache)."""
+        return self.db[name]
+
+    async def ensure_indexes(self, status_check_retention_days: int = 30, scroll_event_retention_days: int = 0) -> None:
+        await db_indexes.ensure_indexes(
+            self.db, status_check_retention_days, self.scroll_events_layout, scroll_event_retention_days,
+        )
+
+    async def ping(self) -> None:
+        await self.db.command("ping")
+
+    def close(self) -> None:
+        self.client.close()
+
+
+# ============ IN MEMORY ============
+
+def _matches(doc: Dict[str, Any], filters: Dict[str, Any]) -> bool:
+    return all(doc.get(field) == value for field, value in filters.items())
+
+
+def _in_range(value: Any, since: Optional[datetime], until: Optional[datetime]) -> bool:
+    return (since is None or value >= since) and (until is None or value < until)
+
+
+def _project(doc: Dict[str, Any], fields: Optional[Sequence[str]]) -> Dict[str, Any]:
+    if fields is None:
+        return dict(doc)
+    return {field: doc[field] for field in fields if field in doc}
+
+
+async def _iterate(docs: Iterable[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+    for doc in docs:
+        yield dict(doc)
+
+
+class MemoryLeadStore:
+    def __init__(self):
+        self.docs: List[Dict[str, Any]] = []
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._by_email: Dict[str, Dict[str, Any]] = {}
+
+    async def insert(self, doc: Dict[str, Any]) -> None:
+        stored = copy.deepcopy(doc)
+        stored.pop("_id", None)
+        self.docs.append(stored)
+        self._by_id[stored["id"]] = stored
+        if "email_key" in stored:
+            self._by_email[stored["email_key"]] = stored
+
+    async def upsert_by_email(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        key = email_key(doc.get("email"))
+        if not key:
+            await self.insert(doc)
+            return doc
+        on_insert, updates = _merge_lead(doc)
+        stored = self._by_email.get(key)
+        if stored is None:
+            await self.insert({**on_insert, "email_key": key, "submissions": 0})
+            stored = self._by_email[key]
+        stored.update(copy.deepcopy(updates))
+        stored["submissions"] += 1
+        return dict(stored)
+
+    async def get(self, lead_id: str, fields: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
+        doc = self._by_id.get(lead_id)
+        return _project(doc, fields) if doc is not None else None
+
+    async def update(self, lead_id: str, values: Dict[str, Any]) -> bool:
+        doc = self._by_id.get(lead_id)
+        if doc is None:
+            return False
+        doc.update(copy.deepcopy(values))
+        return True
+
+    async def page(self, filters: Dict[str, Any], cursor: Optional[LeadCursor], limit: int,
+                   fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        matching = [doc for doc in self.docs
+                    if _matches(doc, filters) and (cursor is None or (doc["created_at"], doc["id"]) < cursor)]
+        matching.sort(key=lambda doc: (doc["created_at"], doc["id"]), reverse=True)
+        return [_project(doc, fields) for doc in matching[:limit]]
+
+    async def stats(self, recent_days: int = 7) -> Dict[str, Any]:
+        since = recent_cutoff(recent_days)
+        return format_lead_stats(
+            total=len(self.docs),
+            recent=sum(1 for doc in self.docs if doc["created_at"] >= since),
+            by_service=Counter(doc.get("service_interest") for doc in self.docs),
+            by_stage=Counter(doc.get("stage") for doc in self.docs),
+            by_status=Counter(doc.get("status") for doc in self.docs),
+        )
+
+    def export(self, filters: Dict[str, Any], since: Optional[datetime], until: Optional[datetime],
+               batch_size: int) -> AsyncIterator[Dict[str, Any]]:
+        matching = [doc for doc in self.docs if _matches(doc, filters) and _in_range(doc["created_at"], since, until)]
+        matching.sort(key=lambda doc: (doc["created_at"], doc["id"]))
+        return _iterate(matching)
+
+
+class MemoryScrollEventStore:
+    stores_raw_events = True
+
+    def __init__(self):
+        self.docs: List[Dict[str, Any]] = []
+
+    async def insert_many(self, docs: List[Dict[str, Any]]) -> None:
+        self.docs.extend({key: value for key, value in doc.items() if key != "_id"} for doc in docs)
+
+    async def retry_rollups(self) -> None:
+        pass
+
+    async def stats(self, days: int, distinct: str = "approx") -> Dict[str, Any]:
+        return stats_from_events(self.docs, days, distinct)
+
+    def export(self, filters: Dict[str, Any], since: Optional[datetime], until: Optional[datetime],
+               batch_size: int) -> AsyncIterator[Dict[str, Any]]:
+        matching = [doc for doc in self.docs if _matches(doc, filters) and _in_range(doc["timestamp"], since, until)]
+        matching.sort(key=lambda doc: doc["timestamp"])
+        return _iterate(matching)
+
+
+class MemoryScrollSessionStore(MemoryScrollEventStore):
+    stores_raw_events = False
+
+    def __init__(self):
+        super().__init__()
+        self.sessions: Dict[str, Dict[str, Any]] = {}
+
+    async def insert_many(self, docs: List[Dict[str, Any]]) -> None:
+        for key, summary in fold_events(docs).items():
+            current = self.sessions.get(key)
+            if current is None:
+                self.sessions[key] = summary
+            else:
+                merge_summary(current, summary)
+
+    async def stats(self, days: int, distinct: str = "approx") -> Dict[str, Any]:
+        return stats_from_sessions(self.sessions.values(), days)
+
+
+class MemoryStatusCheckStore:
+    def __init__(self):
+        self.docs: List[Dict[str, Any]] = []
+
+    async def insert(self, doc: Dict[str, Any]) -> None:
+        self.docs.append({key: value for key, value in doc.items() if key != "_id"})
+
+    async def recent(self, limit: int, fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        newest = sorted(self.docs, key=lambda doc: doc["timestamp"], reverse=True)[:limit]
+        return [_project(doc, fields) for doc in newest]
+
+    async def latest_per_client(self) -> List[Dict[str, Any]]:
+        latest: Dict[str, Dict[str, Any]] = {}
+        for doc in self.docs:
+            current = latest.get(doc["client_name"])
+            if current is None or doc["timestamp"] > current["timestamp"]:
+                latest[doc["client_name"]] = doc
+        return [{"id": doc["id"], "client_name": name, "timestamp": doc["timestamp"]}
+                for name, doc in sorted(latest.items())]
+
+    async def tail(self, since: datetime, client_name: Optional[str], limit: int,
+                   fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        matching = [doc for doc in self.docs
+                    if doc["timestamp"] > since and (not client_name or doc["client_name"] == client_name)]
+        matching.sort(key=lambda doc: doc["timestamp"])
+        return [_project(doc, fields) for doc in matching[:limit]]
+
+
+class MemoryStorage:
+    backend = "memory"
+
+    def __init__(self, scroll_storage_mode: str = "events"):
+        _check_scroll_mode(scroll_storage_mode)
+        self.leads = MemoryLeadStore()
+        self.scroll_events = MemoryScrollSessionStore() if scroll_storage_mode == "sessions" else MemoryScrollEventStore()
+        self.status_checks = MemoryStatusCheckStore()
+
+    def collection(self, name: str):
+        return None
+
+    async def ensure_indexes(self, status_check_retention_days: int = 30, scroll_event_retention_days: int = 0) -> None:
+        pass
+
+    async def ping(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+STORAGE_BACKENDS = ("mongo", "memory")
+
+
+def create_storage(backend: str, mongo_url: Optional[str] = None, db_name: Optional[str] = None,
+                   scroll_storage_mode: str = "events", scroll_events_layout: str = "documents",
+                   scroll_archive_dir: Optional[str] = None, **client_options: Any):
+    """Storage for ``backend``; ``client_options`` are passed to the Motor client.
+
+    ``scroll_events_layout`` (``documents`` or ``timeseries``) and
+    ``scroll_archive_dir`` (Parquet cold archive read by exact scroll stats)
+    only apply to Mongo.
+    """
+    if backend == "memory":
+        logger.warning("Using in-memory storage; data is lost when the process exits")
+        return MemoryStorage(scroll_storage_mode)
+    if backend != "mongo":
+        raise StorageConfigError(f"Unknown storage backend {backend!r}; expected one of {STORAGE_BACKENDS}")
+    if not mongo_url or not db_name:
+        raise StorageConfigError("MONGO_URL and DB_NAME are required for the mongo storage backend")
+    _check_scroll_mode(scroll_storage_mode)
+    _check_scroll_layout(scroll_events_layout)
+    client = AsyncIOMotorClient(mongo_url, **client_options)
+    archive = None
+    if scroll_archive_dir:
+        from scroll_archive import ScrollArchive
+        archive = ScrollArchive(scroll_archive_dir)
+    return MongoStorage(client, client[db_name], scroll_storage_mode, scroll_events_layout, archive)
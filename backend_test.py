@@ -150,7 +150,7 @@ class FounderPlaneAPITester:
             "viewport_height": 1080
         }
         
-        return self.run_test("Scroll Analytics", "POST", "/api/analytics/scroll-events", 201, scroll_data)
+        return self.run_test("Scroll Analytics", "POST", "/api/analytics/scroll-events", 202, scroll_data)
 
     def test_scroll_analytics_batch(self):
         """Test batch scroll analytics tracking (NEW in this iteration)"""
@@ -182,7 +182,7 @@ class FounderPlaneAPITester:
             }
         ]
         
-        success, response = self.run_test("Scroll Analytics Batch", "POST", "/api/analytics/scroll-events/batch", 201, batch_data)
+        success, response = self.run_test("Scroll Analytics Batch", "POST", "/api/analytics/scroll-events/batch", 202, batch_data)
         
         if success and response:
             expected_count = len(batch_data)
@@ -0,0 +1,109 @@
+"""Microbenchmark: per-row cost of serializing GET /api/leads pages.
+
+Compares FastAPI's default path (re-validate the documents against the
+route's response_model, then encode with the stdlib JSONResponse) against
+the fast path (merge model defaults and encode with TrustedJSONResponse).
+Documents are synthetic leads shaped like stored ones, including
+quiz_answers and ai_assessment.
+
+    python benchmarks/json_serialization.py --rows 5000 --repeat 20
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "benchmark")
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import APIRoute, serialize_response  # noqa: E402
+
+import server  # noqa: E402
+from fast_json import TrustedJSONResponse  # noqa: E402
+from stage_scoring import interpret_answers  # noqa: E402
+
+ANSWERS = {
+    "current_situation": "consistent_revenue",
+    "hardest_right_now": "revenue_execution",
+    "business_direction": "clear_struggling",
+    "dependency": "mostly_dependent",
+    "scale_readiness": "effort_required",
+    "decision_bottleneck": "how_to_sell",
+    "intent": "predictable_revenue",
+}
+
+
+def make_leads(rows: int):
+    now = datetime.now(timezone.utc)
+    assessment = {**interpret_answers(ANSWERS, "Alice Example"), "source": "local"}
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "name": f"Lead {i}",
+            "email": f"lead{i}@example.com",
+            "phone": None,
+            "company": "Example Co",
+            "stage": "Growth",
+            "service_interest": "D2CBolt",
+            "source_page": "StageClarityCheck",
+            "message": "Quiz completed. Stage: Growth. Bottleneck: Revenue.",
+            "status": "New",
+            "created_at": now - timedelta(seconds=i),
+            "quiz_answers": ANSWERS,
+            "ai_assessment": assessment,
+        }
+        for i in range(rows)
+    ]
+
+
+def leads_route() -> APIRoute:
+    return next(route for route in server.app.routes
+                if isinstance(route, APIRoute) and route.path == "/api/leads" and "GET" in route.methods)
+
+
+def default_path(field, page) -> bytes:
+    content = asyncio.run(serialize_response(field=field, response_content=page))
+    return JSONResponse(content).body
+
+
+def fast_path(page) -> bytes:
+    return TrustedJSONResponse({
+        "leads": [{**server.LEAD_DEFAULTS, **lead} for lead in page["leads"]],
+        "next_cursor": page["next_cursor"],
+    }).body
+
+
+def measure(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    page = {"leads": make_leads(args.rows), "next_cursor": None}
+    field = leads_route().response_field
+
+    before = measure(lambda: default_path(field, page), args.repeat)
+    after = measure(lambda: fast_path(page), args.repeat)
+    print(f"rows: {args.rows} (best of {args.repeat})")
+    print(f"response_model + stdlib json: {before * 1e3:8.2f} ms  {before / args.rows * 1e6:6.2f} us/row")
+    print(f"trusted orjson response:      {after * 1e3:8.2f} ms  {after / args.rows * 1e6:6.2f} us/row")
+    print(f"speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
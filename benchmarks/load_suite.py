@@ -0,0 +1,421 @@
+"""Offline load test for the FastAPI backend.
+
+Boots ``server.app`` in-process (startup and shutdown hooks included) behind
+an httpx ASGI transport, runs each scenario with N concurrent clients, and
+reports latency percentiles, requests/sec, status codes and Mongo
+operations per request. Nothing leaves the machine:
+
+* Storage is Mongo through ``mongomock_motor`` by default. Pass
+  ``--mongo-url`` to use a local mongod, or ``--storage memory`` to use the
+  in-memory backend (no Mongo at all). Operations are counted with a
+  pymongo command listener against mongod, or by wrapping the collections
+  under mongomock. Write-behind work (the scroll buffer) is flushed at the
+  end of each scenario, so its operations are included.
+* ``LlmChat`` is replaced by a fake that sleeps ``--llm-latency`` seconds and
+  returns a fixed assessment.
+
+Results are written as JSON. ``--compare`` prints the change against an
+earlier results file:
+
+    python benchmarks/load_suite.py --requests 500 --concurrency 20
+    python benchmarks/load_suite.py --compare benchmarks/results/baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import time
+import types
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parents[1] / "backend"
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+sys.path.insert(0, str(BACKEND_DIR))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "founderplane_benchmark")
+os.environ.setdefault("EMERGENT_LLM_KEY", "benchmark")
+# Every request comes from one client address, which the per-IP rate limits would throttle
+os.environ.setdefault("ADMISSION_CONTROL", "false")
+
+import httpx  # noqa: E402
+
+ADMIN_HEADERS = {"X-Admin-Password": os.environ.get("ADMIN_PASSWORD", "founderplane2024")}
+
+FAKE_ASSESSMENT = {
+    "stage": "Growth",
+    "bottleneck": "Revenue",
+    "stage_description": "You've proven the concept, and now you're building momentum.",
+    "bottleneck_description": "Revenue isn't coming in predictably or fast enough.",
+    "what_to_avoid": "Avoid premature delegation.",
+    "recommended_system": {"name": "D2CBolt", "description": "Revenue acceleration", "route": "/services/d2cbolt#hero"},
+    "personalized_insight": "Founder, your answers put you in the Growth stage.",
+}
+
+QUIZ_OPTIONS = {
+    "current_situation": ["exploring", "early_launch", "launched_inconsistent", "consistent_revenue", "team_growing"],
+    "hardest_right_now": ["clarity", "brand_understanding", "revenue_execution", "stability", "founder_dependency"],
+    "business_direction": ["unclear", "shaky", "clear_struggling", "clear_executing"],
+    "dependency": ["fully_dependent", "mostly_dependent", "some_structure", "runs_without_me"],
+    "scale_readiness": ["struggle", "effort_required", "handle_well", "built_for_growth"],
+    "decision_bottleneck": ["what_to_build", "how_to_position", "how_to_sell", "how_to_operate", "how_to_grow"],
+    "intent": ["clarity_validation", "build_brand", "predictable_revenue", "stability_systems", "scale_beyond_me"],
+}
+
+
+class FakeUserMessage:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeLlmChat:
+    latency = 0.05
+
+    def __init__(self, api_key: str, session_id: str, system_message: str):
+        self.session_id = session_id
+
+    def with_model(self, provider: str, model: str) -> "FakeLlmChat":
+        return self
+
+    async def send_message(self, message: FakeUserMessage) -> str:
+        await asyncio.sleep(self.latency)
+        return json.dumps(FAKE_ASSESSMENT)
+
+
+def install_fake_llm_module() -> None:
+    """Register a stand-in emergentintegrations package when it isn't installed."""
+    try:
+        import emergentintegrations.llm.chat  # noqa: F401
+        return
+    except ImportError:
+        pass
+    chat = types.ModuleType("emergentintegrations.llm.chat")
+    chat.LlmChat = FakeLlmChat
+    chat.UserMessage = FakeUserMessage
+    for name in ("emergentintegrations", "emergentintegrations.llm"):
+        sys.modules[name] = types.ModuleType(name)
+    sys.modules["emergentintegrations.llm.chat"] = chat
+
+
+# ============ MONGO OPERATION COUNTING ============
+
+COUNTED_METHODS = {
+    "find", "find_one", "insert_one", "insert_many", "update_one", "update_many", "replace_one",
+    "delete_one", "delete_many", "aggregate", "count_documents", "estimated_document_count",
+    "distinct", "bulk_write", "find_one_and_update", "find_one_and_replace", "find_one_and_delete",
+    "create_index", "command",
+}
+
+
+class OpCounter:
+    def __init__(self):
+        self.count = 0
+
+
+class CommandCounter:
+    """pymongo command listener counting every command sent to mongod."""
+
+    def __init__(self, counter: OpCounter):
+        self.counter = counter
+
+    def started(self, event) -> None:
+        self.counter.count += 1
+
+    def succeeded(self, event) -> None:
+        pass
+
+    def failed(self, event) -> None:
+        pass
+
+
+class CountingProxy:
+    """Wraps a mongomock database or collection and counts operation calls."""
+
+    def __init__(self, target, counter: OpCounter):
+        self._target = target
+        self._counter = counter
+
+    def __getitem__(self, name: str) -> "CountingProxy":
+        return CountingProxy(self._target[name], self._counter)
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._target, name)
+        if name in COUNTED_METHODS:
+            def counted(*args, **kwargs):
+                self._counter.count += 1
+                return attr(*args, **kwargs)
+            return counted
+        if not name.startswith("_") and hasattr(attr, "insert_one"):
+            return CountingProxy(attr, self._counter)
+        return attr
+
+
+async def connect(args, counter: OpCounter):
+    from storage import MemoryStorage, MongoStorage
+
+    if args.storage == "memory":
+        return MemoryStorage(args.scroll_storage_mode)
+    if args.mongo_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(args.mongo_url, tz_aware=True, event_listeners=[CommandCounter(counter)])
+        await client.drop_database(os.environ["DB_NAME"])
+        return MongoStorage(client, client[os.environ["DB_NAME"]], args.scroll_storage_mode, args.scroll_events_layout)
+    if args.scroll_storage_mode == "sessions":
+        sys.exit("mongomock does not support $bit; use --mongo-url or --storage memory with the sessions mode")
+    if args.scroll_events_layout == "timeseries":
+        sys.exit("mongomock does not support time-series collections; use --mongo-url")
+    try:
+        import mongomock_motor
+    except ImportError:
+        sys.exit("mongomock-motor is not installed; install it, pass --mongo-url or use --storage memory")
+    client = mongomock_motor.AsyncMongoMockClient(tz_aware=True)
+    return MongoStorage(client, CountingProxy(client[os.environ["DB_NAME"]], counter))
+
+
+# ============ SCENARIOS ============
+
+RequestSpec = Tuple[str, str, Dict[str, Any]]
+
+
+def quiz_answers(rng: random.Random) -> Dict[str, str]:
+    return {question: rng.choice(options) for question, options in QUIZ_OPTIONS.items()}
+
+
+def scroll_event(rng: random.Random, session_id: str) -> Dict[str, Any]:
+    index = rng.randrange(8)
+    return {
+        "page": rng.choice(["Index", "BoltGuider", "D2CBolt", "ScaleRunway"]),
+        "section": f"section-{index}",
+        "section_index": index,
+        "total_sections": 8,
+        "session_id": session_id,
+        "viewport_height": 900,
+    }
+
+
+def lead_create(i: int, rng: random.Random) -> RequestSpec:
+    return "POST", "/api/leads", {"json": {
+        "name": f"Load Test {i}",
+        "email": f"load{i}@example.com",
+        "service_interest": rng.choice(["BoltGuider", "D2CBolt", "ScaleRunway"]),
+        "source_page": "Contact",
+    }}
+
+
+def scroll_single(i: int, rng: random.Random) -> RequestSpec:
+    return "POST", "/api/analytics/scroll-events", {"json": scroll_event(rng, f"s{i % 200}")}
+
+
+def scroll_batch(i: int, rng: random.Random) -> RequestSpec:
+    session_id = f"b{i % 200}"
+    return "POST", "/api/analytics/scroll-events/batch", {"json": [scroll_event(rng, session_id) for _ in range(20)]}
+
+
+def scroll_batch_v2(i: int, rng: random.Random) -> RequestSpec:
+    events = [scroll_event(rng, f"b{i % 200}") for _ in range(20)]
+    return "POST", "/api/analytics/scroll-events/v2", {"json": {
+        "page": events[0]["page"],
+        "session_id": events[0]["session_id"],
+        "total_sections": 8,
+        "viewport_height": 900,
+        "sections": [event["section"] for event in events],
+        "indexes": [event["section_index"] for event in events],
+        "client_ts": [1718000000000 + n * 750 for n in range(len(events))],
+    }}
+
+
+def lead_stats(i: int, rng: random.Random) -> RequestSpec:
+    return "GET", "/api/leads/stats", {"headers": ADMIN_HEADERS}
+
+
+def leads_page(i: int, rng: random.Random) -> RequestSpec:
+    return "GET", "/api/leads?limit=50&include_details=false", {"headers": ADMIN_HEADERS}
+
+
+def scroll_stats(i: int, rng: random.Random) -> RequestSpec:
+    return "GET", "/api/analytics/scroll-stats", {"headers": ADMIN_HEADERS}
+
+
+def scroll_funnel(i: int, rng: random.Random) -> RequestSpec:
+    return "GET", "/api/analytics/funnel", {"headers": ADMIN_HEADERS}
+
+
+def stage_assessment(mode: str) -> Callable[[int, random.Random], RequestSpec]:
+    def build(i: int, rng: random.Random) -> RequestSpec:
+        return "POST", f"/api/stage-assessment?mode={mode}", {"json": {
+            "answers": quiz_answers(rng),
+            "user_details": {"name": f"Founder {i}", "email": f"founder{i}@example.com"},
+        }}
+    return build
+
+
+SCENARIOS: Dict[str, Callable[[int, random.Random], RequestSpec]] = {
+    "lead_create": lead_create,
+    "scroll_single": scroll_single,
+    "scroll_batch": scroll_batch,
+    "scroll_batch_v2": scroll_batch_v2,
+    "lead_stats": lead_stats,
+    "leads_page": leads_page,
+    "scroll_stats": scroll_stats,
+    "scroll_funnel": scroll_funnel,
+    "stage_assessment_llm": stage_assessment("llm"),
+    "stage_assessment_local": stage_assessment("local"),
+}
+
+
+# ============ RUNNER ============
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    return sorted_values[min(int(q * len(sorted_values)), len(sorted_values) - 1)]
+
+
+async def run_scenario(http: httpx.AsyncClient, server, counter: OpCounter, name: str,
+                       requests: int, concurrency: int, seed: int) -> Dict[str, Any]:
+    build = SCENARIOS[name]
+    rng = random.Random(seed)
+    specs = [build(i, rng) for i in range(requests)]
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    next_index = 0
+
+    async def client_loop():
+        nonlocal next_index
+        while next_index < len(specs):
+            method, url, kwargs = specs[next_index]
+            next_index += 1
+            started = time.perf_counter()
+            response = await http.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - started)
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+    ops_before = counter.count
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    await server.scroll_buffer.flush()
+    ops = counter.count - ops_before
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "elapsed_seconds": round(elapsed, 4),
+        "rps": round(requests / elapsed, 1),
+        "latency_ms": {
+            key: round(value * 1000, 3) if value is not None else None
+            for key, value in (("p50", percentile(latencies, 0.5)),
+                               ("p95", percentile(latencies, 0.95)),
+                               ("p99", percentile(latencies, 0.99)),
+                               ("max", latencies[-1] if latencies else None))
+        },
+        "status_codes": statuses,
+        "mongo_ops": ops,
+        "mongo_ops_per_request": round(ops / requests, 2),
+    }
+
+
+async def wait_until_ready(http: httpx.AsyncClient, timeout: float = 30) -> None:
+    """Indexes are built in the background after startup; scenarios start once /health/ready says so."""
+    deadline = time.monotonic() + timeout
+    while (await http.get("/health/ready")).status_code != 200:
+        if time.monotonic() > deadline:
+            raise SystemExit("Server did not become ready")
+        await asyncio.sleep(0.05)
+
+
+async def run_suite(args) -> Dict[str, Any]:
+    install_fake_llm_module()
+    os.environ.setdefault("STORAGE_BACKEND", args.storage)
+    import server
+
+    counter = OpCounter()
+    server.storage = await connect(args, counter)
+    FakeLlmChat.latency = args.llm_latency
+    server.LlmChat = FakeLlmChat
+    server.UserMessage = FakeUserMessage
+
+    results: Dict[str, Any] = {}
+    async with server.app.router.lifespan_context(server.app):
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as http:
+            await wait_until_ready(http)
+            for offset, name in enumerate(args.scenarios):
+                results[name] = await run_scenario(http, server, counter, name,
+                                                   args.requests, args.concurrency, args.seed + offset)
+                print(format_row(name, results[name]), flush=True)
+
+    return {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "llm_latency": args.llm_latency,
+            "storage": "memory" if args.storage == "memory" else "mongod" if args.mongo_url else "mongomock",
+            "scroll_storage_mode": args.scroll_storage_mode,
+            "scroll_events_layout": args.scroll_events_layout,
+            "python": platform.python_version(),
+            "seed": args.seed,
+        },
+        "scenarios": results,
+    }
+
+
+def format_row(name: str, result: Dict[str, Any]) -> str:
+    latency = result["latency_ms"]
+    return (f"{name:<24} {result['rps']:>9.1f} rps  p50 {latency['p50']:>8.2f}  p95 {latency['p95']:>8.2f}  "
+            f"p99 {latency['p99']:>8.2f} ms  {result['mongo_ops_per_request']:>6.2f} ops/req  {result['status_codes']}")
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    print("\nChange vs baseline (positive rps / negative latency is better):")
+    for name, result in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if before is None:
+            print(f"{name:<24} (not in baseline)")
+            continue
+
+        def change(new: Optional[float], old: Optional[float]) -> str:
+            if not new or not old:
+                return "    n/a"
+            return f"{(new - old) / old * 100:+6.1f}%"
+
+        print(f"{name:<24} rps {change(result['rps'], before['rps'])}  "
+              f"p95 {change(result['latency_ms']['p95'], before['latency_ms']['p95'])}  "
+              f"p99 {change(result['latency_ms']['p99'], before['latency_ms']['p99'])}  "
+              f"ops/req {change(result['mongo_ops_per_request'], before['mongo_ops_per_request'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=20, help="Concurrent clients per scenario")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--storage", choices=["mongo", "memory"], default="mongo")
+    parser.add_argument("--scroll-storage-mode", choices=["events", "sessions"], default="events")
+    parser.add_argument("--scroll-events-layout", choices=["documents", "timeseries"], default="documents")
+    parser.add_argument("--mongo-url", default=None, help="Use this mongod instead of mongomock (its benchmark database is dropped first)")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds the fake LlmChat takes per call")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", type=Path, default=None, help="Results file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", type=Path, default=None, help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_suite(args))
+
+    output = args.output or RESULTS_DIR / f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        compare(results, json.loads(args.compare.read_text()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 import { useState } from 'react';
 import { motion, AnimatePresence } from 'framer-motion';
 import { ArrowRight, Check, Plus, type LucideIcon } from 'lucide-react';
+import { useIdempotencyKey } from '@/hooks/use-idempotency-key';
 
 const F = {
   playfair: "'Playfair Display', serif",
@@ -39,6 +40,7 @@ const BrandedLeadForm = ({
   const [submitting, setSubmitting] = useState(false);
   const [submitted, setSubmitted] = useState(false);
   const [error, setError] = useState('');
+  const idempotencyKey = useIdempotencyKey();
 
   const headline = headlineText || `Let\u2019s discuss ${brandName}.`;
   const description = descriptionText || `Tell us about your business and we\u2019ll design a plan tailored to your needs.`;
@@ -50,10 +52,11 @@ const BrandedLeadForm = ({
     setSubmitting(true);
     setError('');
     try {
+      const body = JSON.stringify({ ...form, service_interest: serviceName, source_page: serviceName });
       const res = await fetch(`${BACKEND_URL}/api/leads`, {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ ...form, service_interest: serviceName, source_page: serviceName }),
+        headers: { 'Content-Type': 'application/json', 'Idempotency-Key': idempotencyKey(body) },
+        body,
       });
       if (!res.ok) throw new Error('Failed');
       setSubmitted(true);
@@ -7,6 +7,7 @@ import { Input } from '@/components/ui/input';
 import { Label } from '@/components/ui/label';
 import PhoneInput from 'react-phone-number-input';
 import '@/components/StageClarityCheck/phone-input-styles.css';
+import { useIdempotencyKey } from '@/hooks/use-idempotency-key';
 
 const BACKEND_URL = import.meta.env.VITE_BACKEND_URL || '';
 
@@ -48,6 +49,7 @@ const LeadCaptureModal = ({ isOpen, onClose, serviceName, sourcePage }: LeadCapt
   const [submitting, setSubmitting] = useState(false);
   const [submitted, setSubmitted] = useState(false);
   const [error, setError] = useState('');
+  const idempotencyKey = useIdempotencyKey();
 
   const handleSubmit = async (e: React.FormEvent) => {
     e.preventDefault();
@@ -57,10 +59,11 @@ const LeadCaptureModal = ({ isOpen, onClose, serviceName, sourcePage }: LeadCapt
     setError('');
 
     try {
+      const body = JSON.stringify({ ...form, source_page: sourcePage || 'unknown' });
       const res = await fetch(`${BACKEND_URL}/api/leads`, {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ ...form, source_page: sourcePage || 'unknown' }),
+        headers: { 'Content-Type': 'application/json', 'Idempotency-Key': idempotencyKey(body) },
+        body,
       });
 
       if (!res.ok) throw new Error('Failed to submit');
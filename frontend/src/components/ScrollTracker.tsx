@@ -21,16 +21,29 @@ const getSessionId = (): string => {
   return sid;
 };
 
+interface PendingEvent {
+  section: string;
+  section_index: number;
+  client_ts: number;
+}
+
+const SCROLL_EVENTS_URL = `${BACKEND_URL}/api/analytics/scroll-events/v2`;
+
+// v2 batch: the session header is sent once, per-event values as parallel arrays
+const buildBatch = (page: string, totalSections: number, events: PendingEvent[]) =>
+  JSON.stringify({
+    page,
+    session_id: getSessionId(),
+    total_sections: totalSections,
+    viewport_height: window.innerHeight,
+    sections: events.map((e) => e.section),
+    indexes: events.map((e) => e.section_index),
+    client_ts: events.map((e) => e.client_ts),
+  });
+
 const ScrollTracker = ({ page, sections }: ScrollTrackerProps) => {
   const reachedSections = useRef<Set<string>>(new Set());
-  const pendingEvents = useRef<Array<{
-    page: string;
-    section: string;
-    section_index: number;
-    total_sections: number;
-    session_id: string;
-    viewport_height: number;
-  }>>([]);
+  const pendingEvents = useRef<PendingEvent[]>([]);
   const flushTimer = useRef<ReturnType<typeof setTimeout> | null>(null);
 
   const flush = useCallback(async () => {
@@ -38,15 +51,15 @@ const ScrollTracker = ({ page, sections }: ScrollTrackerProps) => {
     const batch = [...pendingEvents.current];
     pendingEvents.current = [];
     try {
-      await fetch(`${BACKEND_URL}/api/analytics/scroll-events/batch`, {
+      await fetch(SCROLL_EVENTS_URL, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify(batch),
+        body: buildBatch(page, sections.length, batch),
       });
     } catch {
       // silently fail — analytics should never block UX
     }
-  }, []);
+  }, [page, sections]);
 
   const scheduleFlush = useCallback(() => {
     if (flushTimer.current) clearTimeout(flushTimer.current);
@@ -54,7 +67,6 @@ const ScrollTracker = ({ page, sections }: ScrollTrackerProps) => {
   }, [flush]);
 
   useEffect(() => {
-    const sessionId = getSessionId();
     const totalSections = sections.length;
 
     const observer = new IntersectionObserver(
@@ -69,12 +81,9 @@ const ScrollTracker = ({ page, sections }: ScrollTrackerProps) => {
             if (idx === -1) return;
 
             pendingEvents.current.push({
-              page,
               section: sections[idx].name,
               section_index: idx,
-              total_sections: totalSections,
-              session_id: sessionId,
-              viewport_height: window.innerHeight,
+              client_ts: Date.now(),
             });
             scheduleFlush();
           }
@@ -100,8 +109,8 @@ const ScrollTracker = ({ page, sections }: ScrollTrackerProps) => {
         const batch = [...pendingEvents.current];
         pendingEvents.current = [];
         navigator.sendBeacon?.(
-          `${BACKEND_URL}/api/analytics/scroll-events/batch`,
-          new Blob([JSON.stringify(batch)], { type: 'application/json' })
+          SCROLL_EVENTS_URL,
+          new Blob([buildBatch(page, totalSections, batch)], { type: 'application/json' })
         );
       }
     };
@@ -12,6 +12,7 @@ import './phone-input-styles.css';
 import { StageClarityCheckProps, Answers, DiagnosticResult, UserDetails, Stage } from './types';
 import { questions } from './questions';
 import { interpretAnswers } from './logic';
+import { useIdempotencyKey } from '@/hooks/use-idempotency-key';
 
 const API_URL = import.meta.env.VITE_BACKEND_URL || '';
 
@@ -28,6 +29,7 @@ const StageClarityCheck = ({ isOpen, onClose }: StageClarityCheckProps) => {
   const [detectedCountry, setDetectedCountry] = useState<string>('IN');
   const [isLoadingAI, setIsLoadingAI] = useState(false);
   const [aiError, setAiError] = useState<string | null>(null);
+  const idempotencyKey = useIdempotencyKey();
   const modalRef = useRef<HTMLDivElement>(null);
   const previousActiveElement = useRef<HTMLElement | null>(null);
 
@@ -123,18 +125,19 @@ const StageClarityCheck = ({ isOpen, onClose }: StageClarityCheckProps) => {
       
       try {
         // Call AI-powered assessment API
+        const body = JSON.stringify({
+          answers,
+          user_details: {
+            name: userDetails.name.trim(),
+            email: userDetails.email.trim(),
+            phone: userDetails.phone.trim(),
+            country: userDetails.country,
+          }
+        });
         const response = await fetch(`${API_URL}/api/stage-assessment`, {
           method: 'POST',
-          headers: { 'Content-Type': 'application/json' },
-          body: JSON.stringify({
-            answers,
-            user_details: {
-              name: userDetails.name.trim(),
-              email: userDetails.email.trim(),
-              phone: userDetails.phone.trim(),
-              country: userDetails.country,
-            }
-          })
+          headers: { 'Content-Type': 'application/json', 'Idempotency-Key': idempotencyKey(body) },
+          body,
         });
         
         if (!response.ok) {
@@ -169,7 +172,7 @@ const StageClarityCheck = ({ isOpen, onClose }: StageClarityCheckProps) => {
         setIsLoadingAI(false);
       }
     }
-  }, [userDetails, answers]);
+  }, [userDetails, answers, idempotencyKey]);
 
   const progressValue = currentStep === 0 ? 0 : Math.min((currentStep / TOTAL_STEPS) * 100, 100);
   const isQuestionStep = currentStep >= 1 && currentStep <= TOTAL_QUESTIONS;
@@ -0,0 +1,14 @@
+import * as React from "react";
+
+// One Idempotency-Key per distinct request body: a retry or double submit of the
+// same form replays the first response instead of creating another lead.
+export function useIdempotencyKey() {
+  const last = React.useRef<{ body: string; key: string } | null>(null);
+
+  return React.useCallback((body: string) => {
+    if (last.current?.body !== body) {
+      last.current = { body, key: crypto.randomUUID() };
+    }
+    return last.current.key;
+  }, []);
+}
@@ -408,6 +408,7 @@ const Admin = () => {
   const [password, setPassword] = useState('');
   const [authError, setAuthError] = useState('');
   const [leads, setLeads] = useState<Lead[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [stats, setStats] = useState<Stats | null>(null);
   const [isLoading, setIsLoading] = useState(false);
   const [serviceFilter, setServiceFilter] = useState<string>('all');
@@ -463,13 +464,21 @@ const Admin = () => {
     sessionStorage.removeItem('admin_auth');
   };
 
+  const buildLeadParams = (cursor?: string) => {
+    const params = new URLSearchParams();
+    if (serviceFilter !== 'all') params.append('service', serviceFilter);
+    if (stageFilter !== 'all') params.append('stage', stageFilter);
+    if (statusFilter !== 'all') params.append('status', statusFilter);
+    // Quiz answers and AI assessment are loaded per lead when a row is expanded
+    params.append('include_details', 'false');
+    if (cursor) params.append('cursor', cursor);
+    return params;
+  };
+
   const fetchData = async () => {
     setIsLoading(true);
     try {
-      const params = new URLSearchParams();
-      if (serviceFilter !== 'all') params.append('service', serviceFilter);
-      if (stageFilter !== 'all') params.append('stage', stageFilter);
-      if (statusFilter !== 'all') params.append('status', statusFilter);
+      const params = buildLeadParams();
 
       const [leadsRes, statsRes] = await Promise.all([
         fetch(`${API_URL}/api/leads?${params}`, {
@@ -480,7 +489,11 @@ const Admin = () => {
         })
       ]);
 
-      if (leadsRes.ok) setLeads(await leadsRes.json());
+      if (leadsRes.ok) {
+        const page = await leadsRes.json();
+        setLeads(page.leads);
+        setNextCursor(page.next_cursor);
+      }
       if (statsRes.ok) setStats(await statsRes.json());
 
       // Fetch scroll analytics
@@ -497,6 +510,44 @@ const Admin = () => {
     }
   };
 
+  const loadMoreLeads = async () => {
+    if (!nextCursor) return;
+    setIsLoading(true);
+    try {
+      const response = await fetch(`${API_URL}/api/leads?${buildLeadParams(nextCursor)}`, {
+        headers: { 'X-Admin-Password': password }
+      });
+      if (response.ok) {
+        const page = await response.json();
+        setLeads(prev => [...prev, ...page.leads]);
+        setNextCursor(page.next_cursor);
+      }
+    } catch (err) {
+      console.error('Load more error:', err);
+    } finally {
+      setIsLoading(false);
+    }
+  };
+
+  const toggleLead = async (leadId: string) => {
+    if (expandedLead === leadId) {
+      setExpandedLead(null);
+      return;
+    }
+    setExpandedLead(leadId);
+    try {
+      const response = await fetch(`${API_URL}/api/leads/${leadId}`, {
+        headers: { 'X-Admin-Password': password }
+      });
+      if (response.ok) {
+        const detail: Lead = await response.json();
+        setLeads(prev => prev.map(lead => lead.id === leadId ? { ...lead, ...detail } : lead));
+      }
+    } catch (err) {
+      console.error('Lead detail error:', err);
+    }
+  };
+
   const updateLeadStatus = async (leadId: string, newStatus: string) => {
     try {
       const response = await fetch(`${API_URL}/api/leads/${leadId}/status`, {
@@ -517,27 +568,24 @@ const Admin = () => {
     }
   };
 
-  const exportToCSV = () => {
-    const headers = ['Name', 'Email', 'Phone', 'Company', 'Service Interest', 'Stage', 'Status', 'Source', 'Message', 'Date'];
-    const rows = filteredLeads.map(lead => [
-      lead.name,
-      lead.email,
-      lead.phone || '',
-      lead.company || '',
-      lead.service_interest || '',
-      lead.stage || '',
-      lead.status || 'New',
-      lead.source_page || '',
-      lead.message?.replace(/,/g, ';') || '',
-      formatDate(lead.created_at)
-    ]);
-    
-    const csvContent = [headers.join(','), ...rows.map(row => row.map(cell => `"${cell}"`).join(','))].join('\n');
-    const blob = new Blob([csvContent], { type: 'text/csv;charset=utf-8;' });
-    const link = document.createElement('a');
-    link.href = URL.createObjectURL(blob);
-    link.download = `founderplane-leads-${new Date().toISOString().split('T')[0]}.csv`;
-    link.click();
+  const exportToCSV = async () => {
+    // Exported server-side so the file covers every matching lead, not just the loaded pages
+    const params = buildLeadParams();
+    params.delete('include_details');
+    params.append('format', 'csv');
+    try {
+      const response = await fetch(`${API_URL}/api/export/leads?${params}`, {
+        headers: { 'X-Admin-Password': password }
+      });
+      if (!response.ok) return;
+      const blob = await response.blob();
+      const link = document.createElement('a');
+      link.href = URL.createObjectURL(blob);
+      link.download = `founderplane-leads-${new Date().toISOString().split('T')[0]}.csv`;
+      link.click();
+    } catch (err) {
+      console.error('Export error:', err);
+    }
   };
 
   const filteredLeads = leads.filter(lead => {
@@ -973,7 +1021,7 @@ const Admin = () => {
                         <React.Fragment key={lead.id}>
                           <tr 
                             className="hover:bg-slate-800/30 cursor-pointer"
-                            onClick={() => setExpandedLead(expandedLead === lead.id ? null : lead.id)}
+                            onClick={() => toggleLead(lead.id)}
                             data-testid={`lead-row-${lead.id}`}
                           >
                             <td className="px-6 py-4">
@@ -1120,6 +1168,19 @@ const Admin = () => {
                   </tbody>
                 </table>
               </div>
+              {nextCursor && (
+                <div className="flex justify-center border-t border-slate-800 p-4">
+                  <Button
+                    variant="outline"
+                    onClick={loadMoreLeads}
+                    disabled={isLoading}
+                    className="border-slate-700 text-slate-300 hover:bg-slate-800"
+                    data-testid="load-more-leads-btn"
+                  >
+                    {isLoading ? 'Loading...' : 'Load more'}
+                  </Button>
+                </div>
+              )}
             </div>
           </>
         )}
@@ -0,0 +1,34 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Backend modules are imported the same way uvicorn loads them: from backend/.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+# The API tests run the app on in-memory storage
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+os.environ.setdefault("ADMISSION_CONTROL", "false")
+
+
+@pytest.fixture(scope="session")
+def client():
+    """One app per test session: its background workers are bound to the first event loop"""
+    from fastapi.testclient import TestClient
+
+    import server
+
+    with TestClient(server.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def leads(client, monkeypatch):
+    """An empty lead store behind the shared app, for tests that read every lead back"""
+    import server
+    from storage import MemoryLeadStore
+
+    store = MemoryLeadStore()
+    monkeypatch.setattr(server.storage, "leads", store)
+    return store
@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+import server
+from admission import (
+    HIGH, LOW, Admission, AdmissionConfigError, AdmissionError, AdmissionMiddleware, Budget, MemoryRateLimitStore,
+    RoutePolicy, parse_budget,
+)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_parse_budget():
+    assert parse_budget("10/60") == Budget(10 / 60, 10)
+    assert parse_budget("5") == Budget(5, 5)
+    assert parse_budget("") is None and parse_budget("0") is None
+    with pytest.raises(AdmissionConfigError):
+        parse_budget("ten/60")
+
+
+def test_token_bucket_refills_and_bounds_keys():
+    store = MemoryRateLimitStore(max_keys=2)
+    budget = Budget(rate=1000, burst=2)
+
+    async def scenario():
+        granted = [await store.take("a", budget) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        refilled = await store.take("a", budget)
+        await store.take("b", budget)
+        await store.take("c", budget)
+        return granted, refilled
+
+    granted, refilled = run(scenario())
+    assert granted[:2] == [0, 0] and 0 < granted[2] <= 0.001
+    assert refilled == 0
+    assert len(store) == 2
+
+
+def app_with(admission, handler=None):
+    async def ok(request):
+        if handler is not None:
+            await handler()
+        return PlainTextResponse("ok")
+
+    app = Starlette(routes=[Route("/ingest", ok, methods=["POST"]), Route("/admin", ok)])
+    app.add_middleware(AdmissionMiddleware, admission=admission)
+    return app
+
+
+def test_per_ip_budget_returns_429_with_retry_after():
+    policy = RoutePolicy("ingest", LOW, Budget(rate=1 / 60, burst=2), max_body_bytes=100)
+    admission = Admission([("POST", "/ingest", policy)], proxy_hops=1)
+    client = TestClient(app_with(admission))
+
+    statuses = [client.post("/ingest", headers={"X-Forwarded-For": "1.2.3.4"}).status_code for _ in range(3)]
+    assert statuses == [200, 200, 429]
+    limited = client.post("/ingest", headers={"X-Forwarded-For": "1.2.3.4"})
+    assert int(limited.headers["retry-after"]) > 50
+    assert client.post("/ingest", headers={"X-Forwarded-For": "spoofed, 5.6.7.8"}).status_code == 200
+    assert client.post("/ingest", content=b"x" * 200, headers={"X-Forwarded-For": "9.9.9.9"}).status_code == 413
+    assert client.get("/admin").status_code == 200
+    assert admission.rejections == {("ingest", "rate_limit_ip"): 2, ("ingest", "too_large"): 1}
+
+
+def test_rejections_are_exposed_as_a_counter(client, monkeypatch):
+    monkeypatch.setattr(server.admission, "rejections", {("leads", "rate_limit_ip"): 3})
+    body = client.get("/metrics").text
+    assert "# TYPE admission_rejected_requests_total counter" in body
+    assert 'admission_rejected_requests_total{route="leads",reason="rate_limit_ip"} 3' in body
+
+
+def test_low_priority_is_shed_first():
+    admission = Admission(
+        [("POST", "/low", RoutePolicy("low", LOW)), ("POST", "/high", RoutePolicy("high", HIGH))],
+        max_in_flight=4, low_priority_share=0.5,
+    )
+
+    async def scenario():
+        admission.in_flight = 2
+        await admission.admit(admission.policy("POST", "/high"), {"headers": []})
+        with pytest.raises(AdmissionError) as shed:
+            await admission.admit(admission.policy("POST", "/low"), {"headers": []})
+        admission.in_flight = 4
+        with pytest.raises(AdmissionError):
+            await admission.admit(admission.policy("POST", "/high"), {"headers": []})
+        return shed.value
+
+    shed = run(scenario())
+    assert shed.status_code == 503 and shed.headers == {"Retry-After": "1"}
+
+
+def test_session_budget_charges_per_event():
+    policy = RoutePolicy("ingest", LOW)
+    admission = Admission([("POST", "/ingest", policy)])
+    budget = Budget(rate=1 / 60, burst=10)
+
+    async def scenario():
+        await admission.check(policy, "session", "s1", budget, cost=8)
+        await admission.check(policy, "session", "s2", budget, cost=8)
+        with pytest.raises(AdmissionError) as limited:
+            await admission.check(policy, "session", "s1", budget, cost=8)
+        return limited.value
+
+    assert run(scenario()).status_code == 429
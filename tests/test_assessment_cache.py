@@ -0,0 +1,9 @@
+from assessment_cache import make_insight_template, render_insight
+
+
+def test_name_is_templated_as_a_whole_word_only():
+    insight = "Tim Baker, it is Time to focus. Tim's team at Timber Co is ready."
+    template = make_insight_template(insight, "Tim Baker")
+
+    assert template == "{{name}}, it is Time to focus. {{name}}'s team at Timber Co is ready."
+    assert render_insight(template, "Ana Ruiz") == "Ana, it is Time to focus. Ana's team at Timber Co is ready."
@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+import server
+from assessment_jobs import COMPLETE, FAILED, AssessmentJobQueue, JobQueueFullError
+
+
+async def echo(payload):
+    await asyncio.sleep(payload.get("delay", 0))
+    return payload
+
+
+def test_reserved_slot_is_kept_for_its_submit():
+    async def scenario():
+        jobs = AssessmentJobQueue(echo, max_queue=1, workers=1)
+        jobs.reserve()
+        with pytest.raises(JobQueueFullError):
+            jobs.reserve()
+        with pytest.raises(JobQueueFullError):
+            jobs.submit({})
+        job = jobs.submit({"n": 1}, reserved=True)
+        assert (await jobs.wait(job["job_id"], timeout=1))["status"] == COMPLETE
+
+        jobs.reserve()
+        jobs.release()
+        assert not jobs.full
+        await jobs.close()
+
+    asyncio.run(scenario())
+
+
+def test_close_drains_queued_jobs_and_fails_the_rest():
+    async def scenario():
+        jobs = AssessmentJobQueue(echo, workers=1)
+        quick = jobs.submit({"delay": 0}, meta={"lead_id": "quick"})
+        slow = jobs.submit({"delay": 5}, meta={"lead_id": "slow"})
+        queued = jobs.submit({"delay": 0}, meta={"lead_id": "queued"})
+
+        abandoned = await jobs.close(drain_timeout=0.1)
+        assert [job["lead_id"] for job in abandoned] == ["slow", "queued"]
+        assert jobs.get(quick["job_id"])["status"] == COMPLETE
+        assert {jobs.get(job["job_id"])["status"] for job in (slow, queued)} == {FAILED}
+        with pytest.raises(JobQueueFullError):
+            jobs.submit({})
+
+    asyncio.run(scenario())
+
+
+def test_job_endpoint_replays_its_key_and_sheds_new_work_when_full(client, monkeypatch):
+    body = {"answers": {"current_situation": "exploring"}, "user_details": {"name": "Ana", "email": "jobs@example.com"}}
+
+    def submit(key):
+        return client.post("/api/stage-assessment/jobs?mode=local", json=body, headers={"Idempotency-Key": key})
+
+    created = submit("job-1")
+    assert created.status_code == 202
+    job = created.json()
+    assert job["status"] in ("queued", "running", "complete")
+    assert client.get(f"/api/stage-assessment/jobs/{job['job_id']}?wait=5").json()["status"] == COMPLETE
+
+    leads = len(server.storage.leads.docs)
+    monkeypatch.setattr(server.assessment_jobs, "max_queue", 0)
+    replayed = submit("job-1")
+    assert replayed.status_code == 202
+    assert replayed.headers["Idempotent-Replayed"] == "true"
+    assert replayed.json() == job
+
+    shed = submit("job-2")
+    assert shed.status_code == 503
+    assert shed.headers["Retry-After"] == "5"
+    assert len(server.storage.leads.docs) == leads
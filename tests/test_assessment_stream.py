@@ -0,0 +1,96 @@
+import asyncio
+import json
+
+from assessment_stream import IncrementalJsonFields, assessment_sse
+
+MODEL_OUTPUT = "```json\n" + json.dumps({
+    "stage": "Growth",
+    "bottleneck": "Revenue",
+    "stage_description": "You have traction, \"mostly\".",
+    "bottleneck_description": "Sales are lumpy {not steady}.",
+    "what_to_avoid": "Premature delegation.",
+    "recommended_system": {"name": "D2CBolt", "description": "Revenue system", "route": "/services/d2cbolt"},
+    "personalized_insight": "Alice, focus on one channel.",
+}) + "\n```"
+
+
+class FakeStreamingLlm:
+    """Streams a canned response a few characters at a time."""
+
+    def __init__(self, text, chunk_size=5, fail_after=None):
+        self.text = text
+        self.chunk_size = chunk_size
+        self.fail_after = fail_after
+        self.sent = 0
+
+    async def stream(self):
+        for start in range(0, len(self.text), self.chunk_size):
+            if self.fail_after is not None and start >= self.fail_after:
+                raise RuntimeError("upstream reset")
+            self.sent = start + self.chunk_size
+            yield self.text[start:start + self.chunk_size]
+            await asyncio.sleep(0)
+
+
+def parse_events(frames):
+    events = []
+    for frame in frames:
+        event_line, data_line = frame.strip().split("\n")
+        events.append((event_line[len("event: "):], json.loads(data_line[len("data: "):])))
+    return events
+
+
+def run_stream(llm, provisional=None):
+    async def finalize(assessment):
+        return {**assessment, "lead_id": "lead-123"}
+
+    async def collect():
+        progress = []
+        frames = []
+        async for frame in assessment_sse(
+            llm.stream(),
+            fallback=lambda: {"stage": "Launch", "bottleneck": "Clarity", "source": "local-fallback"},
+            finalize=finalize,
+            provisional=provisional,
+        ):
+            frames.append(frame)
+            progress.append(llm.sent)
+        return frames, progress
+
+    return asyncio.run(collect())
+
+
+def test_parser_yields_fields_in_order_as_they_complete():
+    parser = IncrementalJsonFields()
+    seen = []
+    for i in range(0, len(MODEL_OUTPUT), 3):
+        seen.extend(name for name, _ in parser.feed(MODEL_OUTPUT[i:i + 3]))
+    assert seen == ["stage", "bottleneck", "stage_description", "bottleneck_description",
+                    "what_to_avoid", "recommended_system", "personalized_insight"]
+    assert parser.result()["bottleneck_description"] == "Sales are lumpy {not steady}."
+
+
+def test_stream_pushes_stage_before_generation_finishes():
+    llm = FakeStreamingLlm(MODEL_OUTPUT)
+    frames, progress = run_stream(llm, provisional={"stage": "Growth", "source": "local"})
+    events = parse_events(frames)
+
+    assert events[0] == ("provisional", {"stage": "Growth", "source": "local"})
+    assert events[1] == ("field", {"name": "stage", "value": "Growth"})
+    assert events[2] == ("field", {"name": "bottleneck", "value": "Revenue"})
+    assert progress[1] < len(MODEL_OUTPUT) / 4
+
+    final_event, final = events[-1]
+    assert final_event == "complete"
+    assert final["lead_id"] == "lead-123"
+    assert final["personalized_insight"] == "Alice, focus on one channel."
+
+
+def test_stream_falls_back_when_upstream_fails():
+    llm = FakeStreamingLlm(MODEL_OUTPUT, fail_after=40)
+    frames, _ = run_stream(llm)
+    events = parse_events(frames)
+
+    assert events[0] == ("field", {"name": "stage", "value": "Growth"})
+    assert events[-1] == ("complete", {"stage": "Launch", "bottleneck": "Clarity",
+                                       "source": "local-fallback", "lead_id": "lead-123"})
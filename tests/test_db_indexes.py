@@ -0,0 +1,77 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from db_indexes import backfill_email_keys, migrate_string_timestamps
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+NOW = datetime.now(timezone.utc)
+
+
+def lead(lead_id, email, minutes_ago, **fields):
+    return {"id": lead_id, "email": email, "created_at": NOW - timedelta(minutes=minutes_ago), **fields}
+
+
+def test_backfill_keys_one_lead_per_email_and_reports_the_rest():
+    db = mongomock_motor.AsyncMongoMockClient(tz_aware=True)["test"]
+
+    async def scenario():
+        await db.leads.insert_many([
+            lead("solo", " Solo@Example.com ", 50),
+            lead("old", "Dup@example.com", 40),
+            lead("new", "dup@EXAMPLE.com", 30),
+            lead("merged", "kept@example.com", 5, email_key="kept@example.com", submissions=3),
+            lead("stray", "KEPT@example.com", 60),
+            lead("blank", "", 10),
+        ])
+        first = await backfill_email_keys(db, batch_size=2)
+        again = await backfill_email_keys(db)
+        keys = {doc["id"]: (doc.get("email_key"), doc.get("submissions")) async for doc in db.leads.find()}
+        return first, again, keys
+
+    first, again, keys = asyncio.run(scenario())
+    assert first == {"keyed": 2, "collisions": {"dup@example.com": ["new"], "kept@example.com": ["stray"]}}
+    assert again == {"keyed": 0, "collisions": first["collisions"]}
+    assert keys == {
+        "solo": ("solo@example.com", 1),
+        "old": ("dup@example.com", 1),
+        "new": (None, None),
+        "merged": ("kept@example.com", 3),
+        "stray": (None, None),
+        "blank": (None, None),
+    }
+
+
+def test_migrate_string_timestamps_converts_only_strings_and_can_run_again():
+    db = mongomock_motor.AsyncMongoMockClient(tz_aware=True)["test"]
+    native = datetime(2024, 5, 1, 9, 30, tzinfo=timezone.utc)
+    stored = {
+        "zulu": "2024-05-01T12:00:00.123000Z",
+        "offset": "2024-05-01T14:00:00+02:00",
+        "naive": "2024-05-01T12:00:00",
+        "native": native,
+        "garbled": "yesterday",
+        "zulu-2": "2024-05-02T00:00:00Z",
+    }
+
+    async def scenario():
+        await db.status_checks.insert_many([{"id": key, "timestamp": value} for key, value in stored.items()])
+        first = await migrate_string_timestamps(db, "status_checks", "timestamp", batch_size=2)
+        again = await migrate_string_timestamps(db, "status_checks", "timestamp", batch_size=2)
+        timestamps = {doc["id"]: doc["timestamp"] async for doc in db.status_checks.find()}
+        return first, again, timestamps
+
+    first, again, timestamps = asyncio.run(scenario())
+    assert first == {"converted": 4, "skipped": 1}
+    assert again == {"converted": 0, "skipped": 1}
+    noon = datetime(2024, 5, 1, 12, tzinfo=timezone.utc)
+    assert timestamps == {
+        "zulu": noon + timedelta(milliseconds=123),
+        "offset": noon,
+        "naive": noon,
+        "native": native,
+        "garbled": "yesterday",
+        "zulu-2": datetime(2024, 5, 2, tzinfo=timezone.utc),
+    }
@@ -0,0 +1,53 @@
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+import server
+
+ADMIN = {"X-Admin-Password": "founderplane2024"}
+
+
+@pytest.fixture
+def five_leads(client, leads, monkeypatch):
+    # Several small batches, so the stream is built from more than one chunk
+    monkeypatch.setattr(server, "EXPORT_BATCH_SIZE", 2)
+    for i in range(5):
+        client.post("/api/leads", json={"name": f"Lead {i}", "email": f"lead{i}@example.com",
+                                        "message": f"Hi, line one\nline {i}"})
+    return [doc["id"] for doc in sorted(leads.docs, key=lambda doc: (doc["created_at"], doc["id"]))]
+
+
+def test_ndjson_export_streams_every_lead_oldest_first(client, five_leads):
+    response = client.get("/api/export/leads", headers=ADMIN)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["id"] for row in rows] == five_leads
+    assert rows[0]["message"].startswith("Hi, line one\nline ")
+
+
+def test_gzipped_csv_export_has_the_header_and_every_row(client, five_leads):
+    response = client.get("/api/export/leads?format=csv&gzip=true", headers=ADMIN)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/gzip"
+    assert response.headers["content-disposition"].endswith('.csv.gz"')
+
+    rows = list(csv.reader(io.StringIO(gzip.decompress(response.content).decode("utf-8"))))
+    assert rows[0] == list(server.LEAD_EXPORT_FIELDS)
+    assert len(rows) == 6
+    assert [row[0] for row in rows[1:]] == five_leads
+    assert rows[1][rows[0].index("message")].startswith("Hi, line one\nline ")
+
+
+def test_gzipped_ndjson_export_decompresses_to_the_plain_export(client, five_leads):
+    plain = client.get("/api/export/leads", headers=ADMIN).content
+    assert gzip.decompress(client.get("/api/export/leads?gzip=true", headers=ADMIN).content) == plain
+
+
+def test_export_rejects_an_unknown_format(client, five_leads):
+    response = client.get("/api/export/leads?format=xml", headers=ADMIN)
+    assert response.status_code == 400
+    assert "ndjson, csv" in response.json()["detail"]
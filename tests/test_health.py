@@ -0,0 +1,32 @@
+import time
+
+import server
+
+
+def wait_ready(client, timeout=5):
+    deadline = time.monotonic() + timeout
+    while True:
+        response = client.get("/health/ready")
+        if response.status_code == 200 or time.monotonic() > deadline:
+            return response
+        time.sleep(0.02)
+
+
+def test_live_and_ready_probes(client):
+    assert client.get("/health/live").json()["status"] == "healthy"
+    ready = wait_ready(client)
+    assert ready.status_code == 200
+    assert ready.json() == {"status": "ready", "service": "founderplane-backend", "storage": "memory"}
+
+
+def test_ready_fails_when_storage_is_unreachable(client, monkeypatch):
+    assert wait_ready(client).status_code == 200
+
+    async def unreachable():
+        raise ConnectionError("connection refused")
+
+    monkeypatch.setattr(server.storage, "ping", unreachable)
+    response = client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "unavailable"
+    assert client.get("/health/live").status_code == 200
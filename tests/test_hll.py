@@ -0,0 +1,55 @@
+import random
+
+from hll import HyperLogLog, standard_error
+
+
+def synthetic_sessions(n, seed):
+    rng = random.Random(seed)
+    return [f"s_{rng.getrandbits(40)}_{i}" for i in range(n)]
+
+
+def test_approximate_count_within_error_bound():
+    bound = 3 * standard_error()
+    for n in (10, 1000, 50000):
+        sessions = synthetic_sessions(n, seed=n)
+        sketch = HyperLogLog()
+        # Repeated events from the same session must not change the count.
+        sketch.update(sessions + sessions[: n // 2])
+        exact = len(set(sessions))
+        assert abs(sketch.count() - exact) <= max(1, bound * exact)
+
+
+def test_merged_daily_sketches_match_window_distinct_count():
+    rng = random.Random(7)
+    population = synthetic_sessions(20000, seed=1)
+    days = [rng.sample(population, 4000) for _ in range(7)]
+
+    window = HyperLogLog()
+    for day in days:
+        daily = HyperLogLog()
+        daily.update(day)
+        window.merge(HyperLogLog.from_bytes(daily.to_bytes()))
+
+    exact = len(set().union(*days))
+    assert abs(window.count() - exact) <= 3 * standard_error() * exact
+
+
+def test_serialization_is_compact_for_sparse_sketches():
+    sketch = HyperLogLog()
+    sketch.update(synthetic_sessions(25, seed=3))
+    data = sketch.to_bytes()
+    assert len(data) < 200
+    assert HyperLogLog.from_bytes(data).registers == sketch.registers
+
+
+def test_register_map_round_trips_and_merges_by_register_maximum():
+    first, second = HyperLogLog(), HyperLogLog()
+    first.update(synthetic_sessions(300, seed=4))
+    second.update(synthetic_sessions(300, seed=5))
+    assert HyperLogLog.from_registers(first.to_registers()).registers == first.registers
+
+    merged = first.to_registers()
+    for index, rank in second.to_registers().items():
+        merged[index] = max(merged.get(index, 0), rank)
+    first.merge(second)
+    assert HyperLogLog.from_registers(merged).registers == first.registers
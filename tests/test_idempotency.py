@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+from idempotency import IdempotencyError, IdempotencyKeys
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def counting_handler(calls, status_code=201, delay=0):
+    async def handler():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return status_code, {"id": f"lead-{len(calls)}"}
+    return handler
+
+
+def test_repeat_replays_stored_response():
+    keys = IdempotencyKeys()
+    calls = []
+
+    async def scenario():
+        first = await keys.run("leads", "k1", {"email": "a@example.com"}, counting_handler(calls))
+        repeat = await keys.run("leads", "k1", {"email": "a@example.com"}, counting_handler(calls))
+        other_scope = await keys.run("stage-assessment", "k1", {"email": "a@example.com"}, counting_handler(calls))
+        return first, repeat, other_scope
+
+    first, repeat, other_scope = run(scenario())
+    assert first == (201, {"id": "lead-1"}, False)
+    assert repeat == (201, {"id": "lead-1"}, True)
+    assert other_scope == (201, {"id": "lead-2"}, False)
+    assert keys.replays == 1
+
+
+def test_concurrent_duplicates_run_handler_once():
+    keys = IdempotencyKeys(wait_seconds=5)
+    calls = []
+
+    async def scenario():
+        return await asyncio.gather(*(
+            keys.run("leads", "k1", {"n": 1}, counting_handler(calls, delay=0.1)) for _ in range(5)
+        ))
+
+    results = run(scenario())
+    assert len(calls) == 1
+    assert {body["id"] for _, body, _ in results} == {"lead-1"}
+    assert sorted(replayed for _, _, replayed in results) == [False, True, True, True, True]
+
+
+def test_in_progress_key_times_out_with_409():
+    keys = IdempotencyKeys(wait_seconds=0.05)
+
+    async def scenario():
+        first = asyncio.ensure_future(keys.run("leads", "k1", {}, counting_handler([], delay=0.5)))
+        await asyncio.sleep(0.01)
+        try:
+            await keys.run("leads", "k1", {}, counting_handler([]))
+        finally:
+            await first
+
+    with pytest.raises(IdempotencyError) as error:
+        run(scenario())
+    assert error.value.status_code == 409
+    assert error.value.headers == {"Retry-After": "1"}
+
+
+def test_reused_key_with_other_body_is_rejected():
+    keys = IdempotencyKeys()
+
+    async def scenario():
+        await keys.run("leads", "k1", {"email": "a@example.com"}, counting_handler([]))
+        await keys.run("leads", "k1", {"email": "b@example.com"}, counting_handler([]))
+
+    with pytest.raises(IdempotencyError) as error:
+        run(scenario())
+    assert error.value.status_code == 422
+
+
+def test_failed_request_releases_key():
+    keys = IdempotencyKeys()
+    calls = []
+
+    async def failing():
+        raise RuntimeError("database down")
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await keys.run("leads", "k1", {}, failing)
+        return await keys.run("leads", "k1", {}, counting_handler(calls))
+
+    assert run(scenario()) == (201, {"id": "lead-1"}, False)
+    with pytest.raises(IdempotencyError):
+        run(keys.run("leads", "", {}, counting_handler(calls)))
@@ -0,0 +1,30 @@
+import asyncio
+
+from lead_stats import LeadStatsCache
+
+
+def test_refresh_running_across_an_invalidate_is_not_served_or_cached():
+    async def scenario():
+        leads = {"total": 1}
+        started, release = asyncio.Event(), asyncio.Event()
+
+        async def compute():
+            snapshot = dict(leads)
+            started.set()
+            await release.wait()
+            return snapshot
+
+        cache = LeadStatsCache(compute, ttl_seconds=60)
+        before = asyncio.ensure_future(cache.get())
+        await started.wait()
+        leads["total"] = 2
+        cache.invalidate()
+        after = asyncio.ensure_future(cache.get())
+        await asyncio.sleep(0)
+        release.set()
+
+        assert (await before)["total"] == 1
+        assert (await after)["total"] == 2
+        assert (await cache.get())["total"] == 2
+
+    asyncio.run(scenario())
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from llm_governor import CLOSED, HALF_OPEN, OPEN, CircuitOpenError, LLMGovernor
+
+
+async def fail():
+    raise RuntimeError("upstream error")
+
+
+async def answer():
+    return "ok"
+
+
+async def trip(governor):
+    with pytest.raises(RuntimeError):
+        await governor.call(None, fail)
+    assert governor.state == OPEN
+    await asyncio.sleep(governor.cooldown_seconds)
+    assert governor.state == HALF_OPEN
+
+
+def test_trial_cancelled_while_waiting_for_a_slot_is_handed_to_the_next_call():
+    async def scenario():
+        governor = LLMGovernor(max_concurrency=1, min_calls=1, cooldown_seconds=0.01)
+        await trip(governor)
+
+        async def chunks():
+            yield "chunk"
+
+        async def consume():
+            async for _ in governor.stream(chunks):
+                pass
+
+        await governor._semaphore.acquire()
+        trial = asyncio.ensure_future(consume())
+        await asyncio.sleep(0.01)
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+        governor._semaphore.release()
+
+        assert await governor.call(None, answer) == "ok"
+        assert governor.state == CLOSED
+
+    asyncio.run(scenario())
+
+
+def test_deadline_covers_the_wait_for_a_slot():
+    async def scenario():
+        governor = LLMGovernor(max_concurrency=1, timeout=0.05)
+        await governor._semaphore.acquire()
+        with pytest.raises(asyncio.TimeoutError):
+            await governor.call(None, answer)
+        assert governor.stats()["rejected"] == 1
+        assert governor.stats()["failures"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_call_admitted_before_the_trip_is_not_taken_for_the_trial():
+    async def scenario():
+        governor = LLMGovernor(min_calls=1, cooldown_seconds=0.01)
+        early_done, trial_done = asyncio.Event(), asyncio.Event()
+
+        async def wait_for(event):
+            await event.wait()
+            return "ok"
+
+        early = asyncio.ensure_future(governor.call(None, lambda: wait_for(early_done)))
+        await asyncio.sleep(0)
+        await trip(governor)
+        trial = asyncio.ensure_future(governor.call(None, lambda: wait_for(trial_done)))
+        await asyncio.sleep(0)
+
+        early_done.set()
+        assert await early == "ok"
+        assert governor.state == HALF_OPEN
+        with pytest.raises(CircuitOpenError):
+            await governor.call(None, answer)
+
+        trial_done.set()
+        assert await trial == "ok"
+        assert governor.state == CLOSED
+
+    asyncio.run(scenario())
@@ -0,0 +1,158 @@
+import asyncio
+import base64
+from datetime import datetime, timedelta, timezone
+
+from storage import MemoryStorage, StorageConfigError, create_storage
+
+import pytest
+
+NOW = datetime.now(timezone.utc)
+ADMIN = {"X-Admin-Password": "founderplane2024"}
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def lead(i, **fields):
+    return {"id": f"lead-{i:02d}", "name": f"Lead {i}", "email": f"lead{i}@example.com", "status": "New",
+            "created_at": NOW - timedelta(minutes=i), **fields}
+
+
+def test_lead_pages_follow_keyset_cursor():
+    storage = MemoryStorage()
+    for i in range(7):
+        run(storage.leads.insert(lead(i, stage="Growth" if i % 2 else "Launch")))
+
+    seen, cursor = [], None
+    while True:
+        page = run(storage.leads.page({}, cursor, 3, fields=("id", "created_at")))
+        seen += [doc["id"] for doc in page]
+        if len(page) < 3:
+            break
+        cursor = (page[-1]["created_at"], page[-1]["id"])
+    assert seen == [f"lead-{i:02d}" for i in range(7)]
+
+    growth = run(storage.leads.page({"stage": "Growth"}, None, 10))
+    assert [doc["id"] for doc in growth] == ["lead-01", "lead-03", "lead-05"]
+
+
+def test_leads_api_pages_end_with_no_next_cursor(client, leads):
+    for i in range(7):
+        run(leads.insert(lead(i)))
+    # Same created_at as lead-02, at the end of the first page: the id breaks the tie
+    run(leads.insert(lead(2, id="lead-02b")))
+
+    seen, pages, cursor = [], [], None
+    while True:
+        query = f"&cursor={cursor}" if cursor else ""
+        response = client.get(f"/api/leads?limit=3{query}", headers=ADMIN)
+        assert response.status_code == 200
+        page = response.json()
+        pages.append(len(page["leads"]))
+        seen += [doc["id"] for doc in page["leads"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert pages == [3, 3, 2]
+    assert seen == ["lead-00", "lead-01", "lead-02b", "lead-02", "lead-03", "lead-04", "lead-05", "lead-06"]
+
+    # A page that ends exactly on the last lead has no next page either
+    assert client.get("/api/leads?limit=8", headers=ADMIN).json()["next_cursor"] is None
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-a-cursor",
+    base64.urlsafe_b64encode(b"not json").decode(),
+    base64.urlsafe_b64encode(b'["lead-01"]').decode(),
+    base64.urlsafe_b64encode(b'["yesterday", "lead-01"]').decode(),
+    base64.urlsafe_b64encode(b'[20240101, "lead-01"]').decode(),
+    base64.urlsafe_b64encode(b"null").decode(),
+])
+def test_leads_api_rejects_a_tampered_cursor(client, leads, cursor):
+    response = client.get("/api/leads", params={"cursor": cursor}, headers=ADMIN)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_lead_upsert_by_email_merges_repeat_submissions():
+    storage = MemoryStorage()
+    first = run(storage.leads.upsert_by_email(lead(1, phone="555", message="First")))
+    repeat = run(storage.leads.upsert_by_email(lead(2, email=" LEAD1@example.com", phone=None, message="Second")))
+    other = run(storage.leads.upsert_by_email(lead(3)))
+    no_email = run(storage.leads.upsert_by_email(lead(4, email="")))
+
+    assert repeat["id"] == first["id"] == "lead-01"
+    assert repeat["created_at"] == first["created_at"]
+    assert (repeat["phone"], repeat["message"], repeat["submissions"]) == ("555", "Second", 2)
+    assert other["id"] == "lead-03" and no_email["id"] == "lead-04"
+    assert run(storage.leads.get("lead-01", fields=("message",))) == {"message": "Second"}
+    assert run(storage.leads.stats())["total"] == 3
+
+
+def test_lead_update_and_stats():
+    storage = MemoryStorage()
+    run(storage.leads.insert(lead(1, service_interest="D2CBolt")))
+    run(storage.leads.insert(lead(2, created_at=NOW - timedelta(days=30))))
+
+    assert run(storage.leads.update("lead-01", {"status": "Contacted"}))
+    assert not run(storage.leads.update("missing", {"status": "Contacted"}))
+    assert run(storage.leads.stats()) == {
+        "total": 2,
+        "recent_7_days": 1,
+        "by_service": {"D2CBolt": 1, "Unknown": 1},
+        "by_stage": {"Unknown": 2},
+        "by_status": {"Contacted": 1, "New": 1},
+    }
+
+
+def test_status_checks_latest_per_client_and_tail():
+    storage = MemoryStorage()
+    for i in range(6):
+        run(storage.status_checks.insert({"id": str(i), "client_name": f"c{i % 2}",
+                                          "timestamp": NOW + timedelta(seconds=i)}))
+
+    latest = run(storage.status_checks.latest_per_client())
+    assert [(doc["client_name"], doc["id"]) for doc in latest] == [("c0", "4"), ("c1", "5")]
+
+    tail = run(storage.status_checks.tail(NOW + timedelta(seconds=2), None, 2))
+    assert [doc["id"] for doc in tail] == ["3", "4"]
+
+
+def test_scroll_stats_exact_counts_distinct_sessions():
+    storage = MemoryStorage()
+    run(storage.scroll_events.insert_many([
+        {"page": "Index", "section": "hero", "section_index": 0, "total_sections": 2,
+         "session_id": session, "timestamp": NOW}
+        for session in ("a", "b", "a")
+    ]))
+
+    stats = run(storage.scroll_events.stats(days=1, distinct="exact"))
+    assert stats["total_sessions"] == 2
+    assert stats["total_events"] == 3
+    assert stats["page_visitors"] == [{"page": "Index", "total_visitors": 2}]
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(StorageConfigError):
+        create_storage("sqlite")
+
+
+def test_sessions_mode_matches_raw_event_stats():
+    events = [
+        {"page": page, "section": f"s{index}", "section_index": index, "total_sections": 4,
+         "session_id": session, "timestamp": NOW - timedelta(minutes=minutes)}
+        for page, session, index, minutes in [
+            ("Index", "a", 0, 5), ("Index", "a", 2, 4), ("Index", "a", 0, 3),
+            ("Index", "b", 0, 9), ("Pricing", "a", 1, 1), ("Pricing", "c", 3, 2),
+        ]
+    ]
+    raw, sessions = MemoryStorage(), MemoryStorage("sessions")
+    run(raw.scroll_events.insert_many(events))
+    run(sessions.scroll_events.insert_many(events[:2]))
+    run(sessions.scroll_events.insert_many(events[2:]))
+
+    expected = run(raw.scroll_events.stats(days=1, distinct="exact"))
+    assert run(sessions.scroll_events.stats(days=1)) == expected
+    assert len(sessions.scroll_events.sessions) == 4
+    assert sessions.scroll_events.sessions["Index|a"]["reached"] == 0b101
@@ -0,0 +1,38 @@
+import re
+
+from metrics import DEFAULT_BUCKETS
+
+ADMIN = {"X-Admin-Password": "founderplane2024"}
+LEAD_ROUTE = 'method="GET",route="/api/leads/{lead_id}",status="404"'
+
+
+def samples(body, name, labels):
+    """``{suffix or le bound: value}`` for one labelled series of ``name``"""
+    found = {}
+    for line in body.splitlines():
+        match = re.fullmatch(rf'{name}(_bucket|_sum|_count)?\{{{re.escape(labels)}(?:,le="([^"]+)")?\}} (\S+)', line)
+        if match:
+            found[match.group(2) or match.group(1)] = float(match.group(3))
+    return found
+
+
+def test_requests_are_timed_by_route_template(client):
+    before = samples(client.get("/metrics").text, "http_request_duration_seconds", LEAD_ROUTE).get("_count", 0)
+    for lead_id in ("missing-1", "missing-2"):
+        assert client.get(f"/api/leads/{lead_id}", headers=ADMIN).status_code == 404
+    client.get("/no/such/path")
+
+    response = client.get("/metrics")
+    assert response.headers["content-type"] == "text/plain; version=0.0.4; charset=utf-8"
+    body = response.text
+    assert "# TYPE http_request_duration_seconds histogram" in body
+    assert "missing-1" not in body
+    assert 'route="unmatched",status="404"' in body
+
+    series = samples(body, "http_request_duration_seconds", LEAD_ROUTE)
+    bounds = [repr(float(bound)) for bound in DEFAULT_BUCKETS] + ["+Inf"]
+    assert [key for key in series if key not in ("_sum", "_count")] == bounds
+    buckets = [series[bound] for bound in bounds]
+    assert buckets == sorted(buckets)
+    assert series["+Inf"] == series["_count"] == before + 2
+    assert series["_sum"] > 0
@@ -0,0 +1,35 @@
+import base64
+import json
+
+import server
+
+ADMIN = {"X-Admin-Password": "founderplane2024"}
+
+
+def naive_cursor(created_at, lead_id):
+    return base64.urlsafe_b64encode(json.dumps([created_at, lead_id]).encode()).decode()
+
+
+def test_naive_query_datetimes_are_taken_as_utc(client):
+    lead = client.post("/api/leads", json={"name": "Ana Ruiz", "email": "ana@example.com"}).json()
+    client.post("/api/status", json={"client_name": "probe"})
+
+    exported = client.get("/api/export/leads?since=2024-01-01T00:00:00&until=2999-01-01T00:00:00", headers=ADMIN)
+    assert exported.status_code == 200
+    assert lead["id"] in exported.text
+
+    assert client.get("/api/export/scroll-events?since=2024-01-01T00:00:00", headers=ADMIN).status_code == 200
+
+    tail = client.get("/api/status/tail?since=2024-01-01T00:00:00")
+    assert tail.status_code == 200
+    assert [check["client_name"] for check in tail.json()][-1] == "probe"
+
+    page = client.get(f"/api/leads?cursor={naive_cursor('2999-01-01T00:00:00', 'z')}", headers=ADMIN)
+    assert page.status_code == 200
+    assert lead["id"] in [item["id"] for item in page.json()["leads"]]
+
+
+def test_decoded_cursor_is_utc_aware():
+    created_at, lead_id = server.decode_lead_cursor(naive_cursor("2024-05-01T12:00:00", "lead-1"))
+    assert created_at.utcoffset().total_seconds() == 0
+    assert lead_id == "lead-1"
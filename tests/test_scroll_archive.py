@@ -0,0 +1,54 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from scroll_archive import ScrollArchive, archive_events, min_retention_days
+
+
+async def documents(docs):
+    for doc in docs:
+        yield doc
+
+
+def event(i, day):
+    return {"id": str(i), "timestamp": day + timedelta(minutes=i), "page": "Index", "section": f"s{i % 3}",
+            "section_index": i % 3, "total_sections": 3, "session_id": f"session-{i % 4}", "viewport_height": 900}
+
+
+def test_days_are_written_as_partitions_and_read_back(tmp_path):
+    archive = ScrollArchive(tmp_path)
+    day = datetime(2024, 6, 1, tzinfo=timezone.utc)
+    written = asyncio.run(archive.write_day("2024-06-01", documents([event(i, day) for i in range(7)]), batch_size=3))
+
+    assert written == 7
+    assert archive.days() == ["2024-06-01"]
+    assert archive.path("2024-06-01") == tmp_path / "day=2024-06-01" / "events.parquet"
+    assert not list(tmp_path.glob("**/*.tmp"))
+
+    frame = archive.read(["2024-06-01"], ["session_id", "section_index", "timestamp"])
+    assert len(frame) == 7
+    assert frame["session_id"].nunique() == 4
+    assert frame["timestamp"].iloc[0] == day
+    assert frame["timestamp"].dt.tz is not None
+
+
+def test_missing_archive_has_no_days(tmp_path):
+    assert ScrollArchive(tmp_path / "missing").days() == []
+
+
+def test_days_the_ttl_may_have_reached_are_not_archived(tmp_path):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    db = mongomock_motor.AsyncMongoMockClient(tz_aware=True)["test"]
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    old_day, recent_day = today - timedelta(days=9), today - timedelta(days=5)
+    asyncio.run(db.scroll_events.insert_many([event(i, old_day) for i in range(3)] +
+                                             [event(i, recent_day) for i in range(4)]))
+
+    archive = ScrollArchive(tmp_path)
+    run = asyncio.run(archive_events(db, archive, older_than_days=3, retention_days=9))
+
+    assert run.written == {recent_day.date().isoformat(): 4}
+    assert run.expired == [old_day.date().isoformat()]
+    assert archive.days() == [recent_day.date().isoformat()]
+    assert min_retention_days(3) == 5
@@ -0,0 +1,94 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+import storage as storage_module
+from scroll_buffer import ScrollEventBuffer
+from storage import MongoStorage
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+NOW = datetime.now(timezone.utc)
+
+
+def event(i):
+    return {"id": str(i), "timestamp": NOW, "page": "Index", "section": f"s{i % 3}", "section_index": i % 3,
+            "total_sections": 3, "session_id": f"session-{i % 2}", "viewport_height": 900}
+
+
+def mongo_storage(**kwargs):
+    client = mongomock_motor.AsyncMongoMockClient(tz_aware=True)
+    return MongoStorage(client, client["test"], **kwargs)
+
+
+async def site_events(storage):
+    rollup = await storage.db.scroll_rollups.find_one({"kind": "site"})
+    return rollup["events"] if rollup else 0
+
+
+def test_flush_that_fails_after_the_insert_drains_on_retry(monkeypatch):
+    storage = mongo_storage()
+    buffer = ScrollEventBuffer(storage.scroll_events.insert_many, flush_size=10)
+    insert_many = storage.scroll_events.collection.insert_many
+
+    async def insert_then_fail(docs, **kwargs):
+        await insert_many(docs, **kwargs)
+        raise ConnectionError("connection reset after the insert")
+
+    async def scenario():
+        # The insert is stored but its acknowledgement is lost: the chunk is requeued with its _ids
+        monkeypatch.setattr(storage.scroll_events.collection, "insert_many", insert_then_fail)
+        await buffer.add([event(i) for i in range(5)])
+        assert len(buffer) == 5
+        monkeypatch.undo()
+
+        # The rollup step fails once the events are stored: only the rollups wait for a retry
+        apply_rollups = storage_module.apply_rollups
+        calls = []
+
+        async def fail_once(db, docs):
+            calls.append(len(docs))
+            if len(calls) == 1:
+                raise ConnectionError("rollups unavailable")
+            await apply_rollups(db, docs)
+
+        monkeypatch.setattr(storage_module, "apply_rollups", fail_once)
+        assert await buffer.flush() == 5
+        assert len(buffer) == 0
+        assert await storage.db.scroll_events.count_documents({}) == 5
+        assert await site_events(storage) == 0
+
+        await buffer.add([event(i) for i in range(5, 8)])
+        assert calls == [5, 5, 3]
+        assert storage.scroll_events.pending_rollups == []
+        assert await storage.db.scroll_events.count_documents({}) == 8
+        assert await site_events(storage) == 8
+
+    asyncio.run(scenario())
+
+
+def test_timeseries_retry_skips_events_an_earlier_attempt_stored(monkeypatch):
+    storage = mongo_storage(scroll_events_layout="timeseries")
+    buffer = ScrollEventBuffer(storage.scroll_events.insert_many, flush_size=10)
+    insert_many = storage.scroll_events.collection.insert_many
+    inserted = []
+
+    async def insert_then_fail(docs, **kwargs):
+        inserted.append(len(docs))
+        await insert_many(docs, **kwargs)
+        if len(inserted) == 1:
+            raise ConnectionError("connection reset after the insert")
+
+    async def scenario():
+        # A time-series collection takes a duplicate _id, so the retry must not send the stored events again
+        monkeypatch.setattr(storage.scroll_events.collection, "insert_many", insert_then_fail)
+        await buffer.add([event(i) for i in range(5)])
+        assert len(buffer) == 5
+        await buffer.add([event(i) for i in range(5, 8)])
+        assert len(buffer) == 0
+        assert inserted == [5, 3]
+        assert await storage.db.scroll_events.count_documents({}) == 8
+        assert await site_events(storage) == 8
+
+    asyncio.run(scenario())
@@ -0,0 +1,61 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from scroll_funnel import FunnelSnapshot, funnel_report
+
+NOW = datetime.now(timezone.utc)
+
+
+def event(page, session, index, minutes_ago=5, total=4):
+    return {"page": page, "session_id": session, "section_index": index, "total_sections": total,
+            "timestamp": NOW - timedelta(minutes=minutes_ago)}
+
+
+class Source:
+    """Serves rows newer than ``since`` and records each requested ``since``."""
+
+    def __init__(self, rows, field):
+        self.rows, self.field, self.calls = rows, field, []
+
+    def __call__(self, since):
+        self.calls.append(since)
+
+        async def rows():
+            for row in self.rows:
+                if row[self.field] >= since:
+                    yield row
+        return rows()
+
+
+def test_refresh_loads_incrementally_and_merges_sessions():
+    events = Source([event("Index", "a", 0, 10), event("Index", "a", 1, 9), event("Index", "b", 0, 8)], "timestamp")
+    leads = Source([{"id": "l1", "source_page": "Index", "created_at": NOW - timedelta(minutes=7)}], "created_at")
+    snapshot = FunnelSnapshot(events, leads, max_age_seconds=0, overlap_seconds=60)
+
+    asyncio.run(snapshot.refresh())
+    events.rows.append(event("Index", "a", 3, 1))
+    asyncio.run(snapshot.refresh())
+
+    assert events.calls[1] >= NOW - timedelta(minutes=9, seconds=61)
+    sessions = snapshot.sessions.set_index("session_id")
+    assert sessions.loc["a", "max_depth"] == 3
+    assert sessions.loc["a", "first_seen"] == NOW - timedelta(minutes=10)
+    assert len(snapshot.sessions) == 2
+    assert len(snapshot.leads) == 1
+
+
+def test_report_drop_off_and_conversion():
+    events = Source([event("Index", f"s{i}", depth, 0) for i, depth in enumerate([0, 1, 1, 3])], "timestamp")
+    leads = Source([{"id": "l1", "source_page": "Index", "created_at": NOW},
+                    {"id": "l2", "source_page": "Contact", "created_at": NOW}], "created_at")
+    snapshot = FunnelSnapshot(events, leads)
+    asyncio.run(snapshot.refresh())
+
+    report = funnel_report(snapshot.sessions, snapshot.leads, days=1)
+    (page,) = report["pages"]
+    assert [step["reached"] for step in page["steps"]] == [4, 3, 1, 1]
+    assert [step["drop_off"] for step in page["steps"]] == [1, 2, 0, None]
+    assert page["median_max_depth"] == 1.0
+    assert page["completion_rate"] == 0.25
+    assert (page["leads"], page["conversion_rate"]) == (1, 0.25)
+    assert [(c["page"], c["sessions"], c["leads"]) for c in report["cohorts"]] == [("Index", 4, 1)]
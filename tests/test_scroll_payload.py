@@ -0,0 +1,53 @@
+import gzip
+import json
+from datetime import datetime, timezone
+
+import pytest
+from pydantic import ValidationError
+
+from scroll_payload import ScrollEventBatchV2, ScrollPayloadError, build_scroll_documents, decode_body
+
+BATCH = {
+    "page": "Index",
+    "session_id": "s_1",
+    "total_sections": 4,
+    "viewport_height": 900,
+    "sections": ["hero", "services"],
+    "indexes": [0, 1],
+    "client_ts": [1718000000000, 1718000001500],
+}
+
+
+def test_documents_are_built_from_columns():
+    now = datetime(2024, 6, 10, tzinfo=timezone.utc)
+    docs = build_scroll_documents(ScrollEventBatchV2.model_validate_json(json.dumps(BATCH)), now)
+
+    assert [(d["section"], d["section_index"]) for d in docs] == [("hero", 0), ("services", 1)]
+    assert all(d["page"] == "Index" and d["session_id"] == "s_1" and d["timestamp"] == now for d in docs)
+    assert docs[1]["client_timestamp"] == datetime(2024, 6, 10, 6, 13, 21, 500000, tzinfo=timezone.utc)
+    assert len({d["id"] for d in docs}) == 2
+
+
+def test_mismatched_columns_are_rejected():
+    with pytest.raises(ValidationError):
+        ScrollEventBatchV2.model_validate({**BATCH, "indexes": [0]})
+    with pytest.raises(ValidationError):
+        ScrollEventBatchV2.model_validate({**BATCH, "client_ts": [1]})
+
+
+def test_gzip_body_is_inflated_within_limit():
+    raw = json.dumps(BATCH).encode()
+    assert decode_body(gzip.compress(raw), "gzip", 4096) == raw
+    assert decode_body(raw, None, 4096) == raw
+
+    with pytest.raises(ScrollPayloadError) as too_large:
+        decode_body(gzip.compress(b" " * 10_000), "gzip", 4096)
+    assert too_large.value.status_code == 413
+
+    with pytest.raises(ScrollPayloadError) as truncated:
+        decode_body(gzip.compress(raw)[:-12], "gzip", 4096)
+    assert truncated.value.status_code == 400
+
+    with pytest.raises(ScrollPayloadError) as unsupported:
+        decode_body(raw, "br", 4096)
+    assert unsupported.value.status_code == 415
@@ -0,0 +1,78 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from bson import ObjectId
+
+import scroll_rollups
+from hll import HyperLogLog
+from scroll_rollups import apply_rollups, read_scroll_stats
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+NOW = datetime.now(timezone.utc)
+
+
+def events(count, sessions):
+    return [{"_id": ObjectId(), "timestamp": NOW, "page": "Index", "section": f"s{i % 2}", "section_index": i % 2,
+             "total_sections": 2, "session_id": f"session-{i % sessions}"} for i in range(count)]
+
+
+class FailingBulkWrite:
+    """Collection proxy whose bulk_write fails once the operations reach the server."""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    async def bulk_write(self, operations, **kwargs):
+        raise ConnectionError("connection reset")
+
+
+class Database:
+    def __init__(self, db, failing=()):
+        self.db = db
+        self.failing = set(failing)
+
+    def __getitem__(self, name):
+        collection = self.db[name]
+        return FailingBulkWrite(collection) if name in self.failing else collection
+
+
+def test_a_batch_applied_again_after_a_failed_counter_write_is_counted_once():
+    db = mongomock_motor.AsyncMongoMockClient(tz_aware=True)["test"]
+    first, second = events(6, 3), events(4, 4)
+
+    async def scenario():
+        await apply_rollups(db, first)
+        # Markers for the second batch are inserted, then the counter write fails
+        with pytest.raises(ConnectionError):
+            await apply_rollups(Database(db, failing={scroll_rollups.ROLLUPS}), second)
+        await apply_rollups(db, second)
+        await apply_rollups(db, second)
+        site = await db[scroll_rollups.ROLLUPS].find_one({"kind": "site"})
+        return site, await read_scroll_stats(db, 30)
+
+    site, stats = asyncio.run(scenario())
+    assert (site["events"], site["sessions"]) == (10, 4)
+    assert (stats["total_events"], stats["total_sessions"]) == (10, 4)
+    assert {s["section_index"]: s["reach_count"] for s in stats["section_stats"]} == {0: 3, 1: 4}
+
+
+def test_concurrent_batches_merge_their_sketches():
+    db = mongomock_motor.AsyncMongoMockClient(tz_aware=True)["test"]
+    batches = [events(50, 50) for _ in range(4)]
+    for number, batch in enumerate(batches):
+        for event in batch:
+            event["session_id"] = f"{event['session_id']}-{number}"
+
+    async def scenario():
+        await asyncio.gather(*(apply_rollups(db, batch) for batch in batches))
+        return await read_scroll_stats(db, 30)
+
+    # No registers lost: the stored sketches merge to the sketch of every session
+    expected = HyperLogLog()
+    expected.update(event["session_id"] for batch in batches for event in batch)
+    assert asyncio.run(scenario())["total_sessions"] == expected.count()
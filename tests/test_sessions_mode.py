@@ -0,0 +1,14 @@
+import server
+from storage import MemoryScrollSessionStore
+
+ADMIN = {"X-Admin-Password": "founderplane2024"}
+
+
+def test_raw_event_endpoints_are_unavailable_in_sessions_mode(client, monkeypatch):
+    monkeypatch.setattr(server.storage, "scroll_events", MemoryScrollSessionStore())
+
+    for path in ("/api/export/scroll-events", "/api/analytics/funnel"):
+        response = client.get(path, headers=ADMIN)
+        assert response.status_code == 409
+        assert "SCROLL_STORAGE_MODE=sessions" in response.json()["detail"]
+    assert client.get("/api/analytics/scroll-stats", headers=ADMIN).status_code == 200
@@ -0,0 +1,81 @@
+import re
+from pathlib import Path
+
+import pytest
+
+from stage_scoring import WEIGHTS, interpret_answers
+
+QUIZ = Path(__file__).resolve().parent.parent / "frontend" / "src" / "components" / "StageClarityCheck"
+
+
+def quiz_options():
+    """questions.ts question ids and their option values, in quiz order"""
+    source = (QUIZ / "questions.ts").read_text()
+    return [(question_id, re.findall(r'value: "([^"]+)"', block))
+            for question_id, block in re.findall(r'id: "([^"]+)"(.*?)\]', source, re.S)]
+
+
+def logic_weights():
+    """logic.ts case values per switch, in order, with the points each case adds"""
+    source = (QUIZ / "logic.ts").read_text()
+    switches = []
+    for block in re.findall(r"switch \(answers\.q\d\) \{(.*?)\n  \}", source, re.S):
+        cases = []
+        for value, body in re.findall(r"case '([^']+)':(.*?)break;", block, re.S):
+            increments = re.findall(r"scores\.(\w+)(?:\.(\w+)|\['([^']+)'\]) \+= (\d+);", body)
+            cases.append((value, tuple((axis, key or quoted, int(points)) for axis, key, quoted, points in increments)))
+        switches.append(cases)
+    return switches
+
+
+def test_every_quiz_option_has_the_logic_ts_weights():
+    options, switches = quiz_options(), logic_weights()
+    assert [question_id for question_id, _ in options] == list(WEIGHTS)
+    assert len(switches) == len(options)
+    # logic.ts lists its cases in the same order as the questions.ts options
+    for (question_id, values), cases in zip(options, switches):
+        assert list(WEIGHTS[question_id]) == values
+        assert len(cases) == len(values)
+        for value, (_, points) in zip(values, cases):
+            assert WEIGHTS[question_id][value] == points, (question_id, value)
+
+
+def answers(*values):
+    return dict(zip(WEIGHTS, values))
+
+
+# Expected stage, bottleneck and engagement worked out by hand from logic.ts
+@pytest.mark.parametrize("given, expected", [
+    (answers("exploring", "clarity", "unclear", "fully_dependent", "struggle", "what_to_build", "clarity_validation"),
+     ("Launch", "Clarity", "Guided")),
+    (answers("early_launch", "brand_understanding", "shaky", "some_structure", "handle_well", "how_to_position",
+             "build_brand"),
+     ("Launch", "Positioning", "Guided")),
+    (answers("launched_inconsistent", "revenue_execution", "clear_struggling", "mostly_dependent", "effort_required",
+             "how_to_sell", "predictable_revenue"),
+     ("Growth", "Revenue", "Execution-ready")),
+    (answers("team_growing", "founder_dependency", "clear_executing", "runs_without_me", "built_for_growth",
+             "how_to_grow", "scale_beyond_me"),
+     ("Scale", "Founder Dependency", "Execution-ready")),
+    # Nothing answered: every axis ties at zero and the first entry wins
+    ({}, ("Launch", "Clarity", "Self-guided")),
+    # Launch and Growth tie at 1: the earlier stage wins
+    ({"business_direction": "shaky"}, ("Launch", "Clarity", "Self-guided")),
+    # Growth and Scale tie at 1; Founder Dependency 2 beats Systems 1
+    ({"dependency": "mostly_dependent", "scale_readiness": "handle_well"},
+     ("Growth", "Founder Dependency", "Self-guided")),
+    # Positioning and Revenue tie at 3: the earlier bottleneck wins
+    ({"hardest_right_now": "brand_understanding", "decision_bottleneck": "how_to_sell"},
+     ("Launch", "Positioning", "Guided")),
+    # Systems and Founder Dependency tie at 3
+    ({"hardest_right_now": "stability", "decision_bottleneck": "how_to_operate"},
+     ("Launch", "Systems", "Execution-ready")),
+    # Guided and Execution-ready tie at 2
+    ({"current_situation": "team_growing", "intent": "clarity_validation"},
+     ("Launch", "Founder Dependency", "Guided")),
+    # Unknown option values score nothing
+    ({"current_situation": "idea", "intent": "remove-bottleneck"}, ("Launch", "Clarity", "Self-guided")),
+])
+def test_interpret_answers_matches_logic_ts(given, expected):
+    result = interpret_answers(given)
+    assert (result["stage"], result["bottleneck"], result["engagement_readiness"]) == expected
@@ -0,0 +1,54 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import fast_json
+import server
+from storage import MemoryStatusCheckStore
+
+START = datetime(2024, 5, 1, 12, 0, 0, 250000, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def status_checks(client, monkeypatch):
+    store = MemoryStatusCheckStore()
+    monkeypatch.setattr(server.storage, "status_checks", store)
+    # Inserted out of order; check 3 falls on a whole second
+    for i in (4, 0, 2, 5, 1, 3):
+        timestamp = START + timedelta(seconds=i) - (timedelta(microseconds=250000) if i == 3 else timedelta(0))
+        asyncio.run(store.insert({"id": f"check-{i}", "client_name": f"client-{i % 2}", "timestamp": timestamp}))
+    return store
+
+
+def test_latest_is_the_newest_check_per_client_in_client_order(client, status_checks):
+    response = client.get("/api/status/latest")
+    assert response.status_code == 200
+    assert response.json() == [
+        {"id": "check-4", "client_name": "client-0", "timestamp": "2024-05-01T12:00:04.250000Z"},
+        {"id": "check-5", "client_name": "client-1", "timestamp": "2024-05-01T12:00:05.250000Z"},
+    ]
+
+
+def test_tail_is_oldest_first_after_since(client, status_checks):
+    response = client.get("/api/status/tail", params={"since": "2024-05-01T12:00:01.250000Z", "limit": 3})
+    assert [(check["id"], check["timestamp"]) for check in response.json()] == [
+        ("check-2", "2024-05-01T12:00:02.250000Z"),
+        ("check-3", "2024-05-01T12:00:03Z"),
+        ("check-4", "2024-05-01T12:00:04.250000Z"),
+    ]
+
+    odd = client.get("/api/status/tail", params={"since": "2024-05-01T12:00:00", "client_name": "client-1"})
+    assert [check["id"] for check in odd.json()] == ["check-1", "check-3", "check-5"]
+
+
+@pytest.mark.parametrize("path", ["/api/status", "/api/status/latest", "/api/status/tail?since=2024-01-01T00:00:00Z"])
+def test_trusted_responses_match_the_validated_ones(client, status_checks, monkeypatch, path):
+    fast = client.get(path)
+    assert fast.headers["content-type"] == "application/json"
+
+    monkeypatch.setattr(fast_json, "orjson", None)
+    stdlib = client.get(path)
+    monkeypatch.setattr(server, "FAST_JSON_RESPONSES", False)
+    validated = client.get(path)
+    assert fast.json() == stdlib.json() == validated.json()